@@ -0,0 +1,144 @@
+import argparse
+import json
+import re
+import sys
+import time
+from collections import defaultdict
+
+from dropdown_index import DEFAULT_SOURCE, DropdownIndex
+
+DEFAULT_BUILDS = 'data/builds.json'
+
+_NON_SLUG = re.compile(r'[^a-z0-9]+')
+
+
+def slugify(text):
+    return _NON_SLUG.sub('-', (text or '').lower()).strip('-')
+
+
+def expected_build_id(title, category, sub_category=''):
+    """Build ids are slug(title)-slug(category)[-slug(subCategory)]."""
+    return '-'.join(p for p in (slugify(title), slugify(category), slugify(sub_category)) if p)
+
+
+def _key(category, sub_category, title):
+    return (category or '').strip(), (sub_category or '').strip(), (title or '').strip()
+
+
+def cross_check(builds, dropdown):
+    """
+    Join builds.json records against dropdown leaf entries.
+
+    Each side is hashed once by (category, subCategory, title) and by url; every record is
+    then visited a single time. Returns a report dict; empty lists mean no problems.
+    """
+    report = {
+        'duplicateBuildIds': [],
+        'duplicateBuildKeys': [],
+        'duplicateDropdownKeys': [],
+        'buildIdMismatch': [],
+        'buildsWithoutDropdown': [],
+        'dropdownWithoutBuild': [],
+        'titleMismatch': [],
+        'urlMismatch': [],
+    }
+
+    builds_by_id = defaultdict(list)
+    builds_by_key = defaultdict(list)
+    builds_by_url = defaultdict(list)
+    for pos, b in enumerate(builds if isinstance(builds, list) else []):
+        if not isinstance(b, dict):
+            continue
+        bid = str(b.get('id') or '')
+        builds_by_id[bid].append(pos)
+        builds_by_key[_key(b.get('category'), b.get('subCategory'), b.get('title'))].append(pos)
+        if b.get('link'):
+            builds_by_url[b['link'].strip()].append(pos)
+        expected = expected_build_id(b.get('title'), b.get('category'), b.get('subCategory'))
+        if bid != expected:
+            report['buildIdMismatch'].append({'id': bid, 'expected': expected})
+
+    for bid, positions in builds_by_id.items():
+        if len(positions) > 1:
+            report['duplicateBuildIds'].append({'id': bid, 'positions': positions})
+    for key, positions in builds_by_key.items():
+        if len(positions) > 1:
+            report['duplicateBuildKeys'].append({'key': list(key), 'ids': [builds[p].get('id') for p in positions]})
+
+    leaves_by_key = defaultdict(list)
+    for entry in dropdown.entries:
+        if entry['hasChildren']:
+            continue
+        leaves_by_key[_key(entry['group'], entry['parent'], entry['text'])].append(entry)
+
+    for key, entries in leaves_by_key.items():
+        if len(entries) > 1:
+            report['duplicateDropdownKeys'].append({'key': list(key), 'paths': [e['path'] for e in entries]})
+        entry = entries[0]
+        positions = builds_by_key.get(key)
+        if positions:
+            build = builds[positions[0]]
+            link = (build.get('link') or '').strip()
+            if entry['url'] and link and entry['url'] != link:
+                report['urlMismatch'].append({'id': build.get('id'), 'path': entry['path'],
+                                              'buildLink': link, 'dropdownUrl': entry['url']})
+            continue
+        # No build under this key: same url under another title means a rename drifted
+        by_url = builds_by_url.get(entry['url']) if entry['url'] else None
+        if by_url:
+            build = builds[by_url[0]]
+            report['titleMismatch'].append({
+                'id': build.get('id'),
+                'path': entry['path'],
+                'build': list(_key(build.get('category'), build.get('subCategory'), build.get('title'))),
+                'dropdown': list(key),
+            })
+        else:
+            report['dropdownWithoutBuild'].append({'key': list(key), 'path': entry['path'], 'url': entry['url']})
+
+    matched_urls = {e['url'] for es in leaves_by_key.values() for e in es if e['url']}
+    for key, positions in builds_by_key.items():
+        if key in leaves_by_key:
+            continue
+        build = builds[positions[0]]
+        if (build.get('link') or '').strip() in matched_urls:
+            # already reported as titleMismatch from the dropdown side
+            continue
+        report['buildsWithoutDropdown'].append({'id': build.get('id'), 'key': list(key)})
+
+    return report
+
+
+def issue_count(report):
+    return sum(len(v) for v in report.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cross-check builds.json against the nav dropdown.')
+    parser.add_argument('--builds', default=DEFAULT_BUILDS)
+    parser.add_argument('--dropdowns', default=DEFAULT_SOURCE)
+    parser.add_argument('--json', action='store_true', help='print the full report as JSON')
+    parser.add_argument('--no-persist', action='store_true', help="don't read/write the dropdown index cache")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    with open(args.builds, encoding='utf-8') as fh:
+        builds = json.load(fh)
+    dropdown = DropdownIndex.load(args.dropdowns, persist=not args.no_persist)
+    report = cross_check(builds, dropdown)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    total = issue_count(report)
+    if args.json:
+        print(json.dumps({'issues': total, 'elapsedMs': round(elapsed_ms, 2), 'report': report},
+                         indent=2, ensure_ascii=False))
+    else:
+        for section, items in report.items():
+            for item in items:
+                print(f"{section}: {json.dumps(item, ensure_ascii=False)}")
+        print(f"{total} issue(s) in {elapsed_ms:.1f} ms")
+    return 1 if total else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
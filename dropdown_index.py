@@ -0,0 +1,147 @@
+import json
+import os
+import sys
+from collections import defaultdict
+
+DEFAULT_SOURCE = 'test/dropdowns.json'
+INDEX_VERSION = 1
+
+
+def index_path_for(source):
+    root, _ = os.path.splitext(source)
+    return f"{root}.index.json"
+
+
+def _walk(links, prefix, group, parent, out):
+    if not isinstance(links, list):
+        return
+    for idx, item in enumerate(links):
+        path = f"{prefix}[{idx}]"
+        if isinstance(item, list):
+            _walk(item, path, group, parent, out)
+        elif isinstance(item, dict):
+            text = (item.get('text') or '').strip()
+            url = (item.get('url') or '').strip()
+            children = item.get('children')
+            out.append({
+                'path': path,
+                'group': group,
+                'parent': parent,
+                'text': text,
+                'url': url,
+                'hasChildren': bool(children),
+            })
+            if children:
+                _walk(children, f"{path}.children", group, text, out)
+
+
+def extract_entries(data):
+    """Flatten the dropdown tree into one entry per link (including nested children)."""
+    entries = []
+    for i, group in enumerate(data if isinstance(data, list) else []):
+        if not isinstance(group, dict):
+            continue
+        _walk(group.get('links', []), f"[{i}].links", (group.get('title') or '').strip(), None, entries)
+    return entries
+
+
+class DropdownIndex:
+    """text/url -> locations map over the dropdown tree, built once and persisted next to the JSON."""
+
+    def __init__(self, entries, source=None, stamp=None):
+        self.source = source
+        self.stamp = stamp
+        self.entries = entries
+        self.by_text = defaultdict(list)
+        self.by_url = defaultdict(list)
+        for pos, entry in enumerate(entries):
+            if entry['text']:
+                self.by_text[entry['text']].append(pos)
+            if entry['url']:
+                self.by_url[entry['url']].append(pos)
+
+    @classmethod
+    def load(cls, source=DEFAULT_SOURCE, persist=True):
+        """Use the persisted index when it matches the source's mtime/size, else rebuild it."""
+        st = os.stat(source)
+        stamp = [st.st_mtime_ns, st.st_size]
+        cache_file = index_path_for(source)
+        if persist:
+            try:
+                with open(cache_file, encoding='utf-8') as fh:
+                    cached = json.load(fh)
+                if cached.get('version') == INDEX_VERSION and cached.get('stamp') == stamp:
+                    return cls(cached['entries'], source, stamp)
+            except (OSError, ValueError, KeyError):
+                pass
+        with open(source, encoding='utf-8') as fh:
+            data = json.load(fh)
+        index = cls(extract_entries(data), source, stamp)
+        if persist:
+            index.save(cache_file)
+        return index
+
+    def save(self, cache_file=None):
+        cache_file = cache_file or index_path_for(self.source)
+        tmp = f"{cache_file}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            json.dump({'version': INDEX_VERSION, 'stamp': self.stamp, 'entries': self.entries},
+                      fh, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, cache_file)
+
+    def lookup(self, text):
+        """Paths where a link with this exact text lives, e.g. ['[0].links[0]', ...]."""
+        return [self.entries[p]['path'] for p in self.by_text.get(text, [])]
+
+    def locations(self, text=None, url=None):
+        positions = self.by_text.get(text, []) if text is not None else self.by_url.get(url, [])
+        return [self.entries[p] for p in positions]
+
+    def duplicates(self):
+        """
+        Same text twice under the same parent, and the same url used by differently named links.
+        Repeating a build name across groups (Bleed Rapier in M1/M2 and GORGON) is expected.
+        """
+        dup_text = []
+        for text, positions in self.by_text.items():
+            seen = defaultdict(list)
+            for p in positions:
+                e = self.entries[p]
+                seen[(e['group'], e['parent'])].append(e['path'])
+            for (group, parent), paths in seen.items():
+                if len(paths) > 1:
+                    dup_text.append({'text': text, 'group': group, 'parent': parent, 'paths': paths})
+        dup_url = []
+        for url, positions in self.by_url.items():
+            positions = [p for p in positions if not self.entries[p]['hasChildren']]
+            texts = {self.entries[p]['text'] for p in positions}
+            if len(texts) > 1:
+                dup_url.append({'url': url, 'texts': sorted(texts), 'paths': [self.entries[p]['path'] for p in positions]})
+        return {'text': dup_text, 'url': dup_url}
+
+    def missing_links(self):
+        """Leaf entries without a usable url."""
+        return [e for e in self.entries
+                if not e['hasChildren'] and not e['url'].startswith(('http://', 'https://'))]
+
+    def missing_texts(self, texts):
+        """Which of `texts` (e.g. every build title) have no dropdown entry at all."""
+        return [t for t in texts if t not in self.by_text]
+
+
+def main(argv):
+    source = DEFAULT_SOURCE
+    args = list(argv)
+    if args and args[0].endswith('.json'):
+        source = args.pop(0)
+    index = DropdownIndex.load(source)
+    if not args:
+        print(json.dumps({'duplicates': index.duplicates(), 'missing': index.missing_links()}, indent=2, ensure_ascii=False))
+        return 0
+    for text in args:
+        print(f"{text}: {index.lookup(text)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
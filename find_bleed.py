@@ -1,20 +1,5 @@
-import json
-from collections import defaultdict
+from dropdown_index import DropdownIndex
 
-data = json.load(open('test/dropdowns.json', encoding='utf-8'))
-locations = defaultdict(list)
+index = DropdownIndex.load('test/dropdowns.json')
 
-def walk_links(links, prefix):
-    if isinstance(links, list):
-        for idx, item in enumerate(links):
-            if isinstance(item, dict):
-                text = item.get('text')
-                if text:
-                    locations[text].append(f"{prefix}[{idx}]")
-            elif isinstance(item, list):
-                walk_links(item, f"{prefix}[{idx}]")
-
-for i, group in enumerate(data):
-    walk_links(group.get('links', []), f"[{i}].links")
-
-print(locations.get('Bleed Rapier'))
+print(index.lookup('Bleed Rapier'))
@@ -0,0 +1,409 @@
+"""
+Scrape newworldnews.org weekly mutation articles into public/mutations_data.json.
+
+    python test/mutation_scraper.py URL [URL ...] --out public/mutations_data.json
+    python test/mutation_scraper.py URL [URL ...] --fixtures test/newworldnews_fixtures
+
+URLs are given newest first. With --fixtures, each article is read from
+<fixtures>/<slug>.html instead of the network. Weaknesses, artifacts and difficulty
+aren't in the articles; they are carried over from the records already in --out
+(unless --no-merge).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from selectolax.parser import HTMLParser as _SelectolaxParser
+except ImportError:
+    _SelectolaxParser = None
+
+try:
+    import lxml.html as _lxml_html
+except ImportError:
+    _lxml_html = None
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/124.0.0.0 Safari/537.36"
+}
+TAXONOMY_CLASS = "wpr-post-info-taxonomy"
+TAG_SELECTOR = 'a[rel="tag"], a[href*="/tag/"], a[href*="/category/"]'
+DEFAULT_CACHE = os.path.join(os.path.dirname(__file__), ".mutation_cache.json")
+SOURCE_LABEL = "newworldnews.org HTML scraping"
+
+EXPEDITIONS = {
+    "Amrine Excavation", "Starstone Barrows", "The Depths", "Dynasty Shipyard",
+    "Garden of Genesis", "Lazarus Instrumentality", "Barnacles and Black Powder",
+    "Tempest's Heart", "The Ennead", "Empyrean Forge", "The Savage Divide",
+    "Glacial Tarn", "Ennead",
+}
+
+# Values build_records writes when the article doesn't say; a merge keeps what the existing file has
+PLACEHOLDERS = {"weaknesses": [], "artifact": "Unknown Artifact", "difficulty": "Unknown"}
+_TAG_DELIMITERS = " \t\r\n/>"
+
+Tag = Dict[str, str]
+
+
+def _is_tag_href(rel: Optional[str], href: str) -> bool:
+    return "tag" in (rel or "").split() or "/tag/" in href or "/category/" in href
+
+
+def _find_tag(lower: str, token: str, pos: int) -> int:
+    """Next `token` ("<b", "</b") followed by a delimiter, so "<b" doesn't match "<br" or "<body"."""
+    while True:
+        hit = lower.find(token, pos)
+        if hit == -1:
+            return -1
+        end = hit + len(token)
+        if end >= len(lower) or lower[end] in _TAG_DELIMITERS:
+            return hit
+        pos = end
+
+
+def _element_end(html: str, start: int) -> int:
+    """Index just past the element opened at `start`, balancing same-name tags."""
+    name_end = start + 1
+    while name_end < len(html) and (html[name_end].isalnum() or html[name_end] == "-"):
+        name_end += 1
+    name = html[start + 1:name_end].lower()
+    if not name:
+        return -1
+    lower = html.lower()
+    open_tok, close_tok = f"<{name}", f"</{name}"
+    depth = 0
+    pos = start
+    while True:
+        nxt_open = _find_tag(lower, open_tok, pos)
+        nxt_close = _find_tag(lower, close_tok, pos)
+        if nxt_close == -1:
+            return -1
+        if nxt_open != -1 and nxt_open < nxt_close:
+            depth += 1
+            pos = nxt_open + len(open_tok)
+            continue
+        depth -= 1
+        pos = lower.find(">", nxt_close) + 1
+        if depth == 0 or pos == 0:
+            return pos if pos else -1
+
+
+def _slice_taxonomy(html: str) -> str:
+    """Cut the document down to the taxonomy elements before handing it to a parser."""
+    pieces: List[str] = []
+    pos = 0
+    while True:
+        hit = html.find(TAXONOMY_CLASS, pos)
+        if hit == -1:
+            break
+        start = html.rfind("<", 0, hit)
+        end = _element_end(html, start) if start != -1 else -1
+        if end == -1:
+            break
+        pieces.append(html[start:end])
+        pos = end
+    return "".join(pieces)
+
+
+def _tags_selectolax(fragment: str) -> List[Tag]:
+    tree = _SelectolaxParser(fragment)
+    out: List[Tag] = []
+    for box in tree.css("." + TAXONOMY_CLASS):
+        for a in box.css(TAG_SELECTOR):
+            name = (a.text(strip=True) or "").strip()
+            href = a.attributes.get("href")
+            if name and href:
+                out.append({"name": name, "url": href})
+    return out
+
+
+def _tags_lxml(fragment: str) -> List[Tag]:
+    root = _lxml_html.fromstring(f"<div>{fragment}</div>")
+    out: List[Tag] = []
+    boxes = root.xpath(f'//*[contains(concat(" ", normalize-space(@class), " "), " {TAXONOMY_CLASS} ")]')
+    for box in boxes:
+        for a in box.iter("a"):
+            href = a.get("href") or ""
+            if not _is_tag_href(a.get("rel"), href):
+                continue
+            name = a.text_content().strip()
+            if name and href:
+                out.append({"name": name, "url": href})
+    return out
+
+
+class _AnchorCollector(HTMLParser):
+    """stdlib fallback; the fragment is already limited to the taxonomy elements."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.tags: List[Tag] = []
+        self._href: Optional[str] = None
+        self._text: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "a":
+            return
+        attr = dict(attrs)
+        href = attr.get("href") or ""
+        if _is_tag_href(attr.get("rel"), href):
+            self._href = href
+            self._text = []
+
+    def handle_data(self, data):
+        if self._href is not None:
+            self._text.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._href is not None:
+            name = "".join(self._text).strip()
+            if name and self._href:
+                self.tags.append({"name": name, "url": self._href})
+            self._href = None
+
+
+def _tags_stdlib(fragment: str) -> List[Tag]:
+    collector = _AnchorCollector()
+    collector.feed(fragment)
+    collector.close()
+    return collector.tags
+
+
+def extract_taxonomy_tags(html: str) -> List[Tag]:
+    """Tag links inside `.wpr-post-info-taxonomy`, using selectolax > lxml > stdlib html.parser."""
+    fragment = _slice_taxonomy(html or "")
+    if not fragment:
+        return []
+    if _SelectolaxParser is not None:
+        tags = _tags_selectolax(fragment)
+    elif _lxml_html is not None:
+        tags = _tags_lxml(fragment)
+    else:
+        tags = _tags_stdlib(fragment)
+    seen = set()
+    unique: List[Tag] = []
+    for t in tags:
+        if t["url"] not in seen:
+            seen.add(t["url"])
+            unique.append(t)
+    return unique
+
+
+def _slug_from_url(url: str) -> str:
+    return url.rstrip("/").rsplit("/", 1)[-1]
+
+
+def _week_label(index: int) -> str:
+    if index == 0:
+        return "Current Week"
+    return f"{index} week{'s' if index > 1 else ''} ago"
+
+
+def build_records(url: str, tags: List[Tag], index: int, stamp: str) -> List[Dict[str, Any]]:
+    """One record per expedition tagged on the article, in the mutations_data.json shape."""
+    expeditions = [t["name"] for t in tags if t["name"] in EXPEDITIONS]
+    others = [t["name"] for t in tags if t["name"] not in EXPEDITIONS]
+    mutation_type = ", ".join(others) or _slug_from_url(url).replace("-", " ").title()
+    return [
+        {
+            "expedition": exp,
+            "mutationType": mutation_type,
+            "date": _week_label(index),
+            "difficulty": "Unknown",
+            "weaknesses": [],
+            "artifact": "Unknown Artifact",
+            "lastUpdated": stamp,
+            "sourceUrl": url,
+        }
+        for exp in expeditions
+    ]
+
+
+# ---- result cache (URL + ETag) ----
+def load_cache(path: str) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(path: str, cache: Dict[str, Dict[str, Any]]) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(cache, fh, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+async def _fetch_one(session, url: str, cached: Optional[Dict[str, Any]], sem: asyncio.Semaphore) -> Tuple[str, Optional[Dict[str, Any]]]:
+    import aiohttp
+
+    headers = dict(HEADERS)
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("lastModified"):
+            headers["If-Modified-Since"] = cached["lastModified"]
+    async with sem:
+        try:
+            timeout = aiohttp.ClientTimeout(total=20)
+            async with session.get(url, headers=headers, timeout=timeout) as resp:
+                if resp.status == 304 and cached:
+                    return url, cached
+                if resp.status >= 400:
+                    print(f"[mutations] {url}: HTTP {resp.status}", file=sys.stderr)
+                    return url, cached
+                body = await resp.read()
+                etag = resp.headers.get("ETag")
+                last_mod = resp.headers.get("Last-Modified")
+        except Exception as e:
+            print(f"[mutations] {url}: {e}", file=sys.stderr)
+            return url, cached
+    digest = hashlib.sha1(body).hexdigest()
+    if cached and cached.get("sha1") == digest:
+        entry = dict(cached, etag=etag, lastModified=last_mod)
+        return url, entry
+    html = body.decode("utf-8", errors="replace")
+    # parsing is CPU-bound; keep the event loop free for the other downloads
+    tags = await asyncio.get_running_loop().run_in_executor(None, extract_taxonomy_tags, html)
+    return url, {"etag": etag, "lastModified": last_mod, "sha1": digest, "tags": tags}
+
+
+async def fetch_articles(urls: Iterable[str], cache: Dict[str, Dict[str, Any]], concurrency: int = 6) -> Dict[str, Optional[Dict[str, Any]]]:
+    import aiohttp
+
+    sem = asyncio.Semaphore(max(1, concurrency))
+    async with aiohttp.ClientSession() as session:
+        results = await asyncio.gather(*(_fetch_one(session, u, cache.get(u), sem) for u in urls))
+    return dict(results)
+
+
+def read_fixtures(urls: Iterable[str], fixtures_dir: str) -> Dict[str, Optional[Dict[str, Any]]]:
+    out: Dict[str, Optional[Dict[str, Any]]] = {}
+    for url in urls:
+        path = os.path.join(fixtures_dir, f"{_slug_from_url(url)}.html")
+        try:
+            with open(path, encoding="utf-8") as fh:
+                out[url] = {"tags": extract_taxonomy_tags(fh.read())}
+        except OSError:
+            out[url] = None
+    return out
+
+
+def _previous_record(record: Dict[str, Any], existing: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    The record in `existing` that `record` regenerates: same expedition and article, or, for
+    records written before sourceUrl was kept, same expedition and mutation type or week label.
+    """
+    same = [r for r in existing if r.get("expedition") == record["expedition"]]
+    for r in same:
+        if r.get("sourceUrl") == record["sourceUrl"]:
+            return r
+    legacy = [r for r in same if not r.get("sourceUrl")]
+    for field in ("mutationType", "date"):
+        for r in legacy:
+            if r.get(field) == record[field]:
+                return r
+    return None
+
+
+def merge_record(record: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """`record` with the placeholder fields, and fields it doesn't have, taken from `previous`."""
+    if not previous:
+        return record
+    merged = dict(previous)
+    for key, value in record.items():
+        if key in PLACEHOLDERS and value == PLACEHOLDERS[key] and key in previous:
+            continue
+        merged[key] = value
+    return merged
+
+
+def load_existing(path: str) -> List[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return []
+    rows = data.get("data") if isinstance(data, dict) else None
+    return [r for r in rows or [] if isinstance(r, dict)]
+
+
+def build_mutations_data(
+    urls: List[str], parsed: Dict[str, Optional[Dict[str, Any]]], now: Optional[datetime] = None,
+    existing: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    mutations_data.json for `urls`. Records regenerated from `existing` (the current file's
+    "data") keep the weaknesses, artifact, difficulty and any other fields the articles don't carry.
+    A URL that couldn't be fetched or parsed keeps its existing records as they are. Not a
+    success when no URL could be read.
+    """
+    stamp = (now or datetime.now(timezone.utc)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    existing = existing or []
+    records: List[Dict[str, Any]] = []
+    read = 0
+    for i, url in enumerate(urls):
+        entry = parsed.get(url)
+        if entry:
+            read += 1
+            for record in build_records(url, entry.get("tags") or [], i, stamp):
+                records.append(merge_record(record, _previous_record(record, existing)))
+        else:
+            records.extend(r for r in existing if r.get("sourceUrl") == url)
+    return {
+        "success": bool(records) and read > 0,
+        "data": records,
+        "count": len(records),
+        "lastFetched": stamp,
+        "source": SOURCE_LABEL,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Scrape weekly mutation articles into mutations_data.json")
+    parser.add_argument("urls", nargs="+", help="article URLs, newest first")
+    parser.add_argument("--out", default="public/mutations_data.json")
+    parser.add_argument("--fixtures", help="read <slug>.html from this directory instead of fetching")
+    parser.add_argument("--cache", default=DEFAULT_CACHE)
+    parser.add_argument("--concurrency", type=int, default=6)
+    parser.add_argument("--no-merge", action="store_true", help="don't keep fields from the existing --out file")
+    args = parser.parse_args(argv)
+
+    if args.fixtures:
+        parsed = read_fixtures(args.urls, args.fixtures)
+    else:
+        cache = load_cache(args.cache)
+        parsed = asyncio.run(fetch_articles(args.urls, cache, args.concurrency))
+        cache.update({u: e for u, e in parsed.items() if e})
+        save_cache(args.cache, cache)
+
+    existing = [] if args.no_merge else load_existing(args.out)
+    payload = build_mutations_data(args.urls, parsed, existing=existing)
+    for url in args.urls:
+        if not parsed.get(url):
+            print(f"could not read {url}; kept its existing records", file=sys.stderr)
+    if not payload["success"]:
+        print(f"nothing scraped; left {args.out} unchanged", file=sys.stderr)
+        return 1
+    tmp = f"{args.out}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh, ensure_ascii=False, indent=2)
+    os.replace(tmp, args.out)
+    print(f"wrote {payload['count']} record(s) to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
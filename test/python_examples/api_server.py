@@ -0,0 +1,273 @@
+"""
+HTTP front end for NWDBService, so the site and the bot share one warm cache.
+
+    GET /api/search?q=iron&limit=25              search_items
+    GET /api/items/{item_id}                     build_item_info
+    GET /api/perks/{item_type}?q=&limit=25       search_perks_for_item_type
+    GET /api/artifacts/{item_id}/objectives      fetch_artifact_objectives
+    GET /api/stats                               response cache, scheduler and connection counters
+
+Bodies are {"data": ...}; failures are {"error": ...} with a 4xx/5xx status and are not cached.
+Each successful response is encoded once, together with gzip (and brotli, when installed)
+copies, and kept for `cache_ttl` seconds or until the data it was built from moves on: the
+version of the catalog, perk list or objective tasks behind it (NWDBService.data_version,
+plus shared catalog remaps), or the detail payload hash for item details. Versions are read
+after the response is built, since building it may load that data. Perk searches over a
+partial perk list are served but not kept. The
+ETag is a hash of the body, so a client revalidating with If-None-Match gets a 304 from the
+cached entry without the service being called. Identical requests arriving while a response
+is being built wait for that one build.
+
+    python -m services.api_server --port 8080 --shared /dev/shm/nwdb.cat
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from aiohttp import web
+from utils.cache import TTLCache
+
+from .nwdb_service import NWDBService
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional
+    brotli = None
+
+CACHE_CONTROL = "public, max-age=60"
+# Empty results (no matches, objectives that failed to resolve) are kept briefly
+EMPTY_TTL = 30
+# Bodies smaller than this go out uncompressed
+MIN_COMPRESS = 512
+
+
+class _Entry(NamedTuple):
+    version: Any
+    status: int
+    etag: str
+    body: bytes
+    gzip: Optional[bytes]
+    br: Optional[bytes]
+
+
+def _encode(payload: Any) -> bytes:
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _accepts(header: str) -> Dict[str, float]:
+    out = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            out[name.strip().lower()] = q
+    return out
+
+
+def _int_param(request: web.Request, name: str, default: int, lo: int, hi: int) -> int:
+    raw = request.query.get(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        return min(hi, max(lo, int(raw)))
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"{name} must be an integer")
+
+
+class APIServer:
+    def __init__(self, service: NWDBService, cache_ttl: float = 300, allow_origin: Optional[str] = "*"):
+        self.service = service
+        self.cache_ttl = cache_ttl
+        self.allow_origin = allow_origin
+        self.responses = TTLCache(cache_ttl)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {"hits": 0, "built": 0, "coalesced": 0, "notModified": 0}
+
+    def _data_version(self, dataset: str) -> Callable[[], Tuple[int, int]]:
+        svc = self.service
+        return lambda: (svc.data_version(dataset), svc.shared.remaps if svc.shared is not None else 0)
+
+    def _build_entry(self, version: Any, status: int, payload: Any) -> _Entry:
+        body = _encode(payload)
+        gz = br = None
+        if status == 200 and len(body) >= MIN_COMPRESS:
+            gz = gzip.compress(body, compresslevel=6, mtime=0)
+            if brotli is not None:
+                br = brotli.compress(body, quality=6)
+        etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        return _Entry(version, status, etag, body, gz, br)
+
+    async def _build(
+        self, key: str, version: Callable[[], Any], produce: Callable[[], Awaitable[Tuple[int, Any, bool]]],
+    ) -> _Entry:
+        status, payload, complete = await produce()
+        entry = self._build_entry(version(), status, payload)
+        self.stats["built"] += 1
+        if status == 200 and complete:
+            empty = not (payload.get("data") if isinstance(payload, dict) else payload)
+            self.responses.set(key, entry, ttl=EMPTY_TTL if empty else self.cache_ttl)
+        return entry
+
+    def _build_done(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()
+
+    async def _cached(
+        self, key: str, version: Callable[[], Any], produce: Callable[[], Awaitable[Tuple[int, Any, bool]]],
+        hot: Optional[Tuple[str, str]] = None,
+    ) -> _Entry:
+        """
+        Cached entry for `key` built at the current `version()`, else the result of one shared
+        `produce()` call, which returns (status, payload, complete); incomplete ones aren't kept.
+        `hot` is the popularity (kind, key) to record when the service itself isn't called.
+        """
+        entry = self.responses.get(key)
+        if entry is not None and entry.version == version():
+            self.stats["hits"] += 1
+            if hot is not None:
+                self.service.popularity.hit(*hot)
+            return entry
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._build(key, version, produce))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._build_done(k, t))
+        else:
+            self.stats["coalesced"] += 1
+            if hot is not None:
+                self.service.popularity.hit(*hot)
+        # Shielded so one client disconnecting doesn't cancel the build others are waiting on
+        return await asyncio.shield(task)
+
+    def _send(self, request: web.Request, entry: _Entry) -> web.Response:
+        headers = {"Vary": "Accept-Encoding"}
+        if self.allow_origin:
+            headers["Access-Control-Allow-Origin"] = self.allow_origin
+            headers["Access-Control-Expose-Headers"] = "ETag"
+        if entry.status != 200:
+            headers["Cache-Control"] = "no-store"
+            return web.Response(status=entry.status, body=entry.body, content_type="application/json", headers=headers)
+        headers["ETag"] = entry.etag
+        headers["Cache-Control"] = CACHE_CONTROL
+        if _etag_matches(request.headers.get("If-None-Match"), entry.etag):
+            self.stats["notModified"] += 1
+            return web.Response(status=304, headers=headers)
+        body = entry.body
+        accepts = _accepts(request.headers.get("Accept-Encoding", ""))
+        if entry.br is not None and accepts.get("br", 0) > 0:
+            body, headers["Content-Encoding"] = entry.br, "br"
+        elif entry.gzip is not None and accepts.get("gzip", 0) > 0:
+            body, headers["Content-Encoding"] = entry.gzip, "gzip"
+        return web.Response(body=body, content_type="application/json", headers=headers)
+
+    async def search(self, request: web.Request) -> web.Response:
+        q = (request.query.get("q") or "").strip().lower()
+        limit = _int_param(request, "limit", 25, 1, 25)
+
+        async def produce():
+            return 200, {"data": await self.service.search_items(q, limit)}, True
+
+        return self._send(request, await self._cached(f"search:{limit}:{q}", self._data_version("items"), produce))
+
+    async def item(self, request: web.Request) -> web.Response:
+        item_id = request.match_info["item_id"].strip()
+        svc = self.service
+
+        async def produce():
+            info = (await svc.get_items_details_batch([item_id])).get(item_id) or {"error": "no item data"}
+            if info.get("error"):
+                return (404 if info["error"] == "HTTP 404" else 502), {"error": info["error"]}, False
+            return 200, {"data": info}, True
+
+        entry = await self._cached(f"item:{item_id}", lambda: svc.item_version(item_id), produce, ("item", item_id))
+        return self._send(request, entry)
+
+    async def perks(self, request: web.Request) -> web.Response:
+        item_type = request.match_info["item_type"].strip().lower()
+        q = (request.query.get("q") or "").strip().lower()
+        limit = _int_param(request, "limit", 25, 1, 25)
+
+        async def produce():
+            rows, complete = await self.service._search_perks(item_type, q, limit)
+            return 200, {"data": rows}, complete
+
+        key = f"perks:{item_type}:{limit}:{q}"
+        version = self._data_version(f"perks:{item_type}")
+        return self._send(request, await self._cached(key, version, produce, ("perks", item_type)))
+
+    async def artifact_objectives(self, request: web.Request) -> web.Response:
+        item_id = request.match_info["item_id"].strip()
+
+        async def produce():
+            return 200, {"data": await self.service.fetch_artifact_objectives(item_id)}, True
+
+        key = f"artifact:{item_id}"
+        version = self._data_version("objective_tasks")
+        return self._send(request, await self._cached(key, version, produce, ("artifact", item_id)))
+
+    async def stats_handler(self, request: web.Request) -> web.Response:
+        svc = self.service
+        return web.json_response({
+            "responses": dict(self.stats),
+            "scheduler": svc.gate.snapshot(),
+            "connections": svc.connection_stats.snapshot(),
+        })
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/api/search", self.search)
+        app.router.add_get("/api/items/{item_id}", self.item)
+        app.router.add_get("/api/perks/{item_type}", self.perks)
+        app.router.add_get("/api/artifacts/{item_id}/objectives", self.artifact_objectives)
+        app.router.add_get("/api/stats", self.stats_handler)
+
+        async def _close(_app: web.Application) -> None:
+            await self.service.close()
+
+        app.on_cleanup.append(_close)
+        return app
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve NWDBService over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--shared", default=None, help="shared_catalog file to search instead of downloading")
+    parser.add_argument("--cache-ttl", type=float, default=300)
+    parser.add_argument("--allow-origin", default="*", help='CORS origin; "" disables the header')
+    args = parser.parse_args(argv)
+
+    shared = None
+    if args.shared:
+        from .shared_catalog import SharedCatalog
+
+        shared = SharedCatalog(args.shared)
+    server = APIServer(NWDBService(shared=shared), cache_ttl=args.cache_ttl, allow_origin=args.allow_origin or None)
+    web.run_app(server.app(), host=args.host, port=args.port, access_log=None)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,207 @@
+"""
+Crafting cost benchmark on a synthetic recipe set: CraftingGraph.resolve over every item,
+then single price changes through set_price versus resolving again. Costs are checked against
+a plain relax-until-stable pass over all recipes; the largest difference should be 0.
+
+The recipe set is tiered like the refining trees: raw materials at tier 0, every later item
+made from a few items of lower tiers (sometimes through a category), a share of items with a
+second recipe, and some reagent conversions that loop between items of the same tier.
+
+With --live, also loads the fixture recipes the way the service does (load_from_service,
+following craftingRecipesOutput through NWDBService.fetch_recipe against the stand-in
+server) and compares their costs with a graph built straight from the fixture payloads;
+exits 1 if any recipe failed or any cost differs.
+
+    python -m services.benchmarks.bench_crafting --items 20000 --updates 500 --live
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..crafting_cost import CraftingGraph
+from . import fixtures as fixture_store
+
+
+def synthetic_recipes(items: int, tiers: int = 6, seed: int = 7) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    per_tier = max(1, items // tiers)
+    ids = [[f"t{t}_{n}" for n in range(per_tier)] for t in range(tiers)]
+    categories = {f"cat{t}_{n}": rng.sample(ids[t], min(4, per_tier)) for t in range(tiers - 1) for n in range(8)}
+    prices = {i: round(rng.uniform(0.05, 2.0) * 5 ** t, 2) for t, tier in enumerate(ids) for i in tier
+              if t == 0 or rng.random() < 0.6}
+    recipes = []
+    for t in range(1, tiers):
+        for i, item in enumerate(ids[t]):
+            for variant in range(1 if rng.random() < 0.8 else 2):
+                ingredients = []
+                for _ in range(rng.randint(2, 4)):
+                    lower = rng.randrange(t)
+                    if rng.random() < 0.15:
+                        cat = f"cat{lower}_{rng.randrange(8)}"
+                        ingredients.append({"id": cat, "type": "category", "quantity": rng.randint(1, 6),
+                                            "subIngredients": [{"id": o, "type": "item"} for o in categories[cat]]})
+                    else:
+                        ingredients.append({"id": rng.choice(ids[lower]), "type": "item", "quantity": rng.randint(1, 6)})
+                recipes.append({"data": {"id": f"r_{item}_{variant}", "output": {"id": item, "quantity": rng.choice((1, 1, 1, 2, 5))},
+                                         "ingredients": ingredients}})
+            if i % 50 == 0 and i + 1 < per_tier:
+                # Conversion loop: item <-> neighbour at the same tier
+                other = ids[t][i + 1]
+                recipes.append({"data": {"id": f"conv_{item}", "output": {"id": item, "quantity": 1},
+                                         "ingredients": [{"id": other, "type": "item", "quantity": 2}]}})
+                recipes.append({"data": {"id": f"conv_{other}", "output": {"id": other, "quantity": 1},
+                                         "ingredients": [{"id": item, "type": "item", "quantity": 2}]}})
+    return {"prices": prices, "recipes": recipes, "ids": [i for tier in ids for i in tier]}
+
+
+def relaxed_costs(graph: CraftingGraph) -> Dict[str, float]:
+    """Reference: sweep every recipe and category until nothing gets cheaper."""
+    cost = dict(graph.prices)
+    while True:
+        moved = False
+        for node, options in graph._options.items():
+            c = min((cost.get(o, math.inf) for o in options), default=math.inf)
+            if c < cost.get(node, math.inf):
+                cost[node], moved = c, True
+        for r in graph.recipes.values():
+            c = sum(q * cost.get(i, math.inf) for i, q in r.ingredients) / r.quantity
+            if c < cost.get(r.output, math.inf):
+                cost[r.output], moved = c, True
+        if not moved:
+            return cost
+
+
+def _max_diff(graph: CraftingGraph, reference: Dict[str, float]) -> float:
+    worst = 0.0
+    for node in graph._nodes():
+        a, b = graph.cost(node), reference.get(node, math.inf)
+        if a != b:
+            worst = max(worst, math.inf if math.inf in (a, b) else abs(a - b) / max(1.0, abs(b)))
+    return worst
+
+
+def fixture_prices(data: Dict[str, Any], seed: int = 7) -> Dict[str, float]:
+    """Buy prices for the fixture recipes: every raw material and about half the items."""
+    rng = random.Random(seed)
+    prices: Dict[str, float] = {}
+    for raw in data["recipes"].values():
+        for ing in raw["data"]["ingredients"]:
+            for o in ing.get("subIngredients") or [ing]:
+                if o["id"].startswith("raw_"):
+                    prices.setdefault(o["id"], round(rng.uniform(1, 20), 2))
+    for iid, raw in sorted(data["items"].items()):
+        if rng.random() < 0.5:
+            prices[iid] = float(raw["data"]["price"]["BuyCurrencyCost"])
+    return prices
+
+
+async def _live_graph(data: Dict[str, Any], prices: Dict[str, float]) -> Tuple[CraftingGraph, List[str], int]:
+    from ..crafting_cost import load_from_service
+    from ..nwdb_service import NWDBService
+    from .standin_server import StandInServer
+
+    server = StandInServer(data)
+    base = server.start_in_thread()
+    try:
+        async with NWDBService(api_base=base, nwbuddy_base=base) as service:
+            graph, failed = await load_from_service(service, data["items"], CraftingGraph(prices))
+            return graph, failed, server.requests
+    finally:
+        server.stop_thread()
+
+
+def live_costs(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Costs of the service-loaded graph against one built from the fixture payloads."""
+    prices = fixture_prices(data)
+    graph, failed, requests = asyncio.run(_live_graph(data, prices))
+    direct = CraftingGraph(prices)
+    for raw in data["recipes"].values():
+        direct.add_payload(raw)
+    nodes = graph._nodes() | direct._nodes()
+    return {
+        "liveRequests": requests,
+        "liveRecipes": len(graph.recipes),
+        "fixtureRecipes": len(direct.recipes),
+        "liveFailed": len(failed),
+        "liveUnstable": len(graph.unstable),
+        "liveMaxDiff": _max_diff(graph, {n: direct.cost(n) for n in nodes}),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Crafting cost: full resolve vs incremental price updates")
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--updates", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--fixtures", default=fixture_store.DEFAULT_DIR)
+    parser.add_argument("--live", action="store_true", help="also check the live loading path (see module docstring)")
+    args = parser.parse_args(argv)
+
+    data = synthetic_recipes(args.items, seed=args.seed)
+    t0 = time.perf_counter()
+    graph = CraftingGraph(data["prices"])
+    for raw in data["recipes"]:
+        graph.add_payload(raw)
+    load = time.perf_counter() - t0
+
+    best_first = best_resolve = float("inf")
+    for _ in range(args.repeat):
+        graph._components = None
+        t0 = time.perf_counter()
+        graph.resolve()
+        best_first = min(best_first, time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        graph.resolve()
+        best_resolve = min(best_resolve, time.perf_counter() - t0)
+    resolve_diff = _max_diff(graph, relaxed_costs(graph))
+
+    rng = random.Random(args.seed + 1)
+    priced = sorted(graph.prices)
+    evaluated = graph.stats["evaluated"]
+    changed = 0
+    t0 = time.perf_counter()
+    for _ in range(args.updates):
+        item = rng.choice(priced)
+        changed += len(graph.set_price(item, graph.prices[item] * rng.uniform(0.5, 1.5)))
+    incremental = time.perf_counter() - t0
+    evaluated = graph.stats["evaluated"] - evaluated
+    update_diff = _max_diff(graph, relaxed_costs(graph))
+
+    live: Dict[str, Any] = {}
+    if args.live:
+        fixtures_dir = fixture_store.ensure(args.fixtures) if args.fixtures == fixture_store.DEFAULT_DIR else args.fixtures
+        live = live_costs(fixture_store.load(fixtures_dir))
+
+    nodes = len(graph)
+    per_update = incremental / max(1, args.updates)
+    print(json.dumps({
+        "items": len(data["ids"]),
+        "recipes": len(graph.recipes),
+        "nodes": nodes,
+        "craftable": len(graph.craftable()),
+        "components": len(graph._components),
+        "loadMs": round(load * 1000, 2),
+        "firstResolveMs": round(best_first * 1000, 2),
+        "resolveMs": round(best_resolve * 1000, 2),
+        "updates": args.updates,
+        "updateMs": round(per_update * 1000, 4),
+        "speedupVsResolve": round(best_resolve / per_update, 1) if per_update else None,
+        "evaluatedPerUpdate": round(evaluated / max(1, args.updates), 1),
+        "changedPerUpdate": round(changed / max(1, args.updates), 1),
+        "maxDiffResolve": resolve_diff,
+        "maxDiffAfterUpdates": update_diff,
+        **live,
+    }, indent=2))
+    if live and (live["liveFailed"] or live["liveMaxDiff"] or live["liveRecipes"] != live["fixtureRecipes"]):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
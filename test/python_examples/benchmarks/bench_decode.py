@@ -0,0 +1,95 @@
+"""
+Decode benchmark for the json_codec backends.
+
+For each large payload shape (search dump, objective tasks datatable, a full perk page set,
+an items-by-perk page, an item detail) reports the best-of-N decode time and the tracemalloc
+peak for every installed backend, typed (SCHEMAS) and untyped.
+
+    python -m services.benchmarks.bench_decode --repeat 5
+"""
+from __future__ import annotations
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+from ..json_codec import BACKENDS, SCHEMAS
+from . import fixtures as fixture_store
+
+
+def payloads(data: Dict[str, Any]) -> Dict[str, bytes]:
+    """Endpoint label -> response body, built from a fixture set."""
+    perks = max(data["perks"].values(), key=len)
+    by_perk = max(data["items_by_perk"].values(), key=len)
+    item = max(data["items"].values(), key=lambda p: len(p["data"].get("monstersWithDrop") or []))
+    bodies = {
+        "search_all": data["search_all"],
+        "nwbuddy_objective_tasks": data["objective_tasks"],
+        "perks_page": {"pageCount": 1, "data": perks},
+        "items_by_perk": {"pageCount": 1, "data": by_perk},
+        "item": item,
+    }
+    return {k: json.dumps(v).encode() for k, v in bodies.items()}
+
+
+def measure(decode, body: bytes, repeat: int) -> Dict[str, float]:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        decode(body)
+        best = min(best, time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = decode(body)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {"ms": round(best * 1000, 3), "peakMiB": round(peak / 2**20, 2)}
+
+
+def run(fixtures_dir: str, repeat: int, backends: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    bodies = payloads(fixture_store.load(fixtures_dir))
+    rows = []
+    for name in backends or list(BACKENDS):
+        decoder = BACKENDS[name]()
+        for endpoint, body in bodies.items():
+            schema = SCHEMAS.get(endpoint)
+            rows.append({
+                "payload": endpoint, "backend": name, "typed": False, "bytes": len(body),
+                **measure(lambda b: decoder.decode(b), body, repeat),
+            })
+            if schema is not None and name == "msgspec":
+                rows.append({
+                    "payload": endpoint, "backend": name, "typed": True, "bytes": len(body),
+                    **measure(lambda b: decoder.decode(b, schema), body, repeat),
+                })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Decode time and peak memory per JSON backend")
+    parser.add_argument("--fixtures", default=fixture_store.DEFAULT_DIR)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--backend", action="append", choices=sorted(BACKENDS))
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.fixtures == fixture_store.DEFAULT_DIR:
+        fixture_store.ensure(args.fixtures)
+    rows = run(args.fixtures, args.repeat, args.backend)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+    cols = ("payload", "backend", "typed", "bytes", "ms", "peakMiB")
+    print("  ".join(f"{c:>24}" if i == 0 else f"{c:>9}" for i, c in enumerate(cols)))
+    for r in rows:
+        print("  ".join(f"{str(r[c]):>24}" if i == 0 else f"{str(r[c]):>9}" for i, c in enumerate(cols)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,126 @@
+"""
+Import-time check for the service modules.
+
+Each module is imported in a fresh interpreter under `python -X importtime`; the report
+gives its cumulative import time and how many modules ended up loaded. Modules in
+LIGHT must not load an HTTP stack or optional decoder; with --check a violation, or a
+module over --budget-ms, exits non-zero so CI can track it.
+
+    python -m services.benchmarks.bench_import --check --budget-ms 150
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+PACKAGE = __package__.rsplit(".", 1)[0] if __package__ else "services"
+
+LIGHT = (
+    "description_templates",
+    "item_data_service",
+    "loot_tags",
+    "memory_stats",
+    "query_cache",
+    "request_scheduler",
+    "shared_catalog",
+    "pagination",
+    "popularity",
+    "json_codec",
+    "nwdb_metrics",
+    "build_catalog_service",
+    "change_feed",
+    "drop_index",
+    "static_export",
+    "crafting_cost",
+    "http_session",
+    "nwdb_service",
+)
+HEAVY = ("aiohttp", "requests", "urllib3", "bs4", "orjson", "msgspec", "artifact_objective_service")
+
+_PROBE = (
+    "import json, sys\n"
+    "__import__(sys.argv[1])  # importlib.import_module bypasses -X importtime\n"
+    "print(json.dumps(sorted(sys.modules)))\n"
+)
+
+
+def _parse_importtime(stderr: str) -> Dict[str, int]:
+    """{module: cumulative_us} from -X importtime output."""
+    out: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if len(parts) != 3 or not parts[1].isdigit():
+            continue
+        out[parts[2]] = int(parts[1])
+    return out
+
+
+def measure(module: str) -> Dict[str, Any]:
+    qualified = f"{PACKAGE}.{module}"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE, qualified],
+        capture_output=True, text=True, env=env,
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["?"]
+        return {"module": module, "error": tail[0]}
+    times = _parse_importtime(proc.stderr)
+    loaded = json.loads(proc.stdout.strip().splitlines()[-1])
+    heavy = sorted({
+        h for h in HEAVY for name in loaded
+        if name == h or name.startswith(h + ".") or name == f"{PACKAGE}.{h}"
+    })
+    return {
+        "module": module,
+        "cumulativeMs": round(times.get(qualified, 0) / 1000, 2),
+        "modulesLoaded": len(loaded),
+        "heavy": heavy,
+    }
+
+
+def run(modules: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    return [measure(m) for m in modules or LIGHT]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import time and heavy-dependency check per module")
+    parser.add_argument("--module", action="append", help="module name inside the package (default: LIGHT)")
+    parser.add_argument("--check", action="store_true", help="exit 1 on heavy imports or budget overruns")
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    rows = run(args.module)
+    failures = []
+    for r in rows:
+        if r.get("error"):
+            failures.append(f"{r['module']}: {r['error']}")
+        elif r["heavy"]:
+            failures.append(f"{r['module']}: loads {', '.join(r['heavy'])}")
+        elif args.budget_ms is not None and r["cumulativeMs"] > args.budget_ms:
+            failures.append(f"{r['module']}: {r['cumulativeMs']}ms > {args.budget_ms}ms")
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        for r in rows:
+            if r.get("error"):
+                print(f"{r['module']:>24}  ERROR {r['error']}")
+            else:
+                heavy = f"  heavy: {', '.join(r['heavy'])}" if r["heavy"] else ""
+                print(f"{r['module']:>24}  {r['cumulativeMs']:>8.2f}ms  {r['modulesLoaded']:>4} modules{heavy}")
+    if args.check and failures:
+        for f in failures:
+            print(f"FAIL {f}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
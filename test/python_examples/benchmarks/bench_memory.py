@@ -0,0 +1,96 @@
+"""
+Memory footprint of a warmed NWDBService over the fixture data.
+
+Fills the caches the way a bot does (catalog search, item detail batches, perk searches
+for every item type, artifact objectives) against the local stand-in server, then prints
+NWDBService.memory_report() and, with --trace, the MemoryProbe delta of each refresh and
+batch. --save writes the report; --baseline compares against a saved one and exits 1 when
+a cache group, an index or the total grew by more than --max-growth.
+
+    python -m services.benchmarks.bench_memory --items 2000 --save mem.json
+    python -m services.benchmarks.bench_memory --items 2000 --baseline mem.json --max-growth 0.1
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import random
+from typing import Any, Dict, List, Optional
+
+from ..memory_stats import MemoryProbe, compare_reports
+from ..nwdb_service import NWDBService
+from . import fixtures as fixture_store
+from .standin_server import StandInServer
+
+
+async def warm(data: Dict[str, Any], base_url: str, n_items: int, n_artifacts: int, probe: Optional[MemoryProbe],
+               seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    item_ids = list(data["items"])
+    async with NWDBService(api_base=base_url, nwbuddy_base=base_url, memory_probe=probe) as svc:
+        await svc.search_items("a")
+        ids = rng.sample(item_ids, min(n_items, len(item_ids)))
+        for start in range(0, len(ids), 100):
+            await svc.get_items_details_batch(ids[start:start + 100], concurrency=16)
+        for item_type in data["perks"]:
+            await svc.search_perks_for_item_type(item_type, "a")
+        for item_id in rng.sample(item_ids, min(n_artifacts, len(item_ids))):
+            await svc.fetch_artifact_objectives(item_id)
+        return svc.memory_report()
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    print(f"{'cache prefix':>24}  {'keys':>7}  {'negative':>8}  {'bytes':>12}")
+    for prefix, row in report["cache"].items():
+        print(f"{prefix:>24}  {row['keys']:>7}  {row['negative']:>8}  {row['bytes']:>12,}")
+    print(f"{'index':>24}  {'':>7}  {'':>8}  {'bytes':>12}")
+    for name, size in report["indexes"].items():
+        print(f"{name:>24}  {'':>7}  {'':>8}  {size:>12,}")
+    print(f"{'total':>24}  {'':>7}  {'':>8}  {report['totalBytes']:>12,}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Memory report of a warmed NWDBService")
+    parser.add_argument("--items", type=int, default=1000, help="item details to fetch")
+    parser.add_argument("--artifacts", type=int, default=50, help="artifact objective lookups")
+    parser.add_argument("--trace", action="store_true", help="tracemalloc deltas per refresh / batch")
+    parser.add_argument("--save", default=None)
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--max-growth", type=float, default=0.2)
+    parser.add_argument("--fixtures", default=fixture_store.DEFAULT_DIR)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    fixtures_dir = fixture_store.ensure(args.fixtures) if args.fixtures == fixture_store.DEFAULT_DIR else args.fixtures
+    data = fixture_store.load(fixtures_dir)
+    server = StandInServer(data)
+    base_url = server.start_in_thread()
+    probe = MemoryProbe(top=5) if args.trace else None
+    try:
+        report = asyncio.run(warm(data, base_url, args.items, args.artifacts, probe, args.seed))
+    finally:
+        server.stop_thread()
+    if probe is not None:
+        report["probes"] = list(probe.by_label().values())
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+        for r in report.get("probes", []):
+            print(f"{r['label']:>32}: {r['tracedDiffBytes']:>+12,} B traced, peak {r['peakBytes']:,} B")
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            grown = compare_reports(json.load(fh), report, args.max_growth)
+        for line in grown:
+            print(f"GREW {line}")
+        return 1 if grown else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,236 @@
+"""
+Offline load benchmark for NWDBService.
+
+Starts the local stand-in server over fixture payloads and drives autocomplete, item detail,
+perk search and artifact objective lookups with concurrent workers, then prints throughput
+and latency percentiles per scenario. No network access is needed.
+
+    python -m services.benchmarks.bench_nwdb --requests 500 --concurrency 20 --latency 0.05
+    python -m services.benchmarks.bench_nwdb --scenario item_detail --cold --json
+    python -m services.benchmarks.bench_nwdb --latency 0.02 --background-bulk 32 --metrics
+
+--background-bulk N keeps N cold item fetches at bulk priority running for the length of each
+scenario, all sharing one PriorityGate, to show what a crawl does to interactive latency.
+
+(`services` being whatever package these modules are installed as.)
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import aiohttp
+
+from ..http_session import ConnectionStats, SessionSettings, create_session
+from ..item_data_service import build_item_info
+from ..nwdb_service import NWDBService
+from ..request_scheduler import BULK, PriorityGate, request_priority
+from . import fixtures as fixture_store
+from .standin_server import StandInServer
+
+SCENARIOS = ("autocomplete", "item_detail", "gear_set", "perk_search", "artifact_objectives")
+GEAR_SET_SIZE = 12
+
+
+def percentile(sorted_vals: List[float], q: float) -> Optional[float]:
+    if not sorted_vals:
+        return None
+    idx = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[idx]
+
+
+def _prefixes(data: Dict[str, Any], rng: random.Random, n: int) -> List[str]:
+    names = [e["name"] for e in data["search_all"]["data"] if e.get("type") == "item" and e.get("name")]
+    out = []
+    for _ in range(n):
+        name = rng.choice(names)
+        out.append(name[: rng.randint(2, min(6, len(name)))])
+    return out
+
+
+def _build_ops(scenario: str, data: Dict[str, Any], n: int, seed: int) -> List[Callable[[NWDBService], Awaitable[Any]]]:
+    rng = random.Random(seed)
+    item_ids = list(data["items"])
+    if scenario == "autocomplete":
+        return [(lambda q: lambda svc: svc.search_items(q))(q) for q in _prefixes(data, rng, n)]
+    if scenario == "item_detail":
+        async def _detail(svc: NWDBService, iid: str):
+            payload = await svc.get_item_details_async(iid)
+            if not isinstance(payload, dict) or payload.get("error"):
+                return payload
+            with svc.metrics.timer("build_item_info"):
+                return build_item_info((payload or {}).get("data") or {})
+        return [(lambda iid: lambda svc: _detail(svc, iid))(rng.choice(item_ids)) for _ in range(n)]
+    if scenario == "gear_set":
+        async def _gear_set(svc: NWDBService, ids: List[str]):
+            infos = await svc.get_items_details_batch(ids)
+            failed = [i for i, info in infos.items() if info.get("error")]
+            return {"error": f"{len(failed)} items failed"} if failed else infos
+        return [
+            (lambda ids: lambda svc: _gear_set(svc, ids))(rng.sample(item_ids, GEAR_SET_SIZE))
+            for _ in range(n)
+        ]
+    if scenario == "perk_search":
+        types = list(data["perks"])
+        return [
+            (lambda t, q: lambda svc: svc.search_perks_for_item_type(t, q))(rng.choice(types), rng.choice("aeiokvrdt"))
+            for _ in range(n)
+        ]
+    if scenario == "artifact_objectives":
+        return [(lambda iid: lambda svc: svc.fetch_artifact_objectives(iid))(rng.choice(item_ids)) for _ in range(n)]
+    raise ValueError(f"unknown scenario: {scenario}")
+
+
+async def run_scenario(
+    scenario: str,
+    data: Dict[str, Any],
+    base_url: str,
+    session: aiohttp.ClientSession,
+    n_requests: int,
+    concurrency: int,
+    cold: bool,
+    seed: int,
+    metrics=None,
+    stats: Optional[ConnectionStats] = None,
+    gate: Optional[PriorityGate] = None,
+    bulk_workers: int = 0,
+) -> Dict[str, Any]:
+    ops = _build_ops(scenario, data, n_requests, seed)
+    shared = NWDBService(
+        session, metrics=metrics, api_base=base_url, nwbuddy_base=base_url, connection_stats=stats, gate=gate,
+    )
+    latencies: List[float] = []
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for op in ops:
+        queue.put_nowait(op)
+
+    async def worker() -> None:
+        nonlocal errors
+        while True:
+            try:
+                op = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            svc = NWDBService(
+                session, metrics=metrics, api_base=base_url, nwbuddy_base=base_url, connection_stats=stats, gate=gate,
+            ) if cold else shared
+            t0 = time.perf_counter()
+            try:
+                result = await op(svc)
+                if isinstance(result, dict) and result.get("error"):
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+
+    done = False
+    bulk_requests = 0
+
+    async def bulk_worker(offset: int) -> None:
+        nonlocal bulk_requests
+        item_ids = list(data["items"])
+        i = offset
+        with request_priority(BULK):
+            while not done:
+                svc = NWDBService(
+                    session, metrics=metrics, api_base=base_url, nwbuddy_base=base_url,
+                    connection_stats=stats, gate=gate,
+                )
+                await svc.get_item_details_async(item_ids[i % len(item_ids)])
+                bulk_requests += 1
+                i += bulk_workers
+
+    background = [asyncio.ensure_future(bulk_worker(i)) for i in range(bulk_workers)]
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    finally:
+        wall = time.perf_counter() - started
+        done = True
+        await asyncio.gather(*background, return_exceptions=True)
+    latencies.sort()
+    ms = lambda v: None if v is None else round(v * 1000, 3)  # noqa: E731
+    return {
+        "scenario": scenario,
+        "requests": len(latencies),
+        "errors": errors,
+        "concurrency": concurrency,
+        "cold": cold,
+        "wallSeconds": round(wall, 4),
+        "throughput": round(len(latencies) / wall, 2) if wall > 0 else None,
+        "p50Ms": ms(percentile(latencies, 0.50)),
+        "p95Ms": ms(percentile(latencies, 0.95)),
+        "p99Ms": ms(percentile(latencies, 0.99)),
+        "maxMs": ms(latencies[-1] if latencies else None),
+        "bulkRequests": bulk_requests,
+    }
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    fixtures_dir = fixture_store.ensure(args.fixtures) if args.fixtures == fixture_store.DEFAULT_DIR else args.fixtures
+    data = fixture_store.load(fixtures_dir)
+    server = StandInServer(data, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=args.seed)
+    base_url = server.start_in_thread()
+    metrics = None
+    if args.metrics:
+        from ..nwdb_metrics import ServiceMetrics
+        metrics = ServiceMetrics()
+    stats = ConnectionStats()
+    gate = PriorityGate(SessionSettings().limit_per_host)
+    results = []
+    try:
+        async with create_session(stats=stats) as session:
+            for scenario in args.scenario or SCENARIOS:
+                results.append(await run_scenario(
+                    scenario, data, base_url, session, args.requests, args.concurrency, args.cold, args.seed,
+                    metrics, stats, gate, args.background_bulk,
+                ))
+    finally:
+        server.stop_thread()
+    if metrics is not None:
+        results.append({"scenario": "_metrics", **metrics.snapshot()})
+        results.append({"scenario": "_connections", **stats.snapshot()})
+        results.append({"scenario": "_scheduler", **gate.snapshot()})
+    return results
+
+
+def _print_table(results: List[Dict[str, Any]]) -> None:
+    cols = ("scenario", "requests", "errors", "throughput", "p50Ms", "p95Ms", "p99Ms", "maxMs", "bulkRequests")
+    print("  ".join(f"{c:>20}" if i == 0 else f"{c:>10}" for i, c in enumerate(cols)))
+    for r in results:
+        if r["scenario"].startswith("_"):
+            continue
+        print("  ".join(f"{str(r.get(c)):>20}" if i == 0 else f"{str(r.get(c)):>10}" for i, c in enumerate(cols)))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline NWDBService benchmark against a local stand-in server")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.0, help="server-side delay per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra uniform delay 0..jitter (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--cold", action="store_true", help="fresh service cache for every operation")
+    parser.add_argument("--fixtures", default=fixture_store.DEFAULT_DIR)
+    parser.add_argument("--background-bulk", type=int, default=0, metavar="N",
+                        help="bulk-priority item fetches kept running during each scenario")
+    parser.add_argument("--metrics", action="store_true", help="include a ServiceMetrics snapshot")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print_table(results)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
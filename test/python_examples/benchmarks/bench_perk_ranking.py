@@ -0,0 +1,121 @@
+"""
+Perk ranking benchmark: PerkRanker.values / top_many over every perk in the fixture items
+versus calling perk_multiplier per (item, perk) pair, at a few gear scores. Also reports the
+largest difference between the two, which should be ~0.
+
+With --live, also loads the ranker the way `perk_ranking --live` does (load_from_service)
+from the stand-in server, with the fastest JSON backend installed, and counts listed items
+whose gear score didn't come through; exits 1 if any.
+
+    python -m services.benchmarks.bench_perk_ranking --gs 500 600 700 --repeat 3 --live
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..description_templates import compile_template, scaled_coefficient
+from ..item_data_service import perk_multiplier
+from ..perk_ranking import PerkRanker
+from . import fixtures as fixture_store
+
+
+def scalar_values(payloads: List[Dict[str, Any]], gear_scores: List[int]) -> Dict[Tuple[str, str], List[float]]:
+    """Values per (item id, perk id), one perk_multiplier call each."""
+    out: Dict[Tuple[str, str], List[float]] = {}
+    for raw in payloads:
+        d = raw["data"]
+        gs_max = d.get("gearScoreMax")
+        for p in d.get("perks") or []:
+            if (d["id"], p["id"]) in out:
+                continue
+            base = scaled_coefficient(compile_template(p.get("description") or ""))
+            row = []
+            for gs in gear_scores:
+                g = min(gs, gs_max) if isinstance(gs_max, int) else gs
+                mult = perk_multiplier(g, p.get("ScalingPerGearScore"), p.get("id"), p.get("description"))
+                row.append(mult if base is None else base * mult)
+            out[(d["id"], p["id"])] = row
+    return out
+
+
+async def _live_ranker(data: Dict[str, Any]) -> Tuple[PerkRanker, str]:
+    from ..nwdb_service import NWDBService
+    from ..perk_ranking import load_from_service
+    from .standin_server import StandInServer
+
+    server = StandInServer(data)
+    base = server.start_in_thread()
+    try:
+        async with NWDBService(api_base=base, nwbuddy_base=base) as service:
+            return await load_from_service(service, fixture_store.ITEM_TYPES), service.decoder.name
+    finally:
+        server.stop_thread()
+
+
+def live_gear_scores(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Listed items whose gear score in the live-loaded ranker differs from the listing."""
+    ranker, decoder = asyncio.run(_live_ranker(data))
+    expected = {
+        str(row["id"]): row.get("gearScoreMax")
+        for pid, rows in data["items_by_perk"].items() for row in rows
+    }
+    wrong = sum(1 for iid, gs in expected.items() if ranker._items.get(iid, ("", None))[1] != gs)
+    return {"liveDecoder": decoder, "liveItems": len(expected), "liveGearScoreMismatches": wrong}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Vectorized perk ranking vs per-item perk_multiplier")
+    parser.add_argument("--gs", type=int, nargs="+", default=[500, 600, 700])
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--fixtures", default=fixture_store.DEFAULT_DIR)
+    parser.add_argument("--live", action="store_true", help="also check the live loading path (see module docstring)")
+    args = parser.parse_args(argv)
+
+    fixtures_dir = fixture_store.ensure(args.fixtures) if args.fixtures == fixture_store.DEFAULT_DIR else args.fixtures
+    data = fixture_store.load(fixtures_dir)
+    payloads = list(data["items"].values())
+
+    t0 = time.perf_counter()
+    ranker = PerkRanker()
+    for raw in payloads:
+        ranker.add_payload(raw)
+    ranker.values(args.gs)
+    load = time.perf_counter() - t0
+
+    best_values = best_top = best_scalar = float("inf")
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        ranker.values(args.gs)
+        best_values = min(best_values, time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        ranker.top_many(None, args.gs, args.top)
+        best_top = min(best_top, time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        expected = scalar_values(payloads, args.gs)
+        best_scalar = min(best_scalar, time.perf_counter() - t0)
+    got = ranker.values(args.gs)
+    diff = max(
+        (abs(got[i][j] - v) for i, pair in enumerate(ranker.pairs()) for j, v in enumerate(expected[pair])),
+        default=0.0,
+    )
+    live = live_gear_scores(data) if args.live else {}
+    print(json.dumps({
+        "items": len(payloads),
+        "pairs": len(ranker),
+        "gearScores": args.gs,
+        "loadSeconds": round(load, 4),
+        "valuesSeconds": round(best_values, 4),
+        "topManySeconds": round(best_top, 4),
+        "scalarSeconds": round(best_scalar, 4),
+        "maxAbsDiff": diff,
+        **live,
+    }, indent=2))
+    return 1 if live.get("liveGearScoreMismatches") else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,264 @@
+"""
+Payload fixtures for the offline benchmarks.
+
+Layout of a fixtures directory (all JSON):
+    search_all.json           {"data": [{"type", "id", "name", "slug"}, ...]}
+    items.json                {item_id: <item payload {"data": {...}}>}
+    perks.json                {item_type: [perk, ...]}          (all pages, server re-paginates)
+    items_by_perk.json        {perk_id: [item summary, ...]}    (all pages)
+    objective_tasks.json      [task, ...]                       (nw-buddy datatable)
+    gamemodes.json            [gamemode, ...]                   (nw-buddy datatable)
+    creatures.json            {creature_id: {"data": {...}}}
+    zones.json                {zone_id: {"data": {...}}}
+    recipes.json              {recipe_id: {"data": {"id", "output", "ingredients"}}}
+
+`generate` writes a deterministic synthetic set with NWDB-shaped records; `record` captures
+real payloads for a list of item ids / item types when network access is available.
+"""
+from __future__ import annotations
+import json
+import os
+import random
+import urllib.request
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+FILES = (
+    "search_all.json", "items.json", "perks.json", "items_by_perk.json",
+    "objective_tasks.json", "gamemodes.json", "creatures.json", "zones.json",
+    "recipes.json",
+)
+ITEM_TYPES = ("sword", "hatchet", "flail", "rapier", "amulet", "ring", "chest", "voidgauntlet")
+WORDS = (
+    "Void", "Arcane", "Ancient", "Corrupted", "Savage", "Eternal", "Desiccated", "Umbral",
+    "Gauntlet", "Flail", "Rapier", "Blade", "Hatchet", "Amulet", "Ring", "Chestwear",
+    "Keen", "Vicious", "Refreshing", "Enchanted", "Ward", "Empowered", "Divine", "Trenchant",
+    "Armored", "Warding", "Spear", "Staff", "Bow", "Musket", "Plate", "Leather",
+)
+ZONES = ("Brightwood", "Ebonscale Reach", "Shattered Mountain", "Edengrove", "Reekwater", "Brimstone Sands")
+GAMEMODES = ("DungeonAmrine", "DungeonEbonscale00", "DungeonEdengrove00", "DungeonShatterMtn00", "DungeonBrimstoneSands00")
+
+
+def _name(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def _perk(rng: random.Random, pid: str) -> Dict[str, Any]:
+    coeff = rng.choice((2.5, 5, 7.5, 10, 15, 20))
+    return {
+        "id": pid,
+        "name": _name(rng, 2),
+        "description": f"Gain ${{{coeff} * perkMultiplier}}% damage for ${{{rng.randint(2, 10)}}}s after a ${{{rng.choice((1, 1.5))}}}m dodge.",
+        "ScalingPerGearScore": "0.0019,625:0.006667,700:0.00",
+    }
+
+
+def _loot_tags(rng: random.Random, zone_ids: List[int]) -> Dict[str, Any]:
+    zid = rng.choice(zone_ids)
+    b: List[Any] = [f"{{!zone}}{ZONES[zid % len(ZONES)]}|||{zid}"]
+    if rng.random() < 0.3:
+        b.append(["Mutated Expedition", "Elite"])
+    return {"t": [f"{{!plvl}}{rng.choice((50, 60, 65))}"], "b": b}
+
+
+def generate(
+    out_dir: str = DEFAULT_DIR,
+    n_items: int = 20000,
+    n_detailed: int = 500,
+    perks_per_type: int = 200,
+    n_tasks: int = 5000,
+    seed: int = 7,
+) -> str:
+    """Write a synthetic fixture set; returns the directory."""
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+
+    catalog = []
+    for i in range(n_items):
+        iid = f"item_{i:05d}"
+        catalog.append({"type": "item", "id": iid, "name": _name(rng, rng.randint(2, 4)), "slug": iid})
+    for i in range(n_items // 10):
+        catalog.append({"type": "perk", "id": f"perkid_{i:04d}", "name": _name(rng, 2)})
+
+    perks: Dict[str, List[Dict[str, Any]]] = {}
+    all_perk_ids: List[str] = []
+    for t in ITEM_TYPES:
+        perks[t] = [_perk(rng, f"perkid_{t}_{j:03d}") for j in range(perks_per_type)]
+        all_perk_ids.extend(p["id"] for p in perks[t])
+
+    zone_ids = list(range(1000, 1060))
+    creature_ids = [f"creature_{i:03d}" for i in range(300)]
+    items: Dict[str, Any] = {}
+    for entry in catalog[:n_detailed]:
+        iid = entry["id"]
+        item_perks = [_perk(rng, rng.choice(all_perk_ids)) for _ in range(rng.randint(2, 4))]
+        items[iid] = {"data": {
+            "id": iid,
+            "name": entry["name"],
+            "gearScoreMax": rng.choice((600, 625, 650, 700, 725)),
+            "typeName": rng.choice(("Sword", "Flail", "Amulet", "Resource")),
+            "tier": rng.randint(2, 5),
+            "itemClass": ["EquippableMainHand", "Source_leaderboards"] if rng.random() < 0.05 else ["EquippableMainHand"],
+            "icon": f"lyshineui/images/icons/items/{iid}",
+            "perks": item_perks,
+            "craftingRecipesOutput": [{"id": f"recipe_{iid}", "type": "recipe", "name": entry["name"]}],
+            "monstersWithDrop": [
+                {"id": rng.choice(creature_ids), "type": "creature", "name": _name(rng, 2),
+                 "Level": rng.randint(20, 70), "lootTagRestrictions": _loot_tags(rng, zone_ids)}
+                for _ in range(rng.randint(0, 120))
+            ],
+            "drops_lootcontainer_from": [
+                {"id": f"container_{rng.randint(0, 80)}", "type": "lootcontainer", "name": _name(rng, 2)}
+                for _ in range(rng.randint(0, 4))
+            ],
+            "gatherablesWithItem": [
+                {"id": f"gatherable_{rng.randint(0, 50)}", "type": "gatherable", "name": _name(rng, 2)}
+                for _ in range(rng.randint(0, 2))
+            ],
+            "price": {"BuyCurrencyCost": rng.randint(100, 5000)},
+        }}
+
+    # Listings carry the item's gear score cap, as NWDB's do
+    gear_scores = {
+        e["id"]: items[e["id"]]["data"]["gearScoreMax"] if e["id"] in items else 600 + 25 * (n % 6)
+        for n, e in enumerate(catalog[:n_items])
+    }
+    items_by_perk: Dict[str, List[Dict[str, Any]]] = {}
+    for pid in all_perk_ids[:200]:
+        items_by_perk[pid] = [
+            {"id": e["id"], "name": e["name"], "description": "An item ${10}% better.", "gearScoreMax": gear_scores[e["id"]]}
+            for e in rng.sample(catalog[:n_items], rng.randint(1, 180))
+        ]
+
+    detailed_ids = list(items)
+    recipes = _recipes(random.Random(seed + 1), detailed_ids)
+    tasks = []
+    for i in range(n_tasks):
+        iid = rng.choice(detailed_ids)
+        tasks.append({
+            "TaskID": f"task_perk{rng.randint(1, 3)}_{iid}_{i}",
+            "Type": rng.choice(("TaskKillContribution", "TaskKillContribution", "TaskGameEvent")),
+            "KillEnemyType": rng.choice(creature_ids),
+            "TargetQty": rng.randint(1, 50),
+            "POITag": f"poi_{rng.choice(zone_ids)}",
+            "TerritoryID": rng.randint(0, 16),
+            "GameModeID": rng.choice(GAMEMODES),
+        })
+    gamemodes = [{"GameModeId": g, "DisplayName": f"@dungeon_{g.lower()}_title", "ScriptName": g} for g in GAMEMODES]
+    creatures = {c: {"data": {"name": _name(rng, 2)}} for c in creature_ids}
+    zones = {str(z): {"data": {"name": ZONES[z % len(ZONES)]}} for z in zone_ids}
+
+    payloads = {
+        "search_all.json": {"data": catalog},
+        "items.json": items,
+        "perks.json": perks,
+        "items_by_perk.json": items_by_perk,
+        "objective_tasks.json": tasks,
+        "gamemodes.json": gamemodes,
+        "creatures.json": creatures,
+        "zones.json": zones,
+        "recipes.json": recipes,
+    }
+    for fname, payload in payloads.items():
+        with open(os.path.join(out_dir, fname), "w", encoding="utf-8") as fh:
+            json.dump(payload, fh, separators=(",", ":"))
+    return out_dir
+
+
+def _recipes(rng: random.Random, item_ids: List[str], n_raw: int = 40) -> Dict[str, Any]:
+    """
+    One recipe per detailed item (the `recipe_<id>` its craftingRecipesOutput names). The first
+    fifth is made from raw materials, which have no item record; later items use earlier ones,
+    sometimes through a category. Some outputs come in list form, a few with a raw byproduct.
+    """
+    raw = [f"raw_{n:02d}" for n in range(n_raw)]
+    recipes: Dict[str, Any] = {}
+    for n, iid in enumerate(item_ids):
+        pool = raw if n < len(item_ids) // 5 else item_ids[:n]
+        ingredients: List[Dict[str, Any]] = [
+            {"id": i, "type": "item", "quantity": rng.randint(1, 5)}
+            for i in rng.sample(pool, min(len(pool), rng.randint(1, 3)))
+        ]
+        if rng.random() < 0.1:
+            ingredients.append({"id": f"cat_{n}", "type": "category", "quantity": rng.randint(1, 4),
+                                "subIngredients": [{"id": o, "type": "item"} for o in rng.sample(raw, 3)]})
+        output: Any = {"id": iid, "quantity": rng.choice((1, 1, 1, 2, 5))}
+        roll = rng.random()
+        if roll < 0.05:
+            output = [output, {"id": rng.choice(raw), "quantity": 1}]
+        elif roll < 0.25:
+            output = [output]
+        rid = f"recipe_{iid}"
+        recipes[rid] = {"data": {"id": rid, "output": output, "ingredients": ingredients}}
+    return recipes
+
+
+def ensure(out_dir: str = DEFAULT_DIR) -> str:
+    """Generate the default synthetic set unless the directory already has every file."""
+    if not all(os.path.exists(os.path.join(out_dir, f)) for f in FILES):
+        generate(out_dir)
+    return out_dir
+
+
+def load(fixtures_dir: str = DEFAULT_DIR) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for fname in FILES:
+        with open(os.path.join(fixtures_dir, fname), encoding="utf-8") as fh:
+            out[fname[:-5]] = json.load(fh)
+    return out
+
+
+def _get(url: str, timeout: float = 30) -> Any:
+    req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0", "Accept": "*/*"})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return json.loads(resp.read())
+
+
+def record(
+    out_dir: str,
+    item_ids: Iterable[str],
+    item_types: Iterable[str] = ITEM_TYPES,
+    base: str = "https://nwdb.info",
+    nwbuddy_base: str = "https://www.nw-buddy.de",
+    max_pages: Optional[int] = None,
+) -> str:
+    """Capture real payloads into the fixture layout (needs network)."""
+    os.makedirs(out_dir, exist_ok=True)
+    search_all = _get(f"{base}/db/search/[[all]]")
+    items = {iid: _get(f"{base}/db/item/{iid}.json") for iid in item_ids}
+    perks: Dict[str, List[Any]] = {}
+    for t in item_types:
+        first = _get(f"{base}/db/perks/page/1.json?filter_perk_item={t}")
+        data = list(first.get("data") or [])
+        pages = int(first.get("pageCount") or 1)
+        for page in range(2, (min(pages, max_pages) if max_pages else pages) + 1):
+            data.extend(_get(f"{base}/db/perks/page/{page}.json?filter_perk_item={t}").get("data") or [])
+        perks[t] = data
+    items_by_perk: Dict[str, List[Any]] = {}
+    for t_perks in perks.values():
+        for p in t_perks[:5]:
+            pid = str(p.get("id"))
+            items_by_perk[pid] = _get(f"{base}/db/items/page/1.json?filter_perks={pid}").get("data") or []
+    tasks = _get(f"{nwbuddy_base}/nw-data/datatables/javelindata_objectivetasks.json")
+    gamemodes = _get(f"{nwbuddy_base}/nw-data/datatables/javelindata_gamemodes.json")
+    recipes: Dict[str, Any] = {}
+    for payload in items.values():
+        for r in (payload.get("data") or {}).get("craftingRecipesOutput") or []:
+            rid = str(r.get("id") or "")
+            if rid and rid not in recipes:
+                recipes[rid] = _get(f"{base}/db/recipe/{rid}.json")
+    payloads = {
+        "search_all.json": search_all,
+        "items.json": items,
+        "perks.json": perks,
+        "items_by_perk.json": items_by_perk,
+        "objective_tasks.json": tasks,
+        "gamemodes.json": gamemodes,
+        "creatures.json": {},
+        "zones.json": {},
+        "recipes.json": recipes,
+    }
+    for fname, payload in payloads.items():
+        with open(os.path.join(out_dir, fname), "w", encoding="utf-8") as fh:
+            json.dump(payload, fh, separators=(",", ":"))
+    return out_dir
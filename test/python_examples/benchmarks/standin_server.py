@@ -0,0 +1,155 @@
+"""
+Local aiohttp stand-in for nwdb.info and nw-buddy.de serving fixture payloads.
+
+Latency is `latency` seconds plus uniform jitter; `error_rate` of requests get a 503.
+Use `start_in_thread` when the client side makes blocking `requests` calls (the
+catalog download in NWDBService.fetch_nwdb_all), since those would stall a server
+sharing the client's event loop.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import random
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from aiohttp import web
+
+PER_PAGE = 50
+
+
+def _page(rows, page: int, per_page: int = PER_PAGE) -> Dict[str, Any]:
+    rows = rows or []
+    page_count = max(1, (len(rows) + per_page - 1) // per_page)
+    start = (page - 1) * per_page
+    return {"pageCount": page_count, "data": rows[start:start + per_page]}
+
+
+class StandInServer:
+    def __init__(
+        self,
+        fixtures: Dict[str, Any],
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 1,
+    ):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        # Pre-encode the big static bodies once so the server isn't the bottleneck
+        self._static: Dict[str, bytes] = {
+            "search_all": json.dumps(fixtures["search_all"]).encode(),
+            "objective_tasks": json.dumps(fixtures["objective_tasks"]).encode(),
+            "gamemodes": json.dumps(fixtures["gamemodes"]).encode(),
+        }
+        self._runner: Optional[web.AppRunner] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self.base_url = ""
+
+    @web.middleware
+    async def _inject(self, request: web.Request, handler):
+        self.requests += 1
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.errors += 1
+            return web.Response(status=503, text="injected")
+        return await handler(request)
+
+    def _json(self, payload: Any) -> web.Response:
+        return web.Response(body=json.dumps(payload).encode(), content_type="application/json")
+
+    def _raw(self, key: str) -> web.Response:
+        return web.Response(body=self._static[key], content_type="application/json")
+
+    async def search_all(self, request: web.Request) -> web.Response:
+        return self._raw("search_all")
+
+    async def item(self, request: web.Request) -> web.Response:
+        payload = self.fixtures["items"].get(request.match_info["item_id"])
+        return self._json(payload) if payload else web.Response(status=404)
+
+    async def perks_page(self, request: web.Request) -> web.Response:
+        item_type = request.query.get("filter_perk_item", "").lower()
+        return self._json(_page(self.fixtures["perks"].get(item_type), int(request.match_info["page"])))
+
+    async def items_page(self, request: web.Request) -> web.Response:
+        perk_id = request.query.get("filter_perks", "")
+        return self._json(_page(self.fixtures["items_by_perk"].get(perk_id), int(request.match_info["page"])))
+
+    async def creature(self, request: web.Request) -> web.Response:
+        payload = self.fixtures["creatures"].get(request.match_info["cid"])
+        return self._json(payload) if payload else web.Response(status=404)
+
+    async def zone(self, request: web.Request) -> web.Response:
+        payload = self.fixtures["zones"].get(request.match_info["zid"])
+        return self._json(payload) if payload else web.Response(status=404)
+
+    async def recipe(self, request: web.Request) -> web.Response:
+        payload = self.fixtures.get("recipes", {}).get(request.match_info["rid"])
+        return self._json(payload) if payload else web.Response(status=404)
+
+    async def objective_tasks(self, request: web.Request) -> web.Response:
+        return self._raw("objective_tasks")
+
+    async def gamemodes(self, request: web.Request) -> web.Response:
+        return self._raw("gamemodes")
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._inject])
+        app.router.add_get("/db/search/{all}", self.search_all)
+        app.router.add_get("/db/item/{item_id}.json", self.item)
+        app.router.add_get("/db/perks/page/{page}.json", self.perks_page)
+        app.router.add_get("/db/items/page/{page}.json", self.items_page)
+        app.router.add_get("/db/creature/{cid}.json", self.creature)
+        app.router.add_get("/db/zone/{zid}.json", self.zone)
+        app.router.add_get("/db/recipe/{rid}.json", self.recipe)
+        app.router.add_get("/nw-data/datatables/javelindata_objectivetasks.json", self.objective_tasks)
+        app.router.add_get("/nw-data/datatables/javelindata_gamemodes.json", self.gamemodes)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        sockets = site._server.sockets if site._server else []
+        bound_port = sockets[0].getsockname()[1] if sockets else port
+        self.base_url = f"http://{host}:{bound_port}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_thread(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Run the server on its own event loop in a daemon thread."""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="nwdb-standin", daemon=True)
+        self._thread.start()
+        return asyncio.run_coroutine_threadsafe(self.start(host, port), self._loop).result()
+
+    def stop_thread(self) -> None:
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+
+
+async def serve(fixtures: Dict[str, Any], **kwargs) -> Tuple[StandInServer, str]:
+    server = StandInServer(fixtures, **kwargs)
+    url = await server.start()
+    return server, url
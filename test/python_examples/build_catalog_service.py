@@ -0,0 +1,210 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Facet name -> build field
+FACET_FIELDS = {
+    "category": "category",
+    "subCategory": "subCategory",
+    "tag": "tags",
+    "featured": "featured",
+}
+
+
+def _facet_values(build: Dict[str, Any], field: str) -> List[str]:
+    val = build.get(field)
+    if field == "tags":
+        return [str(t) for t in val if t] if isinstance(val, list) else []
+    if field == "featured":
+        return ["true" if val else "false"]
+    return [str(val)] if val else []
+
+
+def _content_hash(build: Dict[str, Any]) -> str:
+    raw = json.dumps(build, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+class BuildCatalog:
+    """
+    In-memory index over a builds.json list (data/builds.json or public/data/builds.json).
+
+    Keeps one posting set per facet value, an updatedAt-desc order and facet counts,
+    and re-applies only the changed records when the file's mtime moves.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[int] = None
+        self._builds: Dict[str, Dict[str, Any]] = {}
+        self._hashes: Dict[str, str] = {}
+        self._positions: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[str, Set[str]]] = {f: {} for f in FACET_FIELDS}
+        self._facet_counts: Dict[str, Counter] = {f: Counter() for f in FACET_FIELDS}
+        self._order: List[str] = []
+        self._rank: Dict[str, int] = {}
+        self.version = 0
+
+    # ---- loading ----
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Reload if the file changed on disk. Returns True when the index changed. A file that
+        can't be read or parsed (e.g. caught mid-write) keeps the current index and is retried
+        on the next call.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if not force and mtime == self._mtime:
+            return False
+        with self._lock:
+            if not force and mtime == self._mtime:
+                return False
+            try:
+                with open(self.path, encoding="utf-8") as fh:
+                    data = json.load(fh)
+            except (OSError, ValueError):
+                return False
+            changed = self._apply(data if isinstance(data, list) else [])
+            self._mtime = mtime
+            return changed
+
+    def _apply(self, records: Iterable[Any]) -> bool:
+        incoming: Dict[str, Tuple[Dict[str, Any], str, int]] = {}
+        for pos, rec in enumerate(records):
+            if not isinstance(rec, dict) or not rec.get("id"):
+                continue
+            bid = str(rec["id"])
+            incoming[bid] = (rec, _content_hash(rec), pos)
+
+        changed = False
+        for bid in list(self._builds):
+            if bid not in incoming:
+                self._unindex(bid)
+                changed = True
+        for bid, (rec, digest, pos) in incoming.items():
+            if self._positions.get(bid) != pos:
+                self._positions[bid] = pos
+                changed = True
+            if self._hashes.get(bid) == digest:
+                continue
+            if bid in self._builds:
+                self._unindex(bid)
+            self._index(bid, rec, digest)
+            self._positions[bid] = pos
+            changed = True
+
+        if changed:
+            by_pos = sorted(self._builds, key=lambda b: self._positions.get(b, 0))
+            # Newest updatedAt first (ISO dates sort as strings), undated builds last in file order
+            dated = [b for b in by_pos if self._builds[b].get("updatedAt")]
+            dated.sort(key=lambda b: str(self._builds[b]["updatedAt"]), reverse=True)
+            self._order = dated + [b for b in by_pos if not self._builds[b].get("updatedAt")]
+            self._rank = {bid: i for i, bid in enumerate(self._order)}
+            self.version += 1
+        return changed
+
+    def _index(self, bid: str, rec: Dict[str, Any], digest: str) -> None:
+        self._builds[bid] = rec
+        self._hashes[bid] = digest
+        for facet, field in FACET_FIELDS.items():
+            for val in _facet_values(rec, field):
+                self._postings[facet].setdefault(val, set()).add(bid)
+                self._facet_counts[facet][val] += 1
+
+    def _unindex(self, bid: str) -> None:
+        rec = self._builds.pop(bid, None)
+        self._hashes.pop(bid, None)
+        self._positions.pop(bid, None)
+        if rec is None:
+            return
+        for facet, field in FACET_FIELDS.items():
+            postings = self._postings[facet]
+            counts = self._facet_counts[facet]
+            for val in _facet_values(rec, field):
+                ids = postings.get(val)
+                if ids is not None:
+                    ids.discard(bid)
+                    if not ids:
+                        del postings[val]
+                counts[val] -= 1
+                if counts[val] <= 0:
+                    del counts[val]
+
+    # ---- queries ----
+    def get(self, build_id: str) -> Optional[Dict[str, Any]]:
+        self.refresh()
+        with self._lock:
+            return self._builds.get(str(build_id))
+
+    def facets(self) -> Dict[str, Dict[str, int]]:
+        self.refresh()
+        with self._lock:
+            return {f: dict(c) for f, c in self._facet_counts.items()}
+
+    def query(
+        self,
+        category: Optional[str] = None,
+        sub_category: Optional[str] = None,
+        tags: Optional[Iterable[str]] = None,
+        featured: Optional[bool] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        with_facets: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Filter by category/subCategory/featured and all of `tags`, newest first.
+        Returns {"items": [...], "total": int, "facets": {...}} where facets count the matching set.
+        """
+        self.refresh()
+        with self._lock:
+            return self._query(category, sub_category, tags, featured, limit, offset, with_facets)
+
+    def _query(self, category, sub_category, tags, featured, limit, offset, with_facets) -> Dict[str, Any]:
+        wanted: List[Tuple[str, str]] = []
+        if category is not None:
+            wanted.append(("category", str(category)))
+        if sub_category is not None:
+            wanted.append(("subCategory", str(sub_category)))
+        if featured is not None:
+            wanted.append(("featured", "true" if featured else "false"))
+        for t in tags or []:
+            wanted.append(("tag", str(t)))
+
+        if not wanted:
+            ordered = self._order
+            facets = {f: dict(c) for f, c in self._facet_counts.items()} if with_facets else None
+        else:
+            sets = [self._postings[f].get(v, set()) for f, v in wanted]
+            sets.sort(key=len)
+            matched = set(sets[0])
+            for s in sets[1:]:
+                if not matched:
+                    break
+                matched &= s
+            ordered = sorted(matched, key=self._rank.__getitem__)
+            facets = self._count_facets(ordered) if with_facets else None
+
+        end = None if limit is None else offset + max(0, limit)
+        out: Dict[str, Any] = {
+            "items": [self._builds[b] for b in ordered[offset:end]],
+            "total": len(ordered),
+        }
+        if facets is not None:
+            out["facets"] = facets
+        return out
+
+    def _count_facets(self, ids: Iterable[str]) -> Dict[str, Dict[str, int]]:
+        counts: Dict[str, Counter] = {f: Counter() for f in FACET_FIELDS}
+        for bid in ids:
+            rec = self._builds[bid]
+            for facet, field in FACET_FIELDS.items():
+                counts[facet].update(_facet_values(rec, field))
+        return {f: dict(c) for f, c in counts.items()}
+
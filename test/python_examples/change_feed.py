@@ -0,0 +1,127 @@
+"""
+Change feed between successive snapshots of id-keyed datasets (the NWDB catalog,
+perks per item type, ...).
+
+`ChangeFeed.publish(name, records)` diffs the new records against the previous snapshot of
+`name` by id and content hash and returns a ChangeSet of added / removed / changed records.
+When nothing changed, `ChangeSet.current` is the previous list object, so anything keyed on
+list identity (QueryCache versions) stays warm across a refresh. Subscribers get every
+non-empty ChangeSet, synchronously and in the publishing thread, with the replaced records
+(`before`) and the previous list, which is what NWDBService needs to patch its query cache
+instead of dropping it. `since(seq)` replays recent ones for pollers, without those two.
+"""
+from __future__ import annotations
+import hashlib
+import json
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+
+def record_hash(record: Any) -> str:
+    body = json.dumps(record, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.blake2b(body.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _record_id(record: Any) -> Optional[str]:
+    rid = record.get("id") if isinstance(record, dict) else None
+    return str(rid) if rid not in (None, "") else None
+
+
+class ChangeSet(NamedTuple):
+    dataset: str
+    seq: int
+    added: List[Any]
+    removed: List[str]
+    changed: List[Any]
+    current: List[Any]
+    # Previous versions of the removed and changed records, by id, and the list they were in
+    before: Optional[Dict[str, Any]] = None
+    previous: Optional[List[Any]] = None
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+    def ids(self) -> List[str]:
+        """Every id this change touches."""
+        return [_record_id(r) for r in self.added] + list(self.removed) + [_record_id(r) for r in self.changed]
+
+    def names(self) -> List[str]:
+        """Lowercased names of every record this change touches, old and new."""
+        records = [*self.added, *self.changed, *(self.before or {}).values()]
+        return [str(r.get("name") or "").lower() for r in records if isinstance(r, dict)]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "dataset": self.dataset, "seq": self.seq,
+            "added": len(self.added), "removed": len(self.removed), "changed": len(self.changed),
+        }
+
+
+class _Snapshot:
+    __slots__ = ("records", "hashes")
+
+    def __init__(self, records: List[Any], hashes: Dict[str, str]):
+        self.records = records
+        self.hashes = hashes
+
+
+def diff(name: str, seq: int, previous: Optional[_Snapshot], records: List[Any]) -> Tuple[ChangeSet, _Snapshot]:
+    hashes: Dict[str, str] = {}
+    by_id: Dict[str, Any] = {}
+    for r in records:
+        rid = _record_id(r)
+        if rid is not None:
+            hashes[rid] = record_hash(r)
+            by_id[rid] = r
+    old = previous.hashes if previous is not None else {}
+    added = [by_id[i] for i in hashes if i not in old]
+    changed = [by_id[i] for i, h in hashes.items() if i in old and old[i] != h]
+    removed = [i for i in old if i not in hashes]
+    if previous is not None and not (added or changed or removed):
+        # Same content: keep serving the previous object
+        return ChangeSet(name, seq, [], [], [], previous.records), previous
+    before: Dict[str, Any] = {}
+    if previous is not None and (changed or removed):
+        wanted = set(removed).union(_record_id(r) for r in changed)
+        before = {rid: r for r in previous.records if (rid := _record_id(r)) in wanted}
+    return (
+        ChangeSet(name, seq, added, removed, changed, records, before, previous.records if previous else None),
+        _Snapshot(records, hashes),
+    )
+
+
+class ChangeFeed:
+    def __init__(self, history: int = 256):
+        self._snapshots: Dict[str, _Snapshot] = {}
+        self._subscribers: List[Callable[[ChangeSet], None]] = []
+        self._log: Deque[ChangeSet] = deque(maxlen=history)
+        self.seq = 0
+
+    def subscribe(self, callback: Callable[[ChangeSet], None]) -> None:
+        self._subscribers.append(callback)
+
+    def publish(self, name: str, records: List[Any]) -> ChangeSet:
+        previous = self._snapshots.get(name)
+        changes, snapshot = diff(name, self.seq + 1, previous, records)
+        self._snapshots[name] = snapshot
+        if changes.empty:
+            return changes
+        self.seq += 1
+        # The log keeps the delta only; holding every replaced list would pin old catalogs
+        self._log.append(changes._replace(before=None, previous=None))
+        for callback in list(self._subscribers):
+            callback(changes)
+        return changes
+
+    def hash_of(self, name: str, record_id: Any) -> Optional[str]:
+        """Content hash of a record in the latest snapshot (None when absent or unknown)."""
+        snapshot = self._snapshots.get(name)
+        return snapshot.hashes.get(str(record_id)) if snapshot is not None else None
+
+    def known(self, name: str) -> bool:
+        return name in self._snapshots
+
+    def since(self, seq: int) -> List[ChangeSet]:
+        """Logged change sets after `seq`; a caller further behind than the log must resync."""
+        return [c for c in self._log if c.seq > seq]
@@ -0,0 +1,460 @@
+"""
+Craft-vs-buy cost engine over NWDB recipes.
+
+Every item costs the cheaper of buying it (its entry in the price table) and crafting it with
+any recipe that outputs it: the recipe's ingredient costs times their quantities, divided by
+the output quantity. Category ingredients ("any Fiber", "any Wood") cost their cheapest
+option. Items with neither a price nor a priceable recipe cost inf.
+
+`CraftingGraph.resolve()` prices every node in one pass. The graph is split into strongly
+connected components in dependency order, so each component is evaluated once after all of
+its ingredients. Recipe loops (refining reagent conversions and the like) form the
+non-trivial components and are relaxed to a fixpoint, allowing one round per node. A loop
+that makes more than it consumes (1 B -> 2 A, 1 A -> 2 B) has no fixpoint and would keep
+getting cheaper; such a component is listed in `unstable` and priced without the recipes
+inside it, i.e. only from what it can buy or craft from outside. `set_price` then re-evaluates
+only the components downstream of the changed item, and stops wherever a cost comes out
+unchanged.
+
+Recipes come from NWDB recipe payloads (`/db/recipe/{id}.json`, `recipes_from_payload`), or
+from `load_from_service`, which follows craftingRecipesOutput from a set of items down
+through their ingredients.
+
+    python -m services.crafting_cost recipes.jsonl --prices prices.json --item ingotT5 --qty 10
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import heapq
+import json
+import math
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from .request_scheduler import BULK, request_priority
+
+INF = math.inf
+CATEGORY_PREFIX = "category:"
+BUY = "buy"
+
+
+class Recipe(NamedTuple):
+    id: str
+    output: str
+    quantity: float
+    ingredients: Tuple[Tuple[str, float], ...]
+
+
+def _qty(value: Any, default: float = 1.0) -> float:
+    try:
+        q = float(value)
+    except (TypeError, ValueError):
+        return default
+    return q if q > 0 else default
+
+
+def _node_id(ing: Dict[str, Any]) -> Optional[str]:
+    raw = ing.get("id") or ing.get("itemId")
+    if not raw:
+        return None
+    if str(ing.get("type") or "").lower() == "category":
+        return CATEGORY_PREFIX + str(raw).lower()
+    return str(raw).lower()
+
+
+def _outputs(d: Dict[str, Any]) -> List[Tuple[str, float]]:
+    out = d.get("output")
+    if isinstance(out, list):
+        return [(str(o["id"]).lower(), _qty(o.get("quantity"))) for o in out if isinstance(o, dict) and o.get("id")]
+    if isinstance(out, dict):
+        return [(str(out["id"]).lower(), _qty(out.get("quantity")))] if out.get("id") else []
+    output = out or d.get("itemId") or d.get("outputId")
+    return [(str(output).lower(), _qty(d.get("outputQuantity")))] if output else []
+
+
+def recipes_from_payload(raw: Dict[str, Any]) -> Tuple[List[Recipe], Dict[str, List[str]]]:
+    """
+    ([Recipe], {category node: [option item ids]}) from an NWDB recipe payload, {"data": {...}}
+    or bare. `output` may be one {id, quantity} or a list of them; each output gets a Recipe
+    costed at the full ingredient cost (ids "<recipe>:<output>" when there are several). The
+    list is empty when the payload names no output or no ingredients.
+    """
+    d = raw.get("data") if isinstance(raw.get("data"), dict) else raw
+    if not isinstance(d, dict):
+        return [], {}
+    outputs = _outputs(d)
+    categories: Dict[str, List[str]] = {}
+    ingredients = []
+    for ing in d.get("ingredients") or []:
+        if not isinstance(ing, dict):
+            continue
+        node = _node_id(ing)
+        if node is None:
+            continue
+        if node.startswith(CATEGORY_PREFIX):
+            options = [_node_id(o) for o in ing.get("subIngredients") or [] if isinstance(o, dict)]
+            categories[node] = [o for o in options if o]
+        ingredients.append((node, _qty(ing.get("quantity"))))
+    if not outputs or not ingredients:
+        return [], categories
+    recipe_id = str(d.get("id") or f"recipe_{outputs[0][0]}").lower()
+    if len(outputs) == 1:
+        return [Recipe(recipe_id, outputs[0][0], outputs[0][1], tuple(ingredients))], categories
+    return [Recipe(f"{recipe_id}:{o}", o, q, tuple(ingredients)) for o, q in outputs], categories
+
+
+class CraftingGraph:
+    def __init__(self, prices: Optional[Dict[str, float]] = None):
+        self.prices: Dict[str, float] = {}
+        self.recipes: Dict[str, Recipe] = {}
+        self._producers: Dict[str, List[Recipe]] = {}
+        self._options: Dict[str, Tuple[str, ...]] = {}
+        self._dependents: Dict[str, Set[str]] = {}
+        self._cost: Dict[str, float] = {}
+        self._choice: Dict[str, Optional[str]] = {}
+        # Components in dependency order, and each node's component index; None until resolved
+        self._components: Optional[List[List[str]]] = None
+        self._component_of: Dict[str, int] = {}
+        # Nodes of recipe loops that didn't converge, priced without their in-loop recipes
+        self.unstable: Set[str] = set()
+        self.stats = {"resolves": 0, "updates": 0, "evaluated": 0}
+        for item_id, price in (prices or {}).items():
+            self.prices[str(item_id).lower()] = float(price)
+
+    def __len__(self) -> int:
+        return len(self._nodes())
+
+    def _nodes(self) -> Set[str]:
+        nodes = set(self.prices) | set(self._producers) | set(self._options) | set(self._dependents)
+        for options in self._options.values():
+            nodes.update(options)
+        return nodes
+
+    def _deps(self, node: str) -> Iterable[str]:
+        if node in self._options:
+            return self._options[node]
+        return (i for r in self._producers.get(node, ()) for i, _ in r.ingredients)
+
+    def add_recipe(self, recipe: Recipe) -> None:
+        old = self.recipes.get(recipe.id)
+        if old is not None:
+            self._producers[old.output].remove(old)
+        self.recipes[recipe.id] = recipe
+        self._producers.setdefault(recipe.output, []).append(recipe)
+        for ingredient, _ in recipe.ingredients:
+            self._dependents.setdefault(ingredient, set()).add(recipe.output)
+        self._components = None
+
+    def add_category(self, node: str, options: Iterable[str]) -> None:
+        node = node if node.startswith(CATEGORY_PREFIX) else CATEGORY_PREFIX + node.lower()
+        merged = tuple(dict.fromkeys((*self._options.get(node, ()), *(str(o).lower() for o in options))))
+        self._options[node] = merged
+        for option in merged:
+            self._dependents.setdefault(option, set()).add(node)
+        self._components = None
+
+    def add_payload(self, raw: Dict[str, Any]) -> List[Recipe]:
+        recipes, categories = recipes_from_payload(raw)
+        for node, options in categories.items():
+            if options:
+                self.add_category(node, options)
+        for recipe in recipes:
+            self.add_recipe(recipe)
+        return recipes
+
+    # -- evaluation ----------------------------------------------------------------------
+
+    def _evaluate(self, node: str) -> Tuple[float, Optional[str]]:
+        cost = self._cost
+        options = self._options.get(node)
+        if options is not None:
+            best, how = INF, None
+            for option in options:
+                c = cost.get(option, INF)
+                if c < best:
+                    best, how = c, option
+            return best, how
+        price = self.prices.get(node)
+        best, how = (price, BUY) if price is not None else (INF, None)
+        for r in self._producers.get(node, ()):
+            total = 0.0
+            for ingredient, qty in r.ingredients:
+                total += qty * cost.get(ingredient, INF)
+                if total >= best * r.quantity:
+                    break
+            else:
+                total /= r.quantity
+                if total < best:
+                    best, how = total, r.id
+        return best, how
+
+    def _order(self) -> None:
+        """Tarjan's SCC, iteratively; components come out with ingredients before their products."""
+        index: Dict[str, int] = {}
+        low: Dict[str, int] = {}
+        on_stack: Set[str] = set()
+        stack: List[str] = []
+        components: List[List[str]] = []
+        counter = 0
+        for root in self._nodes():
+            if root in index:
+                continue
+            work = [(root, iter(self._deps(root)))]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, it = work[-1]
+                for dep in it:
+                    if dep not in index:
+                        index[dep] = low[dep] = counter
+                        counter += 1
+                        stack.append(dep)
+                        on_stack.add(dep)
+                        work.append((dep, iter(self._deps(dep))))
+                        break
+                    if dep in on_stack and index[dep] < low[node]:
+                        low[node] = index[dep]
+                else:
+                    work.pop()
+                    if work and low[node] < low[work[-1][0]]:
+                        low[work[-1][0]] = low[node]
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(component)
+        self._components = components
+        self._component_of = {n: i for i, c in enumerate(components) for n in c}
+
+    def _settle(self, component: List[str]) -> List[str]:
+        """Evaluate one component; returns the nodes whose cost changed."""
+        cost, choice = self._cost, self._choice
+        if len(component) == 1 and component[0] not in self._dependents.get(component[0], ()):
+            node = component[0]
+            self.stats["evaluated"] += 1
+            c, how = self._evaluate(node)
+            choice[node] = how
+            if cost.get(node) != c:
+                cost[node] = c
+                return [node]
+            return []
+        before = {n: cost.get(n) for n in component}
+        # A price going up inside a loop can't be relaxed downwards from the old values
+        for n in component:
+            cost[n] = INF
+        moved = True
+        for _ in range(len(component) + 1):
+            moved = False
+            for n in component:
+                self.stats["evaluated"] += 1
+                c, how = self._evaluate(n)
+                if c < cost[n]:
+                    cost[n], choice[n] = c, how
+                    moved = True
+                elif cost[n] == INF:
+                    choice[n] = how
+            if not moved:
+                break
+        if moved:
+            # Still getting cheaper: a loop with a net gain. Price it from outside only.
+            self.unstable.update(component)
+            for n in component:
+                cost[n] = INF
+            outside = [self._evaluate(n) for n in component]
+            self.stats["evaluated"] += len(component)
+            for n, (c, how) in zip(component, outside):
+                cost[n], choice[n] = c, how
+        else:
+            self.unstable.difference_update(component)
+        return [n for n in component if cost[n] != before[n]]
+
+    def resolve(self) -> Dict[str, float]:
+        """Price every node from scratch; returns {node: cost}."""
+        if self._components is None:
+            self._order()
+        self._cost.clear()
+        self._choice.clear()
+        self.unstable.clear()
+        for component in self._components:
+            self._settle(component)
+        self.stats["resolves"] += 1
+        return self._cost
+
+    def _ensure(self) -> None:
+        if self._components is None or not self._cost:
+            self.resolve()
+
+    def set_price(self, item_id: str, price: Optional[float]) -> List[str]:
+        """
+        Change (None removes) one buy price and re-price what depends on it.
+        Returns the nodes whose cost changed, in dependency order.
+        """
+        item_id = str(item_id).lower()
+        if price is None:
+            self.prices.pop(item_id, None)
+        else:
+            self.prices[item_id] = float(price)
+        if self._components is None or item_id not in self._component_of:
+            # New node or edited recipes: start over
+            old = dict(self._cost)
+            self._components = None
+            self.resolve()
+            return [n for n, c in self._cost.items() if old.get(n) != c]
+        self.stats["updates"] += 1
+        changed: List[str] = []
+        pending = [self._component_of[item_id]]
+        queued = set(pending)
+        while pending:
+            ci = heapq.heappop(pending)
+            for node in self._settle(self._components[ci]):
+                changed.append(node)
+                for dependent in self._dependents.get(node, ()):
+                    di = self._component_of[dependent]
+                    if di not in queued:
+                        queued.add(di)
+                        heapq.heappush(pending, di)
+        return changed
+
+    def update_prices(self, prices: Dict[str, Optional[float]]) -> List[str]:
+        changed: Dict[str, None] = {}
+        for item_id, price in prices.items():
+            changed.update(dict.fromkeys(self.set_price(item_id, price)))
+        return list(changed)
+
+    # -- queries -------------------------------------------------------------------------
+
+    def cost(self, item_id: str) -> float:
+        self._ensure()
+        return self._cost.get(str(item_id).lower(), INF)
+
+    def choice(self, item_id: str) -> Optional[str]:
+        """"buy", the id of the cheapest recipe, the chosen option of a category, or None."""
+        self._ensure()
+        return self._choice.get(str(item_id).lower())
+
+    def craftable(self) -> Dict[str, float]:
+        """{item: cost} for every item with a recipe and a finite cost."""
+        self._ensure()
+        return {i: self._cost[i] for i in self._producers if self._cost.get(i, INF) < INF}
+
+    def plan(self, item_id: str, qty: float = 1.0) -> Dict[str, Any]:
+        """The chosen way to get `qty` of an item, expanded down to what gets bought."""
+        self._ensure()
+        return self._plan(str(item_id).lower(), float(qty), set())
+
+    def _plan(self, node: str, qty: float, path: Set[str]) -> Dict[str, Any]:
+        c, how = self._cost.get(node, INF), self._choice.get(node)
+        step: Dict[str, Any] = {"id": node, "qty": qty, "cost": c * qty, "how": how}
+        if how is None or how == BUY or node in path:
+            return step
+        path.add(node)
+        if node in self._options:
+            step["ingredients"] = [self._plan(how, qty, path)]
+        else:
+            r = self.recipes[how]
+            crafts = qty / r.quantity
+            step["crafts"] = crafts
+            step["ingredients"] = [self._plan(i, q * crafts, path) for i, q in r.ingredients]
+        path.discard(node)
+        return step
+
+    def shopping_list(self, item_id: str, qty: float = 1.0) -> Dict[str, float]:
+        """{item: quantity} to buy for `qty` of an item, following plan()."""
+        out: Dict[str, float] = {}
+        stack = [self.plan(item_id, qty)]
+        while stack:
+            step = stack.pop()
+            if "ingredients" in step:
+                stack.extend(step["ingredients"])
+            else:
+                out[step["id"]] = out.get(step["id"], 0.0) + step["qty"]
+        return out
+
+
+async def load_from_service(
+    service, item_ids: Iterable[str], graph: Optional[CraftingGraph] = None,
+    concurrency: int = 8, max_items: int = 5000,
+) -> Tuple[CraftingGraph, List[str]]:
+    """
+    Fetch the recipes that make `item_ids`, then the recipes for their ingredients, and so on,
+    at bulk priority. Returns (graph, recipe ids that failed).
+    """
+    graph = graph or CraftingGraph()
+    limiter = asyncio.Semaphore(max(1, concurrency))
+    failed: List[str] = []
+    seen: Set[str] = set()
+
+    async def _item(item_id: str) -> List[str]:
+        async with limiter:
+            payload = await service.get_item_details_async(item_id)
+        d = payload.get("data") if isinstance(payload, dict) else None
+        if not isinstance(d, dict):
+            return []
+        recipes = [str(r.get("id")) for r in d.get("craftingRecipesOutput") or [] if isinstance(r, dict) and r.get("id")]
+        found = await asyncio.gather(*(_recipe(r) for r in recipes))
+        return [n for nodes in found for n in nodes]
+
+    async def _recipe(recipe_id: str) -> List[str]:
+        async with limiter:
+            data = await service.fetch_recipe(recipe_id)
+        if not data:
+            failed.append(recipe_id)
+            return []
+        recipes = graph.add_payload(data)
+        if not recipes:
+            return []
+        nodes = []
+        for ingredient, _ in recipes[0].ingredients:
+            nodes.extend(graph._options.get(ingredient, ()) if ingredient.startswith(CATEGORY_PREFIX) else (ingredient,))
+        return nodes
+
+    frontier = [str(i).lower() for i in dict.fromkeys(item_ids)]
+    with request_priority(BULK):
+        while frontier and len(seen) < max_items:
+            frontier = [i for i in dict.fromkeys(frontier) if i not in seen][:max_items - len(seen)]
+            seen.update(frontier)
+            found = await asyncio.gather(*(_item(i) for i in frontier))
+            frontier = [n for nodes in found for n in nodes if n not in seen]
+    return graph, failed
+
+
+def _iter_recipe_files(paths: Iterable[str]) -> Iterable[Dict[str, Any]]:
+    from .drop_index import iter_payload_file
+
+    for path in paths:
+        yield from iter_payload_file(path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cheapest craft-vs-buy cost per item")
+    parser.add_argument("recipes", nargs="+", help=".jsonl or {id: payload} .json files of NWDB recipe payloads")
+    parser.add_argument("--prices", required=True, help="JSON {item id: price}")
+    parser.add_argument("--item", default=None, help="show the plan for one item instead of pricing them all")
+    parser.add_argument("--qty", type=float, default=1.0)
+    parser.add_argument("--limit", type=int, default=25)
+    args = parser.parse_args(argv)
+
+    with open(args.prices, "r", encoding="utf-8") as fh:
+        graph = CraftingGraph(json.load(fh))
+    for raw in _iter_recipe_files(args.recipes):
+        graph.add_payload(raw)
+    if args.item:
+        print(json.dumps({"plan": graph.plan(args.item, args.qty), "buy": graph.shopping_list(args.item, args.qty)}, indent=2))
+        return 0
+    costs = graph.craftable()
+    crafted = sum(1 for i in costs if graph.choice(i) != BUY)
+    print(f"{len(costs)} craftable items priced ({crafted} cheaper to craft), {len(graph.recipes)} recipes")
+    if graph.unstable:
+        print(f"  recipe loops that gain items, priced without them: {', '.join(sorted(graph.unstable))}")
+    for item_id, c in sorted(costs.items(), key=lambda kv: -kv[1])[:args.limit]:
+        print(f"  {item_id:<40} {c:>12.2f}  {graph.choice(item_id)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
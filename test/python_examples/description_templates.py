@@ -0,0 +1,210 @@
+from __future__ import annotations
+import json
+import keyword
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+# Slot kinds. A slot is the text between "${" and the next "}".
+SLOT_CONST = 0    # ${150}                    -> 150
+SLOT_SCALED = 1   # ${20 * perkMultiplier}    -> 20 * vars["perkMultiplier"]
+SLOT_EXPR = 2     # anything else that compiles; evaluated with empty builtins
+SLOT_INVALID = 3  # does not compile; always rendered back verbatim
+
+_NUMERIC_CHARS = frozenset("0123456789.")
+
+
+class Slot(NamedTuple):
+    source: str
+    kind: int
+    value: float = 0.0
+    name: Optional[str] = None
+    code: Any = None
+
+
+class Template(NamedTuple):
+    """Alternating literal/slot pieces: literals[i] precedes slots[i]; literals has one extra tail entry."""
+    literals: Tuple[str, ...]
+    slots: Tuple[Slot, ...]
+
+    @property
+    def is_static(self) -> bool:
+        return not self.slots
+
+
+def format_number(val: float) -> str:
+    """At most 2 decimals, trailing zeros trimmed, ints when very close."""
+    if abs(val - round(val)) < 1e-9:
+        return str(int(round(val)))
+    s = f"{val:.2f}"
+    return s.rstrip("0").rstrip(".")
+
+
+def _is_number(token: str) -> bool:
+    # Mirrors `[0-9]+(?:\.[0-9]+)?`
+    if not token or not set(token) <= _NUMERIC_CHARS:
+        return False
+    head, sep, tail = token.partition(".")
+    return bool(head) and (not sep or (bool(tail) and "." not in tail))
+
+
+def _compile_slot(expr: str) -> Slot:
+    stripped = expr.strip()
+    body = stripped[1:].lstrip() if stripped.startswith("-") else stripped
+    if _is_number(body):
+        return Slot(expr, SLOT_CONST, float("".join(stripped.split())))
+    left, star, right = stripped.partition("*")
+    if star and "*" not in right:
+        left, right = left.strip(), right.strip()
+        if _is_number(left) and right.isidentifier() and not keyword.iskeyword(right):
+            return Slot(expr, SLOT_SCALED, float(left), right)
+    try:
+        code = compile(expr, "<description>", "eval")
+    except (SyntaxError, ValueError):
+        return Slot(expr, SLOT_INVALID)
+    return Slot(expr, SLOT_EXPR, code=code)
+
+
+@lru_cache(maxsize=16384)
+def compile_template(text: str) -> Template:
+    """Split `text` into literal segments and `${...}` slots. Cached by text."""
+    literals: List[str] = []
+    slots: List[Slot] = []
+    pos = 0
+    scan = 0
+    n = len(text)
+    while scan < n:
+        start = text.find("${", scan)
+        if start == -1:
+            break
+        end = text.find("}", start + 2)
+        if end == -1:
+            break
+        if end == start + 2:
+            # "${}" is not a slot; keep scanning after the "$"
+            scan = start + 1
+            continue
+        literals.append(text[pos:start])
+        slots.append(_compile_slot(text[start + 2:end]))
+        pos = scan = end + 1
+    literals.append(text[pos:])
+    return Template(tuple(literals), tuple(slots))
+
+
+def precompile(texts: Iterable[Optional[str]]) -> int:
+    """Warm the template cache; returns how many distinct non-empty texts were seen."""
+    seen = set()
+    for t in texts:
+        if t and isinstance(t, str) and t not in seen:
+            seen.add(t)
+            compile_template(t)
+    return len(seen)
+
+
+def _eval_slot(slot: Slot, variables: Mapping[str, Any]) -> Any:
+    """Return a number/str, or None when the slot can't be evaluated."""
+    if slot.kind == SLOT_CONST:
+        return slot.value
+    if slot.kind == SLOT_SCALED:
+        var = variables.get(slot.name)
+        if isinstance(var, (int, float)):
+            return slot.value * var
+        return None
+    if slot.kind == SLOT_EXPR:
+        try:
+            return eval(slot.code, {"__builtins__": {}}, dict(variables))
+        except Exception:
+            return None
+    return None
+
+
+def _slot_text(slot: Slot, variables: Mapping[str, Any]) -> Optional[str]:
+    val = _eval_slot(slot, variables)
+    if val is None:
+        return None
+    if isinstance(val, (int, float)):
+        return format_number(float(val))
+    return str(val)
+
+
+def render_text(tpl: Template, variables: Optional[Mapping[str, Any]] = None) -> str:
+    """Evaluate slots; unevaluable slots are kept as `${...}`."""
+    if tpl.is_static:
+        return tpl.literals[0]
+    variables = variables or {}
+    parts: List[str] = []
+    for lit, slot in zip(tpl.literals, tpl.slots):
+        parts.append(lit)
+        txt = _slot_text(slot, variables)
+        parts.append(txt if txt is not None else "${" + slot.source + "}")
+    parts.append(tpl.literals[-1])
+    return "".join(parts)
+
+
+def render_markdown(tpl: Template, variables: Optional[Mapping[str, Any]] = None) -> str:
+    """Like render_text but evaluated values are bolded."""
+    if tpl.is_static:
+        return tpl.literals[0]
+    variables = variables or {}
+    parts: List[str] = []
+    for lit, slot in zip(tpl.literals, tpl.slots):
+        parts.append(lit)
+        txt = _slot_text(slot, variables)
+        parts.append(f"**{txt}**" if txt is not None else "${" + slot.source + "}")
+    parts.append(tpl.literals[-1])
+    return "".join(parts)
+
+
+def render_raw(tpl: Template) -> str:
+    """Drop the `${` `}` markers and keep the slot source as-is."""
+    if tpl.is_static:
+        return tpl.literals[0]
+    parts: List[str] = []
+    for lit, slot in zip(tpl.literals, tpl.slots):
+        parts.append(lit)
+        parts.append(slot.source)
+    parts.append(tpl.literals[-1])
+    return "".join(parts)
+
+
+def render_values(tpl: Template, variables: Optional[Mapping[str, Any]] = None) -> List[Optional[float]]:
+    """Numeric value per slot (None when not numeric/evaluable)."""
+    variables = variables or {}
+    out: List[Optional[float]] = []
+    for slot in tpl.slots:
+        val = _eval_slot(slot, variables)
+        out.append(float(val) if isinstance(val, (int, float)) else None)
+    return out
+
+
+def scaled_coefficient(tpl: Template, name: str = "perkMultiplier") -> Optional[float]:
+    """Constant X of the first `${X * name}` slot, if any."""
+    for slot in tpl.slots:
+        if slot.kind == SLOT_SCALED and slot.name == name:
+            return slot.value
+    return None
+
+
+def load_ability_tooltips(path: str | Path, fmt: str = "text") -> Dict[str, str]:
+    """
+    Render every description in data/skills.json or data/weapon-abilities.json.
+    Returns {ability_id: rendered}. `fmt` is "text", "markdown" or "raw".
+    """
+    renderer = {"text": render_text, "markdown": render_markdown, "raw": render_raw}.get(fmt)
+    if renderer is None:
+        raise ValueError(f"unknown format: {fmt}")
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    out: Dict[str, str] = {}
+    for weapon in (data or {}).values():
+        if not isinstance(weapon, dict):
+            continue
+        entries = weapon.get("skills") or weapon.get("abilities") or []
+        for entry in entries:
+            if not isinstance(entry, dict) or not entry.get("id"):
+                continue
+            desc = entry.get("description")
+            if not isinstance(desc, str):
+                continue
+            out[str(entry["id"])] = renderer(compile_template(desc))
+    return out
@@ -0,0 +1,255 @@
+"""
+Reverse drop-source index: creature / loot container / gatherable / zone → items.
+
+Item payloads list their own sources (monstersWithDrop, drops_lootcontainer_from,
+gatherablesWithItem, and {!zone} tags inside monstersWithDrop.lootTagRestrictions).
+`DropIndex.add` folds one payload into posting lists so "what does X drop?" is a dict lookup
+instead of a scan over every item. Adding an item again replaces its postings. Each list is
+sorted by item id on its first lookup after it changes, not on every lookup.
+
+On disk (`save` / `load`, gzip when the path ends in .gz) items are stored once and
+posting lists hold their row numbers:
+
+    {"version": 1,
+     "items": [[id, name], ...],
+     "sources": {kind: {key: [name, [row, ...]]}}}
+
+Keys are lowercased source ids; zones are keyed by their numeric id (as a string), or by
+lowercased name when a tag carries no id.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .loot_tags import ZONE_PREFIX, parse_zone_tag
+from .request_scheduler import BULK, request_priority
+
+INDEX_VERSION = 1
+KINDS = ("creature", "container", "gatherable", "zone")
+_SOURCE_FIELDS = (
+    ("creature", "monstersWithDrop"),
+    ("container", "drops_lootcontainer_from"),
+    ("gatherable", "gatherablesWithItem"),
+)
+
+
+def _key(value: Any) -> str:
+    return str(value).strip().lower()
+
+
+def _zone_tags(ltr: Any) -> Iterable[str]:
+    if not isinstance(ltr, dict):
+        return
+    for bval in ltr.get("b") or []:
+        for tag in (bval if isinstance(bval, list) else [bval]):
+            if isinstance(tag, str) and tag.startswith(ZONE_PREFIX):
+                yield tag
+
+
+class DropIndex:
+    def __init__(self):
+        self._rows: Dict[str, int] = {}
+        self.items: List[Tuple[str, str]] = []
+        # kind -> key -> [display name, set of item rows, rows by item id (None until looked up)]
+        self.sources: Dict[str, Dict[str, list]] = {k: {} for k in KINDS}
+        # item row -> the (kind, key) postings it is in, so re-adding it can drop them
+        self._posted: Dict[int, set] = {}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _row(self, item_id: str, name: str) -> int:
+        row = self._rows.get(item_id)
+        if row is None:
+            row = self._rows[item_id] = len(self.items)
+            self.items.append((item_id, name))
+        elif name and not self.items[row][1]:
+            self.items[row] = (item_id, name)
+        return row
+
+    def _post(self, kind: str, key: str, name: Any, row: int) -> None:
+        if not key:
+            return
+        entry = self.sources[kind].get(key)
+        if entry is None:
+            entry = self.sources[kind][key] = [name or None, set(), None]
+        elif name and not entry[0]:
+            entry[0] = name
+        if row not in entry[1]:
+            entry[1].add(row)
+            entry[2] = None
+        self._posted.setdefault(row, set()).add((kind, key))
+
+    def _unpost(self, row: int) -> None:
+        for kind, key in self._posted.pop(row, ()):
+            entry = self.sources[kind].get(key)
+            if entry is None:
+                continue
+            entry[1].discard(row)
+            entry[2] = None
+            if not entry[1]:
+                del self.sources[kind][key]
+
+    def add(self, raw: Dict[str, Any]) -> bool:
+        """Index one item payload ({"data": {...}} or the bare record). False when it has no id."""
+        d = raw.get("data") if isinstance(raw.get("data"), dict) else raw
+        item_id = d.get("id")
+        if not item_id:
+            return False
+        row = self._row(str(item_id), str(d.get("name") or ""))
+        self._unpost(row)
+        for kind, field in _SOURCE_FIELDS:
+            for src in d.get(field) or []:
+                if isinstance(src, dict) and src.get("id"):
+                    self._post(kind, _key(src["id"]), src.get("name"), row)
+        for m in d.get("monstersWithDrop") or []:
+            if not isinstance(m, dict):
+                continue
+            for tag in _zone_tags(m.get("lootTagRestrictions")):
+                zone, zone_id = parse_zone_tag(tag)
+                self._post("zone", _key(zone_id if zone_id is not None else zone or ""), zone, row)
+        return True
+
+    def extend(self, payloads: Iterable[Dict[str, Any]]) -> int:
+        return sum(1 for raw in payloads if isinstance(raw, dict) and self.add(raw))
+
+    def lookup(self, kind: str, key: Any) -> List[Dict[str, str]]:
+        """Items dropped by / found in the given source, ordered by item id."""
+        entry = self.sources[kind].get(_key(key))
+        if entry is None:
+            return []
+        if entry[2] is None:
+            entry[2] = sorted(entry[1], key=lambda r: self.items[r][0])
+        items = self.items
+        return [{"id": items[r][0], "name": items[r][1]} for r in entry[2]]
+
+    def source_name(self, kind: str, key: Any) -> Optional[str]:
+        entry = self.sources[kind].get(_key(key))
+        return entry[0] if entry else None
+
+    def creature(self, creature_id: Any) -> List[Dict[str, str]]:
+        return self.lookup("creature", creature_id)
+
+    def container(self, container_id: Any) -> List[Dict[str, str]]:
+        return self.lookup("container", container_id)
+
+    def gatherable(self, gatherable_id: Any) -> List[Dict[str, str]]:
+        return self.lookup("gatherable", gatherable_id)
+
+    def zone(self, zone: Any) -> List[Dict[str, str]]:
+        return self.lookup("zone", zone)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": INDEX_VERSION,
+            "items": [list(it) for it in self.items],
+            "sources": {
+                kind: {key: [name, sorted(rows)] for key, (name, rows, _) in entries.items()}
+                for kind, entries in self.sources.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> "DropIndex":
+        if payload.get("version") != INDEX_VERSION:
+            raise ValueError(f"unsupported drop index version: {payload.get('version')!r}")
+        index = cls()
+        for item_id, name in payload.get("items") or []:
+            index._row(item_id, name)
+        for kind, entries in (payload.get("sources") or {}).items():
+            index.sources[kind] = {key: [name, set(rows), None] for key, (name, rows) in entries.items()}
+            for key, (_, rows, _) in index.sources[kind].items():
+                for row in rows:
+                    index._posted.setdefault(row, set()).add((kind, key))
+        return index
+
+    def save(self, path: str) -> None:
+        """Write atomically (temp file + rename)."""
+        body = json.dumps(self.to_dict(), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        if path.endswith(".gz"):
+            body = gzip.compress(body, mtime=0)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(body)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "DropIndex":
+        with open(path, "rb") as fh:
+            body = fh.read()
+        if path.endswith(".gz"):
+            body = gzip.decompress(body)
+        return cls.from_dict(json.loads(body))
+
+
+def iter_payload_file(path: str) -> Iterable[Dict[str, Any]]:
+    """Item payloads from a JSON Lines file (one payload per line) or an {id: payload} JSON map."""
+    with open(path, encoding="utf-8") as fh:
+        if path.endswith(".jsonl"):
+            for line in fh:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+        payload = json.load(fh)
+    yield from (payload.values() if isinstance(payload, dict) else payload)
+
+
+async def index_from_service(service, item_ids: Iterable[str], concurrency: int = 8,
+                             index: Optional[DropIndex] = None) -> Tuple[DropIndex, List[str]]:
+    """
+    Fetch item payloads through NWDBService and index each one as it arrives.
+    Returns (index, ids that failed).
+    """
+    index = index or DropIndex()
+    limiter = asyncio.Semaphore(max(1, concurrency))
+    failed: List[str] = []
+
+    async def _one(item_id: str) -> None:
+        async with limiter:
+            payload = await service.get_item_details_async(item_id)
+        if not isinstance(payload, dict) or payload.get("error") or not index.add(payload):
+            failed.append(item_id)
+
+    with request_priority(BULK):
+        await asyncio.gather(*(_one(i) for i in dict.fromkeys(item_ids)))
+    return index, failed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build or query the reverse drop-source index")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    build = sub.add_parser("build", help="index item payload files")
+    build.add_argument("payloads", nargs="+", help=".jsonl or {id: payload} .json files")
+    build.add_argument("--out", required=True, help="index path (.json or .json.gz)")
+    query = sub.add_parser("query", help="items for one source")
+    query.add_argument("index")
+    query.add_argument("kind", choices=KINDS)
+    query.add_argument("key")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "build":
+        index = DropIndex()
+        n = sum(index.extend(iter_payload_file(p)) for p in args.payloads)
+        index.save(args.out)
+        counts = ", ".join(f"{k}={len(v)}" for k, v in index.sources.items())
+        print(f"indexed {n} payloads ({len(index)} items; {counts}) -> {args.out}")
+        return 0
+    index = DropIndex.load(args.index)
+    print(json.dumps({"source": index.source_name(args.kind, args.key), "items": index.lookup(args.kind, args.key)},
+                     indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
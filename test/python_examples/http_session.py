@@ -0,0 +1,150 @@
+"""
+Tuned HTTP sessions for NWDBService.
+
+`create_session` builds an aiohttp.ClientSession over a TCPConnector with pool limits,
+keep-alive and a DNS cache; `create_sync_session` is the pooled `requests.Session`
+counterpart for the blocking paths. Both advertise gzip (and brotli when a brotli
+package is installed, which is also what lets aiohttp/urllib3 decode it).
+
+Pass a ConnectionStats to either factory to count, per host, new connections vs reused
+keep-alive connections, pool waits and DNS cache hits.
+"""
+from __future__ import annotations
+from collections import defaultdict
+from typing import Any, Dict, NamedTuple, Optional
+
+try:
+    import brotli  # noqa: F401
+    HAS_BROTLI = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        HAS_BROTLI = True
+    except ImportError:
+        HAS_BROTLI = False
+
+ACCEPT_ENCODING = "gzip, deflate, br" if HAS_BROTLI else "gzip, deflate"
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/140.0.0.0 Safari/537.36"
+)
+
+
+class SessionSettings(NamedTuple):
+    limit: int = 64                  # connections across all hosts
+    limit_per_host: int = 16
+    keepalive_timeout: float = 30.0  # idle seconds before a pooled connection is closed
+    ttl_dns_cache: int = 300
+    total_timeout: float = 10.0
+    connect_timeout: float = 5.0
+
+
+COUNTERS = ("requests", "created", "reused", "queued", "dns_hits", "dns_misses")
+
+
+class ConnectionStats:
+    """Per-host connection counters; `reused / requests` is the warm-connection ratio."""
+
+    def __init__(self):
+        self._hosts: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        self._sync_sessions = []
+
+    def incr(self, host: str, counter: str, n: int = 1) -> None:
+        self._hosts[host or "?"][counter] += n
+
+    def trace_config(self):
+        import aiohttp
+
+        tc = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            ctx.host = params.url.host
+            self.incr(ctx.host, "requests")
+
+        async def on_created(session, ctx, params):
+            self.incr(getattr(ctx, "host", None), "created")
+
+        async def on_reused(session, ctx, params):
+            self.incr(getattr(ctx, "host", None), "reused")
+
+        async def on_queued(session, ctx, params):
+            self.incr(getattr(ctx, "host", None), "queued")
+
+        async def on_dns_hit(session, ctx, params):
+            self.incr(params.host, "dns_hits")
+
+        async def on_dns_miss(session, ctx, params):
+            self.incr(params.host, "dns_misses")
+
+        tc.on_request_start.append(on_request_start)
+        tc.on_connection_create_end.append(on_created)
+        tc.on_connection_reuseconn.append(on_reused)
+        tc.on_connection_queued_start.append(on_queued)
+        tc.on_dns_cache_hit.append(on_dns_hit)
+        tc.on_dns_cache_miss.append(on_dns_miss)
+        return tc
+
+    def track_sync(self, session) -> None:
+        self._sync_sessions.append(session)
+
+    def _sync_counts(self) -> Dict[str, Dict[str, int]]:
+        # urllib3 pools count requests and connections opened; the difference rode a kept-alive one
+        out: Dict[str, Dict[str, int]] = {}
+        for session in self._sync_sessions:
+            # One adapter is mounted for both schemes
+            for adapter in {id(a): a for a in session.adapters.values()}.values():
+                pools = adapter.poolmanager.pools
+                for key in list(pools.keys()):
+                    pool = pools.get(key)
+                    if pool is None:
+                        continue
+                    c = out.setdefault(pool.host, {"requests": 0, "created": 0, "reused": 0})
+                    c["requests"] += pool.num_requests
+                    c["created"] += pool.num_connections
+                    c["reused"] += max(0, pool.num_requests - pool.num_connections)
+        return out
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"async": {h: dict(c) for h, c in self._hosts.items()}, "sync": self._sync_counts()}
+
+
+def create_session(
+    settings: Optional[SessionSettings] = None,
+    stats: Optional[ConnectionStats] = None,
+    headers: Optional[Dict[str, str]] = None,
+):
+    """aiohttp.ClientSession over a tuned connector. Call from within the event loop."""
+    import aiohttp
+
+    s = settings or SessionSettings()
+    connector = aiohttp.TCPConnector(
+        limit=s.limit,
+        limit_per_host=s.limit_per_host,
+        keepalive_timeout=s.keepalive_timeout,
+        ttl_dns_cache=s.ttl_dns_cache,
+        use_dns_cache=True,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=s.total_timeout, connect=s.connect_timeout),
+        headers={"User-Agent": USER_AGENT, "Accept": "*/*", "Accept-Encoding": ACCEPT_ENCODING, **(headers or {})},
+        auto_decompress=True,
+        trace_configs=[stats.trace_config()] if stats is not None else None,
+    )
+
+
+def create_sync_session(settings: Optional[SessionSettings] = None, stats: Optional[ConnectionStats] = None):
+    """Pooled requests.Session; reusing it keeps connections to nwdb.info warm."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    s = settings or SessionSettings()
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=s.limit_per_host)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT, "Accept": "*/*", "Accept-Encoding": ACCEPT_ENCODING})
+    if stats is not None:
+        stats.track_sync(session)
+    return session
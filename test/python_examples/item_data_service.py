@@ -1,7 +1,9 @@
 from __future__ import annotations
 from typing import Any, Dict, List, Optional
 import math
-import re
+
+from .description_templates import compile_template, render_text, scaled_coefficient
+from .loot_tags import decode_restrictions
 
 ICON_CDN_PREFIX = "https://cdn.nwdb.info/db/images/live/v56/"
 
@@ -39,6 +41,119 @@ def _entity_link(ent: Dict[str, Any]) -> Optional[str]:
     return None
 
 
+# Perk scaling; shared with perk_ranking, which evaluates the same curves over arrays
+GS_MIN_DEFAULT = 100
+
+
+def parse_scaling(s: Optional[str]) -> Dict[str, Any]:
+    """Parse ScalingPerGearScore like '0.0019,625:0.006667,700:0.00'.
+    Returns {"segments": [(startGS:int, slope:float)], "capGS": int|None}.
+    Interpretation: piecewise linear per-GS slope. First number is the initial
+    slope starting at GS_MIN_DEFAULT. Each 'N:V' defines a new slope V starting at GS N.
+    The largest N is treated as capGS (no increases beyond it when clamping GS).
+    """
+    segs: List[tuple] = []
+    cap_gs = None
+    if not s or not isinstance(s, str):
+        return {"segments": segs, "capGS": cap_gs}
+    parts = [p.strip() for p in s.split(",") if p is not None and p.strip() != ""]
+    # initial slope
+    if parts:
+        try:
+            first_slope = float(parts[0])
+            segs.append((GS_MIN_DEFAULT, first_slope))
+        except Exception:
+            pass
+    # anchors
+    for token in parts[1:]:
+        if ":" in token:
+            left, right = token.split(":", 1)
+            try:
+                g = int(float(left))
+            except Exception:
+                continue
+            try:
+                slope = float(right)
+            except Exception:
+                continue
+            segs.append((g, slope))
+            if (cap_gs is None) or (g > cap_gs):
+                cap_gs = g
+    # sort segments by start GS and dedupe by start (keep last occurrence)
+    segs_dict: Dict[int, float] = {}
+    for g, sl in segs:
+        segs_dict[int(g)] = float(sl)
+    segs = sorted(segs_dict.items(), key=lambda x: x[0])
+    return {"segments": segs, "capGS": cap_gs}
+
+
+# Known UI values at GS 700 to anchor intercepts precisely (final percent numbers shown in UI).
+# Map: perkId -> final_percent_at_700 (not the multiplier; the displayed percentage).
+PERK_UI700_PERCENT: Dict[str, float] = {
+    # Divine (amulet): shows 10% at GS 700
+    "perkid_amulet_healing": 10.0,
+    # Refreshing Move: shows 2.5% at GS 700
+    "perkid_weapon_cdrbasic": 2.5,
+    # Trenchant Strikes/Crits (your IDs)
+    "perkid_weapon_melee_chargedheavy_dmg": 20.0,
+    "perkid_weapon_melee_chargedheavy_crit": 31.0,
+}
+
+
+# Optional per-perk max multiplier overrides when no UI-700 anchor is known
+PERK_MAX_MULTIPLIER: Dict[str, float] = {
+    # Keep legacy cap only as fallback when we cannot anchor via UI700
+    "perkid_amulet_healing": 2.0,
+}
+
+
+def area_to_gs(segs: List[tuple], gs_start: int, gs_end: int) -> float:
+    """Sum slope*span across segments from gs_start to gs_end (exclusive of upper bound)."""
+    if gs_end <= gs_start or not segs:
+        return 0.0
+    total = 0.0
+    limit = gs_end
+    for idx, (start, slope) in enumerate(segs):
+        s = max(gs_start, int(start))
+        next_start = segs[idx + 1][0] if idx + 1 < len(segs) else limit
+        e = min(int(next_start), limit)
+        span = max(0, e - s)
+        if span > 0:
+            total += float(slope) * span
+    return total
+
+
+def perk_multiplier(gs: Optional[int], scaling: Optional[str], perk_id: Optional[str], desc: Optional[str] = None) -> float:
+    meta = parse_scaling(scaling or "")
+    segs = meta.get("segments") or []
+    if not isinstance(gs, int) or not segs:
+        return 1.0
+    cap_gs = meta.get("capGS") or 700
+    g_eff = max(GS_MIN_DEFAULT, min(int(gs), int(cap_gs)))
+    # Try to anchor intercept using known UI700 value if available and we can extract X
+    ui700 = PERK_UI700_PERCENT.get(str(perk_id or ""))
+    # Constant X from a pattern like ${X * perkMultiplier}
+    base_x = scaled_coefficient(compile_template(desc)) if isinstance(desc, str) else None
+
+    if isinstance(ui700, (int, float)) and isinstance(base_x, (int, float)) and base_x != 0:
+        target_m700 = float(ui700) / float(base_x)
+        # area from 100 to 700 based on slopes
+        area_100_700 = area_to_gs(segs, GS_MIN_DEFAULT, 700)
+        intercept = target_m700 - area_100_700
+        # compute area from 100 to g_eff
+        area_100_g = area_to_gs(segs, GS_MIN_DEFAULT, g_eff)
+        mult = float(intercept) + area_100_g
+        return mult
+    else:
+        # Fallback to baseline of 1.0 plus accumulated area up to g_eff
+        total = area_to_gs(segs, GS_MIN_DEFAULT, g_eff)
+        mult = 1.0 + total
+        max_mult = PERK_MAX_MULTIPLIER.get(str(perk_id or ""))
+        if isinstance(max_mult, (int, float)):
+            mult = min(mult, float(max_mult))
+        return mult
+
+
 def build_item_info(raw: Dict[str, Any]) -> Dict[str, Any]:
     """
     Build a simplified, embed-friendly JSON from NWDB item payload (expects the inner `data`).
@@ -73,155 +188,14 @@ def build_item_info(raw: Dict[str, Any]) -> Dict[str, Any]:
     gs_max = d.get("gearScoreMax")
 
     # Core fields
-    # Helpers: perk scaling and description evaluation
-    GS_MIN_DEFAULT = 100
-
-    def _parse_scaling(s: Optional[str]) -> Dict[str, Any]:
-        """Parse ScalingPerGearScore like '0.0019,625:0.006667,700:0.00'.
-        Returns {"segments": [(startGS:int, slope:float)], "capGS": int|None}.
-        Interpretation: piecewise linear per-GS slope. First number is the initial
-        slope starting at GS_MIN_DEFAULT. Each 'N:V' defines a new slope V starting at GS N.
-        The largest N is treated as capGS (no increases beyond it when clamping GS).
-        """
-        segs: List[tuple] = []
-        cap_gs = None
-        if not s or not isinstance(s, str):
-            return {"segments": segs, "capGS": cap_gs}
-        parts = [p.strip() for p in s.split(",") if p is not None and p.strip() != ""]
-        # initial slope
-        if parts:
-            try:
-                first_slope = float(parts[0])
-                segs.append((GS_MIN_DEFAULT, first_slope))
-            except Exception:
-                pass
-        # anchors
-        for token in parts[1:]:
-            if ":" in token:
-                left, right = token.split(":", 1)
-                try:
-                    g = int(float(left))
-                except Exception:
-                    continue
-                try:
-                    slope = float(right)
-                except Exception:
-                    continue
-                segs.append((g, slope))
-                if (cap_gs is None) or (g > cap_gs):
-                    cap_gs = g
-        # sort segments by start GS and dedupe by start (keep last occurrence)
-        segs_dict: Dict[int, float] = {}
-        for g, sl in segs:
-            segs_dict[int(g)] = float(sl)
-        segs = sorted(segs_dict.items(), key=lambda x: x[0])
-        return {"segments": segs, "capGS": cap_gs}
-
-    # Known UI values at GS 700 to anchor intercepts precisely (final percent numbers shown in UI).
-    # Map: perkId -> final_percent_at_700 (not the multiplier; the displayed percentage).
-    PERK_UI700_PERCENT: Dict[str, float] = {
-        # Divine (amulet): shows 10% at GS 700
-        "perkid_amulet_healing": 10.0,
-        # Refreshing Move: shows 2.5% at GS 700
-        "perkid_weapon_cdrbasic": 2.5,
-        # Trenchant Strikes/Crits (your IDs)
-        "perkid_weapon_melee_chargedheavy_dmg": 20.0,
-        "perkid_weapon_melee_chargedheavy_crit": 31.0,
-    }
-
-    # Optional per-perk max multiplier overrides when no UI-700 anchor is known
-    PERK_MAX_MULTIPLIER: Dict[str, float] = {
-        # Keep legacy cap only as fallback when we cannot anchor via UI700
-        "perkid_amulet_healing": 2.0,
-    }
-
-    def _area_to_gs(segs: List[tuple], gs_start: int, gs_end: int) -> float:
-        """Sum slope*span across segments from gs_start to gs_end (exclusive of upper bound)."""
-        if gs_end <= gs_start or not segs:
-            return 0.0
-        total = 0.0
-        limit = gs_end
-        for idx, (start, slope) in enumerate(segs):
-            s = max(gs_start, int(start))
-            next_start = segs[idx + 1][0] if idx + 1 < len(segs) else limit
-            e = min(int(next_start), limit)
-            span = max(0, e - s)
-            if span > 0:
-                total += float(slope) * span
-        return total
-
-    # Extract the constant X from a pattern like ${X * perkMultiplier}
-    _PM_COEFF = re.compile(r"\$\{\s*([0-9]+(?:\.[0-9]+)?)\s*\*\s*perkMultiplier\s*\}")
-
-    def _perk_multiplier(gs: Optional[int], scaling: Optional[str], perk_id: Optional[str], desc: Optional[str] = None) -> float:
-        meta = _parse_scaling(scaling or "")
-        segs = meta.get("segments") or []
-        if not isinstance(gs, int) or not segs:
-            return 1.0
-        cap_gs = meta.get("capGS") or 700
-        g_eff = max(GS_MIN_DEFAULT, min(int(gs), int(cap_gs)))
-        # Try to anchor intercept using known UI700 value if available and we can extract X
-        ui700 = PERK_UI700_PERCENT.get(str(perk_id or ""))
-        base_x = None
-        if isinstance(desc, str):
-            m = _PM_COEFF.search(desc)
-            if m:
-                try:
-                    base_x = float(m.group(1))
-                except Exception:
-                    base_x = None
-
-        if isinstance(ui700, (int, float)) and isinstance(base_x, (int, float)) and base_x != 0:
-            target_m700 = float(ui700) / float(base_x)
-            # area from 100 to 700 based on slopes
-            area_100_700 = _area_to_gs(segs, GS_MIN_DEFAULT, 700)
-            intercept = target_m700 - area_100_700
-            # compute area from 100 to g_eff
-            area_100_g = _area_to_gs(segs, GS_MIN_DEFAULT, g_eff)
-            mult = float(intercept) + area_100_g
-            return mult
-        else:
-            # Fallback to baseline of 1.0 plus accumulated area up to g_eff
-            total = _area_to_gs(segs, GS_MIN_DEFAULT, g_eff)
-            mult = 1.0 + total
-            max_mult = PERK_MAX_MULTIPLIER.get(str(perk_id or ""))
-            if isinstance(max_mult, (int, float)):
-                mult = min(mult, float(max_mult))
-            return mult
-
-    _SAFE_EXPR = re.compile(r"\$\{([^}]+)\}")
-
+    # Helpers: description evaluation
     def _eval_perk_description(desc: Optional[str], mult: float) -> str:
         """Replace ${...} with evaluated numbers using variable perkMultiplier.
         Supports basic arithmetic only. Formats numbers to at most 2 decimals, trimming zeros.
         """
         if not desc or not isinstance(desc, str):
             return desc or ""
-
-        def _fmt_num(val: float) -> str:
-            if val is None:
-                return ""
-            # prefer int when very close
-            if abs(val - round(val)) < 1e-9:
-                return str(int(round(val)))
-            s = f"{val:.2f}"
-            s = s.rstrip("0").rstrip(".")
-            return s
-
-        def repl(m: re.Match) -> str:
-            expr = m.group(1)
-            # whitelist variables and operators
-            allowed_names = {"perkMultiplier": mult}
-            try:
-                # Evaluate with empty globals and allowed locals
-                val = eval(expr, {"__builtins__": {}}, allowed_names)
-                if isinstance(val, (int, float)):
-                    return _fmt_num(float(val))
-                return str(val)
-            except Exception:
-                return m.group(0)
-
-        return _SAFE_EXPR.sub(repl, desc)
+        return render_text(compile_template(desc), {"perkMultiplier": mult})
 
     out: Dict[str, Any] = {
         "name": d.get("name"),
@@ -237,7 +211,7 @@ def build_item_info(raw: Dict[str, Any]) -> Dict[str, Any]:
                 "name": _p.get("name"),
                 "description": _eval_perk_description(
                     _p.get("description"),
-                    _perk_multiplier(
+                    perk_multiplier(
                         gs_max if isinstance(gs_max, int) else None,
                         _p.get("ScalingPerGearScore"),
                         _p.get("id"),
@@ -440,60 +414,22 @@ def build_item_info(raw: Dict[str, Any]) -> Dict[str, Any]:
     m_src = d.get("monstersWithDrop")
     for m in _take(m_src, 10):
         ltr = m.get("lootTagRestrictions") or {}
-        # Extract player level (from t) and area/zone (from b)
-        player_lvl = None
-        zone = None
-        zone_id = None
-        other_tags: List[str] = []
-        t_list = ltr.get("t") or []
-        for tval in t_list:
-            if isinstance(tval, str) and "{!plvl}" in tval:
-                try:
-                    player_lvl = tval.split("}", 1)[1]
-                except Exception:
-                    player_lvl = tval
-                break
-        b_list = ltr.get("b") or []
-        # Flatten nested lists
-        flat_b: List[str] = []
-        for bval in b_list:
-            if isinstance(bval, list):
-                flat_b.extend([str(x) for x in bval if isinstance(x, (str, int))])
-            elif isinstance(bval, str):
-                flat_b.append(bval)
-        for bval in flat_b:
-            if isinstance(bval, str) and bval.startswith("{!zone}"):
-                try:
-                    rest = bval.split("}", 1)[1]
-                    # "Name|||12345" → (Name, 12345)
-                    parts = rest.split("|||")
-                    zone = parts[0] if parts else rest
-                    if len(parts) > 1 and parts[1]:
-                        try:
-                            zone_id = int(parts[1])
-                        except Exception:
-                            zone_id = parts[1]
-                except Exception:
-                    zone = bval
-                # keep scanning to also collect other tags present in b
-            elif isinstance(bval, str):
-                # Collect any additional textual tags from b (e.g., "Mutated Expedition")
-                val = bval.strip()
-                if val and val not in other_tags:
-                    other_tags.append(val)
+        # Memoized per distinct restriction set; see loot_tags
+        lr = decode_restrictions(ltr)
+        other_tags = list(lr.tags)
 
         entry = {
             "id": m.get("id"),
             "type": m.get("type"),
             "name": m.get("name"),
             "level": m.get("Level"),
-            "area": zone,
-            "areaId": zone_id,
-            "playerLevelReq": player_lvl,
+            "area": lr.zone,
+            "areaId": lr.zone_id,
+            "playerLevelReq": lr.player_level,
             # Expose additional restrictions/tags found alongside zone (e.g., Mutated Expedition)
             "restrictions": other_tags or None,
             # Convenience boolean for common case
-            "isMutatedExpedition": ("Mutated Expedition" in other_tags) if other_tags else None,
+            "isMutatedExpedition": lr.is_mutated_expedition,
             "lootTagRestrictions": ltr or None,
             "link": _entity_link(m),
         }
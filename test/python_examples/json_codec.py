@@ -0,0 +1,151 @@
+"""
+JSON decoding for NWDB / nw-buddy payloads.
+
+`get_decoder()` picks the fastest backend installed (msgspec, orjson, then the stdlib).
+Decoders take the raw response bytes. With msgspec, the endpoints listed in SCHEMAS are
+decoded against TypedDicts naming only the fields this package reads, so every other field
+is skipped during parsing instead of materialised. The result is still plain dicts and lists.
+A payload that doesn't fit its schema is decoded untyped rather than rejected.
+"""
+from __future__ import annotations
+import json
+from importlib.util import find_spec
+from typing import Any, Callable, Dict, List, Optional, TypedDict, Union
+
+
+class SearchEntry(TypedDict, total=False):
+    type: Any
+    id: Any
+    name: Any
+    slug: Any
+
+
+class SearchAll(TypedDict, total=False):
+    data: List[SearchEntry]
+
+
+class Perk(TypedDict, total=False):
+    id: Any
+    name: Any
+    description: Any
+    ScalingPerGearScore: Any
+
+
+class PerksPage(TypedDict, total=False):
+    pageCount: Any
+    data: List[Perk]
+    error: Any
+
+
+class ItemSummary(TypedDict, total=False):
+    id: Any
+    name: Any
+    description: Any
+    # perk_ranking.PerkRanker.add_listing
+    gearScoreMax: Any
+
+
+class ItemsPage(TypedDict, total=False):
+    pageCount: Any
+    data: List[ItemSummary]
+    error: Any
+
+
+class ObjectiveTask(TypedDict, total=False):
+    TaskID: Any
+    Type: Any
+    KillEnemyType: Any
+    TargetQty: Any
+    POITag: Any
+    TerritoryID: Any
+    GameModeID: Any
+
+
+class ObjectiveTasks(TypedDict, total=False):
+    data: List[ObjectiveTask]
+
+
+class GameMode(TypedDict, total=False):
+    GameModeId: Any
+    DisplayName: Any
+    ScriptName: Any
+
+
+# Metrics endpoint label -> schema. Item detail payloads feed build_item_info, which reads
+# most of the record, so they stay untyped.
+SCHEMAS: Dict[str, Any] = {
+    "search_all": SearchAll,
+    "perks_page": PerksPage,
+    "items_by_perk": ItemsPage,
+    # nw-buddy has served both a bare list and a {"data": [...]} wrapper
+    "nwbuddy_objective_tasks": Union[List[ObjectiveTask], ObjectiveTasks],
+    "nwbuddy_gamemodes": List[GameMode],
+}
+
+
+class JSONDecoder:
+    """Decode raw JSON bytes, optionally against a schema from SCHEMAS. Bad JSON raises ValueError."""
+
+    name = "json"
+
+    def __init__(self, loads: Callable[[bytes], Any] = json.loads):
+        self._loads = loads
+
+    def decode(self, body: bytes, schema: Any = None) -> Any:
+        return self._loads(body)
+
+
+class OrjsonDecoder(JSONDecoder):
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        super().__init__(orjson.loads)
+
+
+class MsgspecDecoder(JSONDecoder):
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+
+        self._msgspec = msgspec
+        self._plain = msgspec.json.Decoder()
+        self._typed: Dict[Any, Any] = {}
+        super().__init__(self._plain.decode)
+
+    def decode(self, body: bytes, schema: Any = None) -> Any:
+        msgspec = self._msgspec
+        try:
+            if schema is None:
+                return self._plain.decode(body)
+            dec = self._typed.get(schema)
+            if dec is None:
+                dec = self._typed[schema] = msgspec.json.Decoder(schema)
+            try:
+                return dec.decode(body)
+            except msgspec.ValidationError:
+                return self._plain.decode(body)
+        except msgspec.DecodeError as e:
+            # Callers catch ValueError, as raised by json/orjson
+            raise ValueError(str(e)) from e
+
+
+# Backends are probed without importing them; the module loads when a decoder is built
+BACKENDS: Dict[str, Callable[[], JSONDecoder]] = {"json": JSONDecoder}
+if find_spec("orjson") is not None:
+    BACKENDS["orjson"] = OrjsonDecoder
+if find_spec("msgspec") is not None:
+    BACKENDS["msgspec"] = MsgspecDecoder
+
+_PREFERENCE = ("msgspec", "orjson", "json")
+
+
+def get_decoder(name: Optional[str] = None) -> JSONDecoder:
+    """Named backend, or the fastest one installed. Raises ValueError for an unavailable name."""
+    if name is not None:
+        if name not in BACKENDS:
+            raise ValueError(f"JSON backend {name!r} is not available (have: {', '.join(BACKENDS)})")
+        return BACKENDS[name]()
+    return BACKENDS[next(n for n in _PREFERENCE if n in BACKENDS)]()
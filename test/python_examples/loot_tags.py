@@ -0,0 +1,108 @@
+"""
+Decoder for NWDB `lootTagRestrictions` blobs ({"t": [...], "b": [...]}).
+
+Popular items list hundreds of monsters sharing a handful of restriction sets, so decoded
+sets are memoized by a canonical tuple of their tags, and zone tags go through an interned
+table shared by every item. A repeated set costs one tuple build plus a cache hit.
+"""
+from __future__ import annotations
+import sys
+from functools import lru_cache
+from typing import Any, NamedTuple, Optional, Tuple
+
+ZONE_PREFIX = "{!zone}"
+PLVL_MARK = "{!plvl}"
+
+
+class LootRestrictions(NamedTuple):
+    player_level: Optional[str]
+    zone: Optional[str]
+    zone_id: Any
+    tags: Tuple[str, ...]  # other b tags, stripped and de-duplicated in order
+
+    @property
+    def is_mutated_expedition(self) -> Optional[bool]:
+        return ("Mutated Expedition" in self.tags) if self.tags else None
+
+
+EMPTY = LootRestrictions(None, None, None, ())
+
+
+@lru_cache(maxsize=4096)
+def parse_zone_tag(tag: str) -> Tuple[Optional[str], Any]:
+    """Split "{!zone}Name|||12345" into ("Name", 12345); the id stays a string when it isn't numeric."""
+    zone, zone_id = None, None
+    try:
+        rest = tag.split("}", 1)[1]
+        parts = rest.split("|||")
+        zone = sys.intern(parts[0]) if parts else rest
+        if len(parts) > 1 and parts[1]:
+            try:
+                zone_id = int(parts[1])
+            except Exception:
+                zone_id = sys.intern(parts[1])
+    except Exception:
+        zone = tag
+    return zone, zone_id
+
+
+def _canonical(ltr: dict) -> Tuple[tuple, tuple]:
+    """Hashable form of a blob: nested b lists become ("[", ...) tuples. May raise TypeError."""
+    t = ltr.get("t") or ()
+    b = ltr.get("b") or ()
+    return (
+        tuple(t),
+        tuple(("[",) + tuple(x) if isinstance(x, list) else x for x in b),
+    )
+
+
+def _decode(t: tuple, b: tuple) -> LootRestrictions:
+    player_level = None
+    for tval in t:
+        if isinstance(tval, str) and PLVL_MARK in tval:
+            try:
+                player_level = tval.split("}", 1)[1]
+            except Exception:
+                player_level = tval
+            break
+
+    flat = []
+    for bval in b:
+        if isinstance(bval, tuple) and bval[:1] == ("[",):
+            flat.extend(str(x) for x in bval[1:] if isinstance(x, (str, int)))
+        elif isinstance(bval, list):
+            flat.extend(str(x) for x in bval if isinstance(x, (str, int)))
+        elif isinstance(bval, str):
+            flat.append(bval)
+
+    zone, zone_id = None, None
+    tags = {}
+    for bval in flat:
+        if bval.startswith(ZONE_PREFIX):
+            # Last zone tag wins, but a tag without an id keeps the earlier id; keep scanning
+            zone, tag_id = parse_zone_tag(bval)
+            if tag_id is not None:
+                zone_id = tag_id
+        else:
+            val = bval.strip()
+            if val:
+                tags.setdefault(sys.intern(val), None)
+    return LootRestrictions(player_level, zone, zone_id, tuple(tags))
+
+
+_memo_decode = lru_cache(maxsize=8192)(_decode)
+
+
+def decode_restrictions(ltr: Any) -> LootRestrictions:
+    if not isinstance(ltr, dict) or not ltr:
+        return EMPTY
+    try:
+        t, b = _canonical(ltr)
+        return _memo_decode(t, b)
+    except TypeError:
+        # Something unhashable (e.g. a dict) inside the blob; decode without caching
+        return _decode(tuple(ltr.get("t") or ()), tuple(ltr.get("b") or ()))
+
+
+def cache_info():
+    return {"restrictions": _memo_decode.cache_info(), "zones": parse_zone_tag.cache_info()}
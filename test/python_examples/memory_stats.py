@@ -0,0 +1,201 @@
+"""
+Memory introspection for NWDBService.
+
+`service_report(service)` (NWDBService.memory_report) walks what the service holds and
+reports approximate deep sizes in two groups. Cache entries are grouped by key prefix
+("item_info", "perks", "creature", ...; nwbuddy datatables by full key), with the number
+of negative placeholders (False / empty list) in each group. In-process indexes are listed
+by name. An object reachable from more than one place is counted once, under the first
+owner reported, so the groups add up to the total. Sizes are sys.getsizeof summed over
+the object graph: a lower bound on RSS, since allocator overhead isn't visible.
+
+MemoryProbe is the opt-in tracemalloc hook. Pass `memory_probe=MemoryProbe()` to
+NWDBService, and every catalog / perk list / objective table refresh and item batch
+records its traced allocation delta, peak and top allocating lines. tracemalloc is process
+wide, so a delta includes whatever else ran at the same time, and tracing slows allocation
+down; keep it for diagnosis runs.
+"""
+from __future__ import annotations
+import contextlib
+import os
+import sys
+import time
+import tracemalloc
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set
+
+# Keys under these heads are single tables rather than one entry per id
+WHOLE_KEYS = ("nwbuddy",)
+# (report name, NWDBService attribute)
+INDEXES = (
+    ("itemsWarm", "_items_warm"),
+    ("perksPartial", "_perks_partial"),
+    ("queries", "queries"),
+    ("dataVersions", "_versions"),
+    ("changeFeed", "changes"),
+    ("popularity", "popularity"),
+    ("cacheKeys", "_cache_keys"),
+)
+
+_PACKAGE = __name__.rpartition(".")[0]
+_ATOMIC = (str, bytes, bytearray, int, float, complex, bool, type(None))
+_CONTAINERS = (dict, list, tuple, set, frozenset, deque)
+
+
+def key_prefix(key: str) -> str:
+    head, sep, _ = str(key).partition(":")
+    return key if not sep or head in WHOLE_KEYS else head
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """
+    sys.getsizeof over `obj` and everything reachable through containers and objects of this
+    package's classes; anything else (tasks, sessions, locks, ...) counts its own size only.
+    Ids in `seen` are skipped and every visited id is added to it.
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, _ATOMIC):
+            continue
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, _CONTAINERS):
+            stack.extend(o)
+        elif type(o).__module__.startswith(_PACKAGE):
+            if hasattr(o, "__dict__"):
+                stack.append(vars(o))
+            for slot in getattr(type(o), "__slots__", ()):
+                if hasattr(o, slot):
+                    stack.append(getattr(o, slot))
+    return total
+
+
+def service_report(service) -> Dict[str, Any]:
+    seen: Set[int] = set()
+    groups: Dict[str, Dict[str, int]] = {}
+    for key in service.cache_keys():
+        value = service.cache.get(key)
+        if value is None:
+            continue
+        row = groups.setdefault(key_prefix(key), {"keys": 0, "bytes": 0, "negative": 0})
+        row["keys"] += 1
+        row["bytes"] += deep_sizeof(key, seen) + deep_sizeof(value, seen)
+        if value is False or (isinstance(value, list) and not value):
+            row["negative"] += 1
+    indexes = {name: deep_sizeof(getattr(service, attr), seen) for name, attr in INDEXES if hasattr(service, attr)}
+    cache_bytes = sum(r["bytes"] for r in groups.values())
+    index_bytes = sum(indexes.values())
+    report = {
+        "cache": dict(sorted(groups.items(), key=lambda kv: -kv[1]["bytes"])),
+        "indexes": dict(sorted(indexes.items(), key=lambda kv: -kv[1])),
+        "cacheBytes": cache_bytes,
+        "indexBytes": index_bytes,
+        "totalBytes": cache_bytes + index_bytes,
+    }
+    shared = getattr(service, "shared", None)
+    if shared is not None:
+        # Page cache, shared between processes; not part of totalBytes
+        with contextlib.suppress(OSError):
+            report["sharedMappedBytes"] = os.path.getsize(shared.path)
+    return report
+
+
+_TRACE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class MemoryProbe:
+    def __init__(self, top: int = 10, frames: int = 1, history: int = 100, verbose: bool = False):
+        self.top = top
+        self.frames = frames
+        self.verbose = verbose
+        self.reports: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self._depth = 0
+        self._started = False
+
+    @contextlib.contextmanager
+    def scope(self, label: str) -> Iterator[None]:
+        """Record allocations made while the block runs. Starts tracemalloc if nobody else has."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started = True
+        self._depth += 1
+        if self._depth == 1:
+            tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+        start, _ = tracemalloc.get_traced_memory()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - t0
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+            self._depth -= 1
+            if self._depth == 0 and self._started:
+                tracemalloc.stop()
+                self._started = False
+            self._record(label, before, after, current - start, peak, seconds)
+
+    def _record(self, label: str, before, after, delta: int, peak: int, seconds: float) -> None:
+        top = [
+            {
+                "where": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+                "sizeDiff": s.size_diff,
+                "countDiff": s.count_diff,
+            }
+            for s in after.compare_to(before, "lineno")[:self.top]
+        ]
+        report = {
+            "label": label,
+            "at": time.time(),
+            "seconds": round(seconds, 4),
+            "tracedDiffBytes": delta,
+            "peakBytes": peak,
+            "top": top,
+        }
+        self.reports.append(report)
+        if self.verbose:
+            print(f"[NWDB] memory {label}: {delta:+,} B traced, peak {peak:,} B in {seconds:.2f}s")
+
+    def by_label(self) -> Dict[str, Dict[str, Any]]:
+        """Latest report per label."""
+        return {r["label"]: r for r in self.reports}
+
+    def last(self, label: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        for r in reversed(self.reports):
+            if label is None or r["label"] == label:
+                return r
+        return None
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], max_growth: float = 0.2) -> List[str]:
+    """
+    Cache groups and indexes of `current` that grew more than `max_growth` (fraction) over
+    `baseline`, or that the baseline doesn't have at all, as readable lines; empty when none.
+    """
+    out = []
+    old_cache, old_indexes = baseline.get("cache", {}), baseline.get("indexes", {})
+    pairs = [(f"cache {k}", old_cache[k].get("bytes", 0) if k in old_cache else None, v.get("bytes", 0))
+             for k, v in current.get("cache", {}).items()]
+    pairs += [(f"index {k}", old_indexes.get(k), v) for k, v in current.get("indexes", {}).items()]
+    pairs.append(("total", baseline.get("totalBytes", 0), current.get("totalBytes", 0)))
+    for name, old, new in pairs:
+        if old is None:
+            if new:
+                out.append(f"{name}: new, {new:,} B")
+        elif old and new > old * (1 + max_growth):
+            out.append(f"{name}: {old:,} -> {new:,} B ({(new - old) / old:+.0%})")
+    return out
@@ -0,0 +1,367 @@
+from __future__ import annotations
+import asyncio
+import functools
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Seconds; upper bounds of each histogram bucket (+Inf is implicit)
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None when empty)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        running = 0
+        for idx, c in enumerate(self.counts):
+            running += c
+            if running >= target:
+                return self.buckets[idx] if idx < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+        }
+
+
+class _UpstreamTimer:
+    """Context manager (sync or async) around one upstream HTTP request."""
+    __slots__ = ("_metrics", "endpoint", "status", "bytes", "_t0")
+
+    def __init__(self, metrics: "ServiceMetrics", endpoint: str):
+        self._metrics = metrics
+        self.endpoint = endpoint
+        self.status: Optional[int] = None
+        self.bytes = 0
+        self._t0 = 0.0
+
+    def add_bytes(self, n: int) -> None:
+        self.bytes += n
+
+    def __enter__(self) -> "_UpstreamTimer":
+        self._metrics._in_flight[self.endpoint] = self._metrics._in_flight.get(self.endpoint, 0) + 1
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        m = self._metrics
+        m._in_flight[self.endpoint] -= 1
+        status = "error" if exc_type is not None else str(self.status or "unknown")
+        m._hist(m._upstream, self.endpoint).observe(time.perf_counter() - self._t0)
+        key = (self.endpoint, status)
+        m._upstream_status[key] = m._upstream_status.get(key, 0) + 1
+        m._bytes[self.endpoint] = m._bytes.get(self.endpoint, 0) + self.bytes
+
+    async def __aenter__(self) -> "_UpstreamTimer":
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.__exit__(exc_type, exc, tb)
+
+
+class _Timer:
+    __slots__ = ("_hist", "_t0")
+
+    def __init__(self, hist: Histogram):
+        self._hist = hist
+        self._t0 = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._hist.observe(time.perf_counter() - self._t0)
+
+
+class ServiceMetrics:
+    """
+    Counters and histograms for NWDBService: per-method call latency, per-endpoint upstream
+    latency/status/bytes, in-flight requests, decode time, cache hit ratio per key prefix and
+    named event counters.
+    """
+    enabled = True
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, sinks: Optional[List[Any]] = None):
+        self.buckets = buckets
+        self.sinks: List[Any] = list(sinks or [])
+        self.reset()
+
+    def reset(self) -> None:
+        self._calls: Dict[str, Histogram] = {}
+        self._call_errors: Dict[str, int] = {}
+        self._upstream: Dict[str, Histogram] = {}
+        self._upstream_status: Dict[Tuple[str, str], int] = {}
+        self._decode: Dict[str, Histogram] = {}
+        self._bytes: Dict[str, int] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._cache: Dict[str, List[int]] = {}
+        self._timers: Dict[str, Histogram] = {}
+        self._counters: Dict[str, int] = {}
+
+    def _hist(self, table: Dict[str, Histogram], name: str) -> Histogram:
+        h = table.get(name)
+        if h is None:
+            h = table[name] = Histogram(self.buckets)
+        return h
+
+    # ---- recording ----
+    def observe_call(self, method: str, seconds: float, error: bool = False) -> None:
+        self._hist(self._calls, method).observe(seconds)
+        if error:
+            self._call_errors[method] = self._call_errors.get(method, 0) + 1
+
+    def upstream(self, endpoint: str) -> _UpstreamTimer:
+        return _UpstreamTimer(self, endpoint)
+
+    def observe_decode(self, endpoint: str, seconds: float) -> None:
+        self._hist(self._decode, endpoint).observe(seconds)
+
+    def cache_lookup(self, key: str, hit: bool) -> None:
+        prefix = key.split(":", 1)[0] if ":" in key else key
+        slot = self._cache.get(prefix)
+        if slot is None:
+            slot = self._cache[prefix] = [0, 0]
+        slot[0 if hit else 1] += 1
+
+    def timer(self, name: str) -> _Timer:
+        """Ad-hoc timing, e.g. `with service.metrics.timer("build_item_info"): ...`."""
+        return _Timer(self._hist(self._timers, name))
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        """Ad-hoc event counter, e.g. `service.metrics.incr("perks_failed_pages", 2)`."""
+        self._counters[name] = self._counters.get(name, 0) + amount
+
+    # ---- export ----
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": {k: dict(h.to_dict(), errors=self._call_errors.get(k, 0)) for k, h in self._calls.items()},
+            "upstream": {
+                k: dict(
+                    h.to_dict(),
+                    bytes=self._bytes.get(k, 0),
+                    inFlight=self._in_flight.get(k, 0),
+                    status={s: n for (e, s), n in self._upstream_status.items() if e == k},
+                )
+                for k, h in self._upstream.items()
+            },
+            "decode": {k: h.to_dict() for k, h in self._decode.items()},
+            "cache": {
+                p: {"hits": h, "misses": m, "hitRatio": (h / (h + m)) if (h + m) else None}
+                for p, (h, m) in self._cache.items()
+            },
+            "timers": {k: h.to_dict() for k, h in self._timers.items()},
+            "counters": dict(self._counters),
+        }
+
+    def prometheus_text(self, prefix: str = "nwdb") -> str:
+        lines: List[str] = []
+
+        def _histogram(name: str, label: str, table: Dict[str, Histogram], help_text: str) -> None:
+            if not table:
+                return
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            for key, h in sorted(table.items()):
+                lbl = f'{label}="{_escape(key)}"'
+                running = 0
+                for bound, c in zip([*map(repr, h.buckets), "+Inf"], h.counts):
+                    running += c
+                    lines.append(f'{prefix}_{name}_bucket{{{lbl},le="{bound}"}} {running}')
+                lines.append(f"{prefix}_{name}_sum{{{lbl}}} {h.sum}")
+                lines.append(f"{prefix}_{name}_count{{{lbl}}} {h.count}")
+
+        _histogram("call_seconds", "method", self._calls, "Latency of NWDBService public methods")
+        _histogram("upstream_seconds", "endpoint", self._upstream, "Latency of upstream HTTP requests")
+        _histogram("decode_seconds", "endpoint", self._decode, "JSON decode time per upstream endpoint")
+        _histogram("timer_seconds", "name", self._timers, "Ad-hoc timed sections")
+
+        if self._call_errors:
+            lines.append(f"# TYPE {prefix}_call_errors_total counter")
+            for k, n in sorted(self._call_errors.items()):
+                lines.append(f'{prefix}_call_errors_total{{method="{_escape(k)}"}} {n}')
+        if self._upstream_status:
+            lines.append(f"# TYPE {prefix}_upstream_requests_total counter")
+            for (e, s), n in sorted(self._upstream_status.items()):
+                lines.append(f'{prefix}_upstream_requests_total{{endpoint="{_escape(e)}",status="{s}"}} {n}')
+        if self._bytes:
+            lines.append(f"# TYPE {prefix}_upstream_bytes_total counter")
+            for e, n in sorted(self._bytes.items()):
+                lines.append(f'{prefix}_upstream_bytes_total{{endpoint="{_escape(e)}"}} {n}')
+        if self._in_flight:
+            lines.append(f"# TYPE {prefix}_upstream_in_flight gauge")
+            for e, n in sorted(self._in_flight.items()):
+                lines.append(f'{prefix}_upstream_in_flight{{endpoint="{_escape(e)}"}} {n}')
+        if self._cache:
+            lines.append(f"# TYPE {prefix}_cache_lookups_total counter")
+            for p, (h, m) in sorted(self._cache.items()):
+                lines.append(f'{prefix}_cache_lookups_total{{prefix="{_escape(p)}",result="hit"}} {h}')
+                lines.append(f'{prefix}_cache_lookups_total{{prefix="{_escape(p)}",result="miss"}} {m}')
+        if self._counters:
+            lines.append(f"# TYPE {prefix}_events_total counter")
+            for k, n in sorted(self._counters.items()):
+                lines.append(f'{prefix}_events_total{{event="{_escape(k)}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def flush(self) -> None:
+        """Push the current state to every registered sink."""
+        for sink in self.sinks:
+            sink.emit(self)
+
+
+class _NullContext:
+    __slots__ = ()
+    # shared instance, so writes are discarded
+    status = property(lambda self: None, lambda self, value: None)
+    bytes = 0
+
+    def add_bytes(self, n: int) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NULL_CONTEXT = _NullContext()
+
+
+class NullMetrics:
+    """Disabled metrics: every hook is a no-op returning shared objects."""
+    enabled = False
+    sinks: List[Any] = []
+
+    def observe_call(self, method: str, seconds: float, error: bool = False) -> None:
+        pass
+
+    def upstream(self, endpoint: str) -> _NullContext:
+        return _NULL_CONTEXT
+
+    def observe_decode(self, endpoint: str, seconds: float) -> None:
+        pass
+
+    def cache_lookup(self, key: str, hit: bool) -> None:
+        pass
+
+    def timer(self, name: str) -> _NullContext:
+        return _NULL_CONTEXT
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {}
+
+    def prometheus_text(self, prefix: str = "nwdb") -> str:
+        return ""
+
+    def flush(self) -> None:
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+# ---- sinks ----
+class InMemorySink:
+    """Keeps the last snapshot (e.g. for a /debug endpoint or tests)."""
+
+    def __init__(self):
+        self.last: Dict[str, Any] = {}
+
+    def emit(self, metrics: ServiceMetrics) -> None:
+        self.last = metrics.snapshot()
+
+
+class PrometheusTextSink:
+    """Writes Prometheus text format to a file (node_exporter textfile collector) or a callback."""
+
+    def __init__(self, path: Optional[str] = None, callback: Optional[Callable[[str], None]] = None, prefix: str = "nwdb"):
+        self.path = path
+        self.callback = callback
+        self.prefix = prefix
+
+    def emit(self, metrics: ServiceMetrics) -> None:
+        text = metrics.prometheus_text(self.prefix)
+        if self.callback is not None:
+            self.callback(text)
+        if self.path:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                fh.write(text)
+            os.replace(tmp, self.path)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def timed(name: Optional[str] = None):
+    """Method decorator recording call latency on `self.metrics` (no-op when disabled)."""
+
+    def deco(fn):
+        label = name or fn.__name__
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(self, *args, **kwargs):
+                metrics = self.metrics
+                if not metrics.enabled:
+                    return await fn(self, *args, **kwargs)
+                t0 = time.perf_counter()
+                error = False
+                try:
+                    return await fn(self, *args, **kwargs)
+                except BaseException:
+                    error = True
+                    raise
+                finally:
+                    metrics.observe_call(label, time.perf_counter() - t0, error)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            metrics = self.metrics
+            if not metrics.enabled:
+                return fn(self, *args, **kwargs)
+            t0 = time.perf_counter()
+            error = False
+            try:
+                return fn(self, *args, **kwargs)
+            except BaseException:
+                error = True
+                raise
+            finally:
+                metrics.observe_call(label, time.perf_counter() - t0, error)
+        return wrapper
+
+    return deco
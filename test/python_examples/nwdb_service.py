@@ -1,16 +1,37 @@
 ﻿from __future__ import annotations
 import asyncio
-from typing import Optional, List, Dict
-import aiohttp
-from bs4 import BeautifulSoup
+import contextlib
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Optional, List, Dict, Tuple
 from utils.cache import TTLCache
-from .artifact_objective_service import build_artifact_objectives
-import requests
+from .change_feed import ChangeFeed, ChangeSet, record_hash
+from .description_templates import compile_template, render_raw
+from .http_session import ConnectionStats, SessionSettings, create_session, create_sync_session
+from .item_data_service import build_item_info
+from .json_codec import SCHEMAS, get_decoder
+from .memory_stats import MemoryProbe, service_report
+from .nwdb_metrics import NULL_METRICS, timed
+from .pagination import PageStream
+from .popularity import PopularityTracker
+from .query_cache import QueryCache
+from .request_scheduler import (
+    INTERACTIVE, PriorityGate, Ticket, count_request, current_priority, limited, shared_priority,
+)
+from .shared_catalog import SharedCatalog
 import re
 from urllib.parse import quote
-import re as _re
-NW_BUDDY_OBJECTIVE_TASKS_URL = "https://www.nw-buddy.de/nw-data/datatables/javelindata_objectivetasks.json"
-NW_BUDDY_GAMEMODES_URL = "https://www.nw-buddy.de/nw-data/datatables/javelindata_gamemodes.json"
+
+# aiohttp, requests and the artifact objective module are imported on first use so that
+# importing this module (or the pure helpers next to it) doesn't load an HTTP stack
+if TYPE_CHECKING:
+    import aiohttp
+
+NW_BUDDY_BASE = "https://www.nw-buddy.de"
+NW_BUDDY_OBJECTIVE_TASKS_PATH = "/nw-data/datatables/javelindata_objectivetasks.json"
+NW_BUDDY_GAMEMODES_PATH = "/nw-data/datatables/javelindata_gamemodes.json"
+NW_BUDDY_OBJECTIVE_TASKS_URL = NW_BUDDY_BASE + NW_BUDDY_OBJECTIVE_TASKS_PATH
+NW_BUDDY_GAMEMODES_URL = NW_BUDDY_BASE + NW_BUDDY_GAMEMODES_PATH
 
 KNOWN_GAMEMODE_NAMES = {
     "DungeonAmrine": "Amrine Excavation",
@@ -33,34 +54,317 @@ def _fallback_label(identifier: str) -> Optional[str]:
     spaced = re.sub(r"(?<!^)(?=[A-Z])", " ", token).strip()
     return spaced or None
 
+# A refresh touching more records than this (or this fraction of the list) re-ranks from scratch
+# instead of patching the query cache
+PATCH_MAX_RECORDS = 64
+PATCH_MAX_FRACTION = 0.1
+# Seconds an incomplete perk list is served before its pages are fetched again
+PERKS_INCOMPLETE_TTL = 120
+# Smallest _cache_keys size that triggers a sweep of expired keys
+CACHE_KEYS_SWEEP_MIN = 1024
+
+
+def _query_scope(dataset: str) -> Optional[Tuple[str, str, str]]:
+    """(data version key, QueryCache kind, scope) for a change feed dataset."""
+    if dataset == "items":
+        return "nwdb_items_all", "items", ""
+    if dataset.startswith("perks:"):
+        return dataset, "perks", dataset[len("perks:"):]
+    return None
+
+def _rank_by_name(records, q: str) -> Tuple[List[Dict], List[Dict]]:
+    """(records whose name contains q in source order, prefix matches first then the rest)"""
+    candidates, starts, contains = [], [], []
+    for r in records:
+        nm = (r.get("name") or "").lower()
+        if q in nm:
+            candidates.append(r)
+            (starts if nm.startswith(q) else contains).append(r)
+    return candidates, starts + contains
+
 class NWDBService:
     BASE = "https://nwdb.info"
 
-    def __init__(self, session: aiohttp.ClientSession, cache: TTLCache | None = None):
+    def __init__(
+        self,
+        session: aiohttp.ClientSession | None = None,
+        cache: TTLCache | None = None,
+        metrics=None,
+        api_base: str | None = None,
+        nwbuddy_base: str | None = None,
+        queries: QueryCache | None = None,
+        decoder=None,
+        session_settings: SessionSettings | None = None,
+        connection_stats: ConnectionStats | None = None,
+        popularity: PopularityTracker | None = None,
+        gate: PriorityGate | None = None,
+        shared: SharedCatalog | None = None,
+        memory_probe: MemoryProbe | None = None,
+    ):
+        # Without a caller session the service owns a tuned one (http_session.create_session),
+        # created on first use; connection reuse for it and for the pooled requests session
+        # used by the blocking paths shows up in connection_stats.snapshot()
         self.session = session
+        self._owns_session = session is None
+        self.session_settings = session_settings or SessionSettings()
+        self.connection_stats = connection_stats or ConnectionStats()
+        self._sync_session = None
+        self._sync_lock = threading.Lock()
+        self._timeouts: Dict[float, aiohttp.ClientTimeout] = {}
+        # Async requests take a slot per request, admitted by priority class (request_scheduler)
+        self.gate = gate or PriorityGate(self.session_settings.limit_per_host)
+        # Where requests go; links handed to users always use BASE.
+        # Overridden by the offline benchmark to point at a local stand-in server.
+        self.api_base = (api_base or self.BASE).rstrip("/")
+        self.nwbuddy_base = (nwbuddy_base or NW_BUDDY_BASE).rstrip("/")
         self.cache = cache or TTLCache(3600)
         self._lock = asyncio.Lock()
+        # ServiceMetrics from nwdb_metrics; the default is a no-op
+        self.metrics = metrics or NULL_METRICS
+        # json_codec decoder: msgspec/orjson when installed, else the stdlib
+        self.decoder = decoder or get_decoder()
+        # Background fetches keyed like the cache entry they fill; shared by concurrent callers,
+        # each with the request_scheduler Ticket its requests are queued under
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._tickets: Dict[str, Ticket] = {}
+        # Last complete catalog, served when a refresh misses an autocomplete deadline
+        self._items_warm: List[Dict[str, str]] = []
+        # Perks received so far per item type while fetch_all_perks_for_item_type is running
+        self._perks_partial: Dict[str, List[Dict]] = {}
+        # Autocomplete results keyed by data version; see _data_version
+        self.queries = queries or QueryCache()
+        self._versions: Dict[str, Tuple[Any, int]] = {}
+        # Diffs each catalog / perk list refresh against the previous one (change_feed); small
+        # deltas are applied to the query cache in place of a version bump
+        self.changes = ChangeFeed()
+        self.changes.subscribe(self._apply_changes)
+        # Decayed hit counts for item details, perk lists and artifacts; popularity.CacheWarmer reads them
+        self.popularity = popularity or PopularityTracker()
+        # Catalog and perk lists mapped from a file another process refreshes (shared_catalog);
+        # datasets it has are searched there instead of being downloaded here
+        self.shared = shared
+        # Keys this service wrote to `cache` (which may be shared), for memory_report; expired
+        # ones are swept out whenever the set doubles since the last sweep
+        self._cache_keys: Dict[str, None] = {}
+        self._cache_keys_sweep_at = CACHE_KEYS_SWEEP_MIN
+        # Opt-in tracemalloc deltas around refreshes and item batches (memory_stats)
+        self.memory_probe = memory_probe
+
+    def _http(self) -> aiohttp.ClientSession:
+        if self._owns_session and (self.session is None or self.session.closed):
+            self.session = create_session(self.session_settings, self.connection_stats)
+        return self.session
+
+    def _sync_http(self):
+        # Blocking calls may run in worker threads (asyncio.to_thread)
+        with self._sync_lock:
+            if self._sync_session is None:
+                self._sync_session = create_sync_session(self.session_settings, self.connection_stats)
+            return self._sync_session
+
+    def _timeout(self, total: float) -> aiohttp.ClientTimeout:
+        timeout = self._timeouts.get(total)
+        if timeout is None:
+            import aiohttp
+
+            timeout = self._timeouts[total] = aiohttp.ClientTimeout(total=total)
+        return timeout
+
+    async def close(self) -> None:
+        """Close the sessions this service created; a caller-supplied session is left open."""
+        if self._owns_session and self.session is not None and not self.session.closed:
+            await self.session.close()
+        with self._sync_lock:
+            if self._sync_session is not None:
+                self._sync_session.close()
+                self._sync_session = None
+
+    async def __aenter__(self) -> "NWDBService":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    def _cache_get(self, key: str):
+        value = self.cache.get(key)
+        self.metrics.cache_lookup(key, value is not None)
+        return value
+
+    def _cache_set(self, key: str, value, ttl: Optional[float] = None) -> None:
+        if ttl is None:
+            self.cache.set(key, value)
+        else:
+            self.cache.set(key, value, ttl=ttl)
+        self._cache_keys[key] = None
+        if len(self._cache_keys) >= self._cache_keys_sweep_at:
+            self._cache_keys_sweep_at = max(CACHE_KEYS_SWEEP_MIN, 2 * len(self.cache_keys()))
+
+    def cache_keys(self) -> List[str]:
+        """Keys this service has cached that are still live; expired ones are forgotten."""
+        live = []
+        for key in list(self._cache_keys):
+            if self.cache.get(key) is None:
+                self._cache_keys.pop(key, None)
+            else:
+                live.append(key)
+        return live
+
+    def memory_report(self) -> Dict[str, Any]:
+        """Approximate deep size per cache key prefix and per index; see memory_stats."""
+        return service_report(self)
+
+    def _hit(self, kind: str, key: str) -> None:
+        """Count a lookup towards the hot keys; crawls and warming (non-interactive) don't."""
+        if current_priority() == INTERACTIVE:
+            self.popularity.hit(kind, key)
+
+    def _probe(self, label: str):
+        return self.memory_probe.scope(label) if self.memory_probe is not None else contextlib.nullcontext()
+
+    def _data_version(self, key: str, data) -> int:
+        """Counter bumped whenever the list cached under `key` is replaced by a different object."""
+        seen = self._versions.get(key)
+        if seen is None or seen[0] is not data:
+            seen = self._versions[key] = (data, seen[1] + 1 if seen else 1)
+        return seen[1]
+
+    def data_version(self, dataset: str) -> int:
+        """
+        Version of the records last served for `dataset` ("items", "perks:<item type>" or
+        "objective_tasks"); moves when they are replaced or patched, 0 before the first load.
+        """
+        found = _query_scope(dataset)
+        seen = self._versions.get(found[0] if found is not None else dataset)
+        return seen[1] if seen is not None else 0
+
+    def _apply_changes(self, changes: ChangeSet) -> None:
+        """
+        Move the query cache entries of a refreshed catalog / perk list to a new version,
+        patching the ones the delta touches, so a small refresh doesn't drop every cached search.
+        """
+        found = _query_scope(changes.dataset)
+        if found is None:
+            return
+        key, kind, scope = found
+        seen = self._versions.get(key)
+        if seen is None or changes.previous is None or seen[0] is not changes.previous:
+            return
+        touched = len(changes.added) + len(changes.removed) + len(changes.changed)
+        if touched > max(PATCH_MAX_RECORDS, len(changes.current) * PATCH_MAX_FRACTION):
+            # Left to _data_version, which bumps the version when the new list is first seen
+            return
+        gone = [*changes.removed, *(str(r.get("id")) for r in changes.changed)]
+        counts = self.queries.apply(
+            kind, scope, seen[1], seen[1] + 1, changes.names(), gone, [*changes.added, *changes.changed], changes.current,
+        )
+        self._versions[key] = (changes.current, seen[1] + 1)
+        for name, n in counts.items():
+            self.metrics.incr(f"query_entries_{name}", n)
+
+    def _ranked(self, kind: str, scope: str, version: int, records, q: str) -> List[Dict]:
+        # A cached shorter prefix already holds every record that can match q
+        pool = self.queries.get_candidates(kind, scope, version, q)
+        candidates, ranked = _rank_by_name(records if pool is None else pool, q)
+        self.queries.put_candidates(kind, scope, version, q, candidates)
+        return ranked
+
+    def _background(self, key: str, factory) -> asyncio.Task:
+        """
+        Start `factory()` as a task unless one for `key` is already running. A caller joining a
+        running task raises its priority to the caller's own, if higher (e.g. a user lookup
+        joining a fetch a bulk crawl started).
+        """
+        task = self._inflight.get(key)
+        if task is None or task.done():
+            with shared_priority() as ticket:
+                task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            self._tickets[key] = ticket
+            task.add_done_callback(lambda t, k=key: self._background_done(k, t))
+        elif key in self._tickets:
+            self._tickets[key].raise_to(current_priority())
+        return task
+
+    def _background_done(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            self._tickets.pop(key, None)
+        if not task.cancelled():
+            # Mark the exception retrieved; a caller that awaited the task already saw it
+            task.exception()
+
+    @staticmethod
+    async def _within(task: asyncio.Task, deadline: Optional[float]) -> bool:
+        """Wait up to `deadline` seconds for `task` without cancelling it. True when it finished."""
+        if deadline is None:
+            await task
+            return True
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout=max(0.0, deadline))
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def _decode(self, endpoint: str, body: bytes):
+        schema = SCHEMAS.get(endpoint)
+        if not self.metrics.enabled:
+            return self.decoder.decode(body, schema)
+        t0 = time.perf_counter()
+        try:
+            return self.decoder.decode(body, schema)
+        finally:
+            self.metrics.observe_decode(endpoint, time.perf_counter() - t0)
+
+    async def _get_json(
+        self, endpoint: str, url: str, timeout: float = 10, priority: Optional[str] = None
+    ) -> Tuple[int, Any]:
+        """
+        GET `url` and decode JSON. Returns (status, payload); payload is None for 304/>=400.
+        Network errors propagate. `endpoint` labels the request in metrics. `priority`
+        defaults to the request_priority() context, else interactive.
+        """
+        async with self.gate.slot(priority):
+            count_request()
+            async with self.metrics.upstream(endpoint) as up:
+                async with self._http().get(url, timeout=self._timeout(timeout)) as resp:
+                    up.status = resp.status
+                    if resp.status == 304 or resp.status >= 400:
+                        return resp.status, None
+                    body = await resp.read()
+                up.add_bytes(len(body))
+        return resp.status, self._decode(endpoint, body)
+
+    def _get_sync(self, endpoint: str, url: str, headers: Dict[str, str], timeout: float = 10):
+        count_request()
+        with self.metrics.upstream(endpoint) as up:
+            response = self._sync_http().get(url, headers=headers, timeout=timeout)
+            up.status = response.status_code
+            up.add_bytes(len(response.content))
+        return response
 
     def _build_url(self, kind: str, slug: str) -> str:
         kind = kind.strip().lower()
         slug = slug.strip()
         return f"{self.BASE}/?{kind}={slug}"
 
+    @timed()
     def fetch_nwdb_all(self):
-        url = "https://nwdb.info/db/search/[[all]]"
+        url = f"{self.api_base}/db/search/[[all]]"
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
                           "AppleWebKit/537.36 (KHTML, like Gecko) "
                           "Chrome/140.0.0.0 Safari/537.36",
             "Accept": "*/*",
         }
+        import requests
+
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = self._get_sync("search_all", url, headers)
             if response.status_code == 304:
                 return {"status": "not_modified"}
             response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return self._decode("search_all", response.content)
+        except (requests.RequestException, ValueError) as e:
             return {"error": str(e)}
 
     def _normalize_slug(self, text: str) -> str:
@@ -71,6 +375,7 @@ class NWDBService:
         s = re.sub(r"[^a-z0-9\-]+", "", s)
         return s
 
+    @timed()
     def fetch_nwdb_items(self) -> List[Dict[str, str]]:
         """
         Returns a list of dicts: [{"id": "...", "name": "...", "slug": "..."}]
@@ -92,241 +397,417 @@ class NWDBService:
     # --- New: cached item search for autocomplete ---
     def _get_cached_items(self) -> List[Dict[str, str]]:
         key = "nwdb_items_all"
-        cached = self.cache.get(key)
+        cached = self._cache_get(key)
         if cached is not None:
             return cached
-        items = self.fetch_nwdb_items()
+        with self._probe("refresh:items"):
+            items = self.fetch_nwdb_items()
+            if items:
+                # An unchanged catalog keeps the previous list object, and with it every
+                # query cache entry and derived item keyed on it
+                items = self.changes.publish("items", items).current
         # Cache for 1 hour (TTLCache given 3600s in __init__)
-        self.cache.set(key, items)
+        self._cache_set(key, items)
+        if items:
+            self._items_warm = items
         return items
 
-    async def search_items(self, query: str, limit: int = 25) -> List[Dict[str, str]]:
+    async def _load_items(self, deadline: Optional[float] = None) -> List[Dict[str, str]]:
+        cached = self._cache_get("nwdb_items_all")
+        if cached is not None:
+            return cached
+        # The catalog download is a blocking requests call; keep it off the event loop
+        task = self._background("nwdb_items_all", lambda: asyncio.to_thread(self._get_cached_items))
+        if await self._within(task, deadline):
+            return task.result()
+        return self._items_warm
+
+    @timed()
+    async def search_items(self, query: str, limit: int = 25, deadline: Optional[float] = None) -> List[Dict[str, str]]:
         """
         Prefix-first, then substring matches, case-insensitive.
         Returns [{"name","slug"}] up to `limit`.
+        With `deadline` (seconds), a cold catalog answers from the previous catalog (or nothing)
+        once the budget runs out; the download keeps going and fills the cache.
         """
         q = (query or "").strip().lower()
         if not q:
             return []
-        items = self._get_cached_items()
+        mapped = self.shared.dataset("items") if self.shared is not None else None
+        items = mapped if mapped is not None else await self._load_items(deadline)
+        limit = min(limit, 25)
 
-        starts, contains = [], []
-        for it in items:
-            nm = (it.get("name") or "").lower()
-            if nm.startswith(q):
-                starts.append(it)
-            elif q in nm:
-                contains.append(it)
-
-        ranked = starts + contains
-        return ranked[: min(limit, 25)]
+        version = self._data_version("nwdb_items_all", items)
+        cached = self.queries.get_results("items", "", version, q, limit)
+        self.metrics.cache_lookup("query:items", cached is not None)
+        if cached is not None:
+            return list(cached)
+        if mapped is not None:
+            ranked = mapped.search(q, limit)
+        else:
+            ranked = self._ranked("items", "", version, items, q)[:limit]
+        self.queries.put_results("items", "", version, q, limit, ranked)
+        return list(ranked)
 
 
+    @timed()
     def get_item_details(self, item_id: str):
-        url = f"https://nwdb.info/db/item/{item_id}.json"
+        self._hit("item", item_id)
+        url = f"{self.api_base}/db/item/{item_id}.json"
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
                           "AppleWebKit/537.36 (KHTML, like Gecko) "
                           "Chrome/140.0.0.0 Safari/537.36",
             "Accept": "*/*",
         }
+        import requests
+
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = self._get_sync("item", url, headers)
             if response.status_code == 304:
                 return {"status": "not_modified"}
             response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return self._decode("item", response.content)
+        except (requests.RequestException, ValueError) as e:
             return {"error": str(e)}
 
+    @timed()
     async def get_item_details_async(self, item_id: str):
-        url = f"https://nwdb.info/db/item/{item_id}.json"
+        self._hit("item", item_id)
+        return await self._item_payload_async(item_id)
+
+    async def _item_payload_async(self, item_id: str):
+        url = f"{self.api_base}/db/item/{item_id}.json"
         try:
-            timeout = aiohttp.ClientTimeout(total=10)
-            async with self.session.get(url, timeout=timeout) as resp:
-                if resp.status == 304:
-                    return {"status": "not_modified"}
-                if resp.status >= 400:
-                    return {"error": f"HTTP {resp.status}"}
-                return await resp.json()
+            status, payload = await self._get_json("item", url)
+            if status == 304:
+                return {"status": "not_modified"}
+            if status >= 400:
+                return {"error": f"HTTP {status}"}
+            return payload
         except Exception as e:
             return {"error": str(e)}
 
+    async def fetch_recipe(self, recipe_id: str) -> Optional[Dict[str, Any]]:
+        """The "data" record of an NWDB recipe, or None when it can't be fetched."""
+        if not recipe_id:
+            return None
+        key = f"recipe:{str(recipe_id).lower()}"
+        cached = self._cache_get(key)
+        if cached is False:
+            return None
+        if cached:
+            return cached
+        url = f"{self.api_base}/db/recipe/{recipe_id}.json"
+        try:
+            status, payload = await self._get_json("recipe", url)
+            if status >= 400:
+                self._cache_set(key, False, ttl=900)
+                return None
+        except Exception:
+            return None
+        data = payload.get("data") if isinstance(payload, dict) else None
+        if isinstance(data, dict) and data:
+            self._cache_set(key, data, ttl=86400)
+            return data
+        self._cache_set(key, False, ttl=900)
+        return None
+
+    async def _fetch_item_info(self, item_id: str, limiter: asyncio.Semaphore) -> Dict[str, Any]:
+        async with limited(limiter):
+            payload = await self._item_payload_async(item_id)
+        data = payload.get("data") if isinstance(payload, dict) else None
+        if not isinstance(data, dict):
+            return {"error": (payload or {}).get("error") or "no item data"}
+        info = build_item_info(data)
+        # Stamped with the item's catalog hash, so a catalog refresh that changes it invalidates
+        # this, and with a hash of the detail payload, which item_version hands to callers
+        key = f"item_info:{item_id}"
+        detail = record_hash(data)
+        previous = self.cache.get(key)
+        if previous is not None and previous[0][1] != detail:
+            self.metrics.incr("item_info_changed")
+        self._cache_set(key, ((self.changes.hash_of("items", item_id), detail), info), ttl=3600)
+        return info
+
+    def _cached_item_info(self, item_id: str) -> Optional[Dict[str, Any]]:
+        cached = self._cache_get(f"item_info:{item_id}")
+        if cached is None:
+            return None
+        (catalog_hash, _), info = cached
+        if self.changes.known("items") and catalog_hash != self.changes.hash_of("items", item_id):
+            return None
+        return info
+
+    def item_version(self, item_id: str) -> Optional[str]:
+        """Hash of the detail payload behind the cached build_item_info for `item_id`, if still valid."""
+        item_id = str(item_id or "").strip()
+        cached = self.cache.get(f"item_info:{item_id}")
+        if cached is None:
+            return None
+        (catalog_hash, detail_hash), _ = cached
+        if self.changes.known("items") and catalog_hash != self.changes.hash_of("items", item_id):
+            return None
+        return detail_hash
+
+    @timed()
+    async def get_items_details_batch(self, item_ids, concurrency: int = 8) -> Dict[str, Dict[str, Any]]:
+        """
+        build_item_info for several items, keyed by id in first-seen order (duplicates collapsed).
+        Cached items are answered immediately; the rest are fetched at most `concurrency` at a time
+        and shared with any concurrent batch asking for the same id.
+        Failed ids map to {"error": ...} and are not cached.
+        """
+        out: Dict[str, Any] = {}
+        missing = []
+        for item_id in item_ids:
+            item_id = str(item_id or "").strip()
+            if not item_id or item_id in out:
+                continue
+            self._hit("item", item_id)
+            out[item_id] = self._cached_item_info(item_id)
+            if out[item_id] is None:
+                missing.append(item_id)
+        if missing:
+            limiter = asyncio.Semaphore(max(1, concurrency))
+            with self._probe("batch:items"):
+                tasks = [
+                    self._background(f"item_info:{i}", lambda i=i: self._fetch_item_info(i, limiter))
+                    for i in missing
+                ]
+                # Shielded so a caller giving up doesn't cancel fetches other batches are waiting on
+                results = await asyncio.gather(*(asyncio.shield(t) for t in tasks), return_exceptions=True)
+            for item_id, result in zip(missing, results):
+                out[item_id] = {"error": str(result)} if isinstance(result, BaseException) else result
+        return out
+
     # ---- Perks by item type (for /item_lookup) ----
     def _clean_text(self, text: str | None) -> str:
         if not text:
             return ""
         # Replace occurrences like ${20} or ${20.5} with just 20 or 20.5
-        cleaned = _re.sub(r"\$\{([^}]+)\}", r"\1", text)
+        cleaned = render_raw(compile_template(text))
         # Collapse multiple spaces
-        cleaned = _re.sub(r"\s+", " ", cleaned).strip()
-        return cleaned
+        return " ".join(cleaned.split())
+
+    def _perk_row(self, p: Dict) -> Dict[str, Any]:
+        return {
+            "id": str(p.get("id") or ""),
+            "name": p.get("name") or "",
+            "description": self._clean_text(p.get("description")),
+            "ScalingPerGearScore": p.get("ScalingPerGearScore"),
+        }
+
     async def _fetch_perks_page(self, item_type: str, page: int) -> dict:
         # NWDB expects lowercase values for filter_perk_item
         safe_item = quote((item_type or "").lower(), safe="")
         # Use the generic perks listing (not /attribute) and JSON endpoint
-        url = f"https://nwdb.info/db/perks/page/{page}.json?filter_perk_item={safe_item}"
-        print(f"[NWDB] GET {url}")
-        timeout = aiohttp.ClientTimeout(total=10)
-        async with self.session.get(url, timeout=timeout) as resp:
-            if resp.status >= 400:
-                return {"error": f"HTTP {resp.status}"}
-            return await resp.json()
-
-    async def fetch_all_perks_for_item_type(self, item_type: str) -> List[Dict]:
+        url = f"{self.api_base}/db/perks/page/{page}.json?filter_perk_item={safe_item}"
+        status, payload = await self._get_json("perks_page", url)
+        if status >= 400:
+            return {"error": f"HTTP {status}"}
+        return payload
+
+    @timed()
+    async def fetch_all_perks_for_item_type(self, item_type: str, refresh: bool = False) -> List[Dict]:
+        """All perk pages for `item_type`; `refresh` skips the cached list and refetches."""
+        return (await self._fetch_perks(item_type, refresh))[0]
+
+    async def _fetch_perks(self, item_type: str, refresh: bool = False) -> Tuple[List[Dict], bool]:
+        """
+        (perks, complete); an incomplete list is whatever pages arrived. It is kept apart for
+        PERKS_INCOMPLETE_TTL seconds, so lookups meanwhile don't re-crawl every page; `refresh`
+        skips both.
+        """
         item_type = (item_type or "").lower()
         key = f"perks:{item_type}"
-        cached = self.cache.get(key)
+        cached = None if refresh else self._cache_get(key)
         if cached is not None:
-            return cached
-
-        first = await self._fetch_perks_page(item_type, 1)
-        if not first or first.get("error"):
-            return []
-        page_count = int(first.get("pageCount") or 1)
-        perks = list(first.get("data") or [])
-        if page_count > 1:
-            # Fetch remaining pages concurrently
-            tasks = [self._fetch_perks_page(item_type, p) for p in range(2, page_count + 1)]
-            try:
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-                for r in results:
-                    if isinstance(r, dict):
-                        perks.extend(r.get("data") or [])
-            except Exception:
-                pass
+            return cached, True
+        incomplete = None if refresh else self._cache_get(f"perks_incomplete:{item_type}")
+        if incomplete is not None:
+            return incomplete, False
 
+        # Pages land in order; each one is published to deadline-bound searches as it arrives
+        partial = self._perks_partial[item_type] = []
+        try:
+            with self._probe(f"refresh:perks:{item_type}"):
+                async with PageStream(lambda page: self._fetch_perks_page(item_type, page), lookahead=8) as stream:
+                    async for _, payload in stream:
+                        partial.extend(payload.get("data") or [])
+        finally:
+            if self._perks_partial.get(item_type) is partial:
+                del self._perks_partial[item_type]
+
+        if not stream.complete:
+            # Not published or kept for 30 minutes; lookups retry the pages once this expires
+            self.metrics.incr("perks_incomplete")
+            self.metrics.incr("perks_failed_pages", len(stream.failed))
+            self._cache_set(f"perks_incomplete:{item_type}", partial, ttl=PERKS_INCOMPLETE_TTL)
+            return partial, False
+        perks = self.changes.publish(key, partial).current
         # Cache condensed list for 30 minutes
-        self.cache.set(key, perks, ttl=1800)
-        return perks
+        self._cache_set(key, perks, ttl=1800)
+        return perks, True
+
+    async def _load_perks(self, item_type: str, deadline: Optional[float]) -> Tuple[List[Dict], bool]:
+        """(perks, complete); incomplete when pages failed or the deadline cut the fetch short."""
+        if deadline is None:
+            return await self._fetch_perks(item_type)
+        cached = self.cache.get(f"perks:{item_type}")
+        if cached is not None:
+            return await self._fetch_perks(item_type)
+        task = self._background(f"perks:{item_type}", lambda: self._fetch_perks(item_type))
+        if await self._within(task, deadline):
+            return task.result()
+        return list(self._perks_partial.get(item_type) or []), False
+
+    @timed()
+    async def search_perks_for_item_type(
+        self, item_type: str, query: str, limit: int = 25, deadline: Optional[float] = None
+    ) -> List[Dict[str, str]]:
+        """
+        With `deadline` (seconds), rank whatever perk pages have arrived when the budget runs out;
+        the remaining pages keep loading in the background and fill the cache.
+        """
+        return (await self._search_perks(item_type, query, limit, deadline))[0]
 
-    async def search_perks_for_item_type(self, item_type: str, query: str, limit: int = 25) -> List[Dict[str, str]]:
+    async def _search_perks(
+        self, item_type: str, query: str, limit: int = 25, deadline: Optional[float] = None
+    ) -> Tuple[List[Dict[str, str]], bool]:
+        """(rows, complete); incomplete when ranked from a partial perk list."""
         q = (query or "").strip().lower()
-        perks = await self.fetch_all_perks_for_item_type((item_type or "").lower())
+        item_type = (item_type or "").lower()
+        if item_type:
+            self._hit("perks", item_type)
+        limit = min(limit, 25)
+        mapped = self.shared.dataset(f"perks:{item_type}") if self.shared is not None else None
+        if mapped is not None:
+            # Rows in the shared file are already in _perk_row form
+            version = self._data_version(f"perks:{item_type}", mapped)
+            cached = self.queries.get_results("perks", item_type, version, q, limit)
+            self.metrics.cache_lookup("query:perks", cached is not None)
+            if cached is None:
+                cached = mapped.search(q, limit)
+                self.queries.put_results("perks", item_type, version, q, limit, cached)
+            return list(cached), True
+        perks, complete = await self._load_perks(item_type, deadline)
         if not perks:
-            return []
-        starts, contains = [], []
-        for p in perks:
-            name = (p.get("name") or "").lower()
-            if not name:
-                continue
-            if q and name.startswith(q):
-                starts.append(p)
-            elif q in name:
-                contains.append(p)
-        ranked = (starts + contains) if q else perks
-        out = []
-        for p in ranked[: min(limit, 25)]:
-            out.append({
-                "id": str(p.get("id") or ""),
-                "name": p.get("name") or "",
-                "description": self._clean_text(p.get("description")),
-                "ScalingPerGearScore": p.get("ScalingPerGearScore"),
-            })
-        return out
+            return [], complete
+        # Partial page sets are never cached
+        version = self._data_version(f"perks:{item_type}", perks) if complete else None
+        if version is not None:
+            cached = self.queries.get_results("perks", item_type, version, q, limit)
+            self.metrics.cache_lookup("query:perks", cached is not None)
+            if cached is not None:
+                return list(cached), True
+        if not q:
+            ranked = perks
+        elif version is not None:
+            ranked = self._ranked("perks", item_type, version, perks, q)
+        else:
+            ranked = _rank_by_name(perks, q)[1]
+        out = [self._perk_row(p) for p in ranked[:limit]]
+        if version is not None:
+            self.queries.put_results("perks", item_type, version, q, limit, out)
+        return list(out), complete
 
     # ---- Items by perk id (for /item_lookup) ----
+    async def _fetch_items_by_perk_page(self, perk_id: str, page: int) -> dict:
+        safe_perk = quote(str(perk_id), safe="")
+        url = f"{self.api_base}/db/items/page/{page}.json?filter_perks={safe_perk}"
+        status, payload = await self._get_json("items_by_perk", url)
+        if status >= 400:
+            return {"error": f"HTTP {status}"}
+        return payload
+
+    def _item_summary(self, it: Dict) -> Dict[str, str]:
+        return {
+            "id": str(it.get("id") or ""),
+            "name": it.get("name") or "",
+            "description": self._clean_text(it.get("description")),
+        }
+
+    @timed()
     async def fetch_items_by_perk_first_page(self, perk_id: str) -> List[Dict[str, str]]:
         # Only fetch page 1 as requested, then take first 5 entries
-        safe_perk = quote(str(perk_id), safe="")
-        url = f"https://nwdb.info/db/items/page/1.json?filter_perks={safe_perk}"
-        print(f"[NWDB] GET {url}")
-        timeout = aiohttp.ClientTimeout(total=10)
-        async with self.session.get(url, timeout=timeout) as resp:
-            if resp.status >= 400:
-                return []
-            payload = await resp.json()
-        items = []
-        for it in (payload.get("data") or [])[:5]:
-            items.append({
-                "id": str(it.get("id") or ""),
-                "name": it.get("name") or "",
-                "description": self._clean_text(it.get("description")),
-            })
-        return items
+        payload = await self._fetch_items_by_perk_page(perk_id, 1)
+        if payload.get("error"):
+            return []
+        return [self._item_summary(it) for it in (payload.get("data") or [])[:5]]
 
+    @timed()
+    async def fetch_items_by_perk(self, perk_id: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """Items carrying `perk_id` in NWDB order, stopping once `limit` are found."""
+        rows = await PageStream(lambda page: self._fetch_items_by_perk_page(perk_id, page)).collect(limit)
+        return [self._item_summary(it) for it in rows]
+
+    @timed()
     async def fetch_items_by_perk_summary(self, perk_id: str) -> dict:
         """
         Fetch page 1 to get first 5 items and pageCount; if multiple pages, fetch last page
         to compute an exact total count without pulling every page.
         Returns: {"items": [...first5...], "pageCount": int, "total": int}
         """
-        safe_perk = quote(str(perk_id), safe="")
-        url1 = f"https://nwdb.info/db/items/page/1.json?filter_perks={safe_perk}"
-        print(f"[NWDB] GET {url1}")
-        timeout = aiohttp.ClientTimeout(total=10)
-        async with self.session.get(url1, timeout=timeout) as resp:
-            if resp.status >= 400:
-                return {"items": [], "pageCount": 0, "total": 0}
-            p1 = await resp.json()
+        p1 = await self._fetch_items_by_perk_page(perk_id, 1)
+        if p1.get("error"):
+            return {"items": [], "pageCount": 0, "total": 0}
 
         data1 = p1.get("data") or []
         page_count = int(p1.get("pageCount") or 1)
         per_page = len(data1)
-        items = []
-        for it in data1[:5]:
-            items.append({
-                "id": str(it.get("id") or ""),
-                "name": it.get("name") or "",
-                "description": self._clean_text(it.get("description")),
-            })
+        items = [self._item_summary(it) for it in data1[:5]]
 
         if page_count <= 1:
             total = per_page
             return {"items": items, "pageCount": page_count, "total": total}
 
         # Fetch last page just to count its entries
-        urll = f"https://nwdb.info/db/items/page/{page_count}.json?filter_perks={safe_perk}"
-        print(f"[NWDB] GET {urll}")
-        async with self.session.get(urll, timeout=timeout) as resp2:
-            if resp2.status >= 400:
-                # Fall back to minimum estimate
-                total = per_page * (page_count - 1)
-                return {"items": items, "pageCount": page_count, "total": total}
-            plast = await resp2.json()
+        plast = await self._fetch_items_by_perk_page(perk_id, page_count)
+        if plast.get("error"):
+            # Fall back to minimum estimate
+            total = per_page * (page_count - 1)
+            return {"items": items, "pageCount": page_count, "total": total}
         last_count = len(plast.get("data") or [])
         total = per_page * (page_count - 1) + last_count
         return {"items": items, "pageCount": page_count, "total": total}
 
 
 
-    async def _fetch_objective_tasks(self) -> List[Dict]:
+    async def _fetch_objective_tasks(self, refresh: bool = False) -> List[Dict]:
         key = "nwbuddy:objective_tasks"
-        cached = self.cache.get(key)
+        cached = None if refresh else self._cache_get(key)
         if cached is not None:
             return cached
-        timeout = aiohttp.ClientTimeout(total=20)
-        try:
-            async with self.session.get(NW_BUDDY_OBJECTIVE_TASKS_URL, timeout=timeout) as resp:
-                if resp.status >= 400:
-                    self.cache.set(key, [], ttl=900)
+        with self._probe("refresh:objective_tasks"):
+            try:
+                status, payload = await self._get_json("nwbuddy_objective_tasks", self.nwbuddy_base + NW_BUDDY_OBJECTIVE_TASKS_PATH, timeout=20)
+                if status >= 400:
+                    self._cache_set(key, [], ttl=900)
                     return []
-                payload = await resp.json()
-        except Exception:
-            return []
-        tasks = payload.get("data") if isinstance(payload, dict) else payload
-        if not isinstance(tasks, list):
-            tasks = []
-        self.cache.set(key, tasks, ttl=3600)
+            except Exception:
+                return []
+            tasks = payload.get("data") if isinstance(payload, dict) else payload
+            if not isinstance(tasks, list):
+                tasks = []
+            self._cache_set(key, tasks, ttl=3600)
         return tasks
 
     async def _fetch_creature_lookup(self, creature_id: str) -> Optional[tuple[str, Optional[str]]]:
         if not creature_id:
             return None
         key = f"creature:{str(creature_id).lower()}"
-        cached = self.cache.get(key)
+        cached = self._cache_get(key)
         if cached is False:
             return None
         if cached:
             return cached
-        url = f"{self.BASE}/db/creature/{creature_id}.json"
+        url = f"{self.api_base}/db/creature/{creature_id}.json"
         try:
-            timeout = aiohttp.ClientTimeout(total=10)
-            async with self.session.get(url, timeout=timeout) as resp:
-                if resp.status >= 400:
-                    self.cache.set(key, False, ttl=900)
-                    return None
-                payload = await resp.json()
+            status, payload = await self._get_json("creature", url)
+            if status >= 400:
+                self._cache_set(key, False, ttl=900)
+                return None
         except Exception:
             return None
         data = payload.get("data") if isinstance(payload, dict) else None
@@ -335,28 +816,26 @@ class NWDBService:
             name = data.get("Name") or data.get("name")
         if name:
             result = (str(name), f"{self.BASE}/db/creature/{creature_id}")
-            self.cache.set(key, result, ttl=86400)
+            self._cache_set(key, result, ttl=86400)
             return result
-        self.cache.set(key, False, ttl=900)
+        self._cache_set(key, False, ttl=900)
         return None
 
     async def _fetch_zone_lookup(self, zone_id: str) -> Optional[tuple[str, Optional[str]]]:
         if not zone_id:
             return None
         zone_key = f"zone:{zone_id}"
-        cached = self.cache.get(zone_key)
+        cached = self._cache_get(zone_key)
         if cached is False:
             return None
         if cached:
             return cached
-        url = f"{self.BASE}/db/zone/{zone_id}.json"
+        url = f"{self.api_base}/db/zone/{zone_id}.json"
         try:
-            timeout = aiohttp.ClientTimeout(total=10)
-            async with self.session.get(url, timeout=timeout) as resp:
-                if resp.status >= 400:
-                    self.cache.set(zone_key, False, ttl=900)
-                    return None
-                payload = await resp.json()
+            status, payload = await self._get_json("zone", url)
+            if status >= 400:
+                self._cache_set(zone_key, False, ttl=900)
+                return None
         except Exception:
             return None
         data = payload.get("data") if isinstance(payload, dict) else None
@@ -365,35 +844,33 @@ class NWDBService:
             name = data.get("name") or data.get("Name")
         if name:
             result = (str(name), f"{self.BASE}/db/zone/{zone_id}")
-            self.cache.set(zone_key, result, ttl=86400)
+            self._cache_set(zone_key, result, ttl=86400)
             return result
-        self.cache.set(zone_key, False, ttl=900)
+        self._cache_set(zone_key, False, ttl=900)
         return None
 
     async def _load_gamemodes_index(self) -> List[Dict]:
         key = "nwbuddy:gamemodes"
-        cached = self.cache.get(key)
+        cached = self._cache_get(key)
         if cached is not None:
             return cached
-        timeout = aiohttp.ClientTimeout(total=10)
         try:
-            async with self.session.get(NW_BUDDY_GAMEMODES_URL, timeout=timeout) as resp:
-                if resp.status >= 400:
-                    self.cache.set(key, [], ttl=1800)
-                    return []
-                payload = await resp.json()
+            status, payload = await self._get_json("nwbuddy_gamemodes", self.nwbuddy_base + NW_BUDDY_GAMEMODES_PATH)
+            if status >= 400:
+                self._cache_set(key, [], ttl=1800)
+                return []
         except Exception:
             return []
         if not isinstance(payload, list):
             payload = []
-        self.cache.set(key, payload, ttl=86400)
+        self._cache_set(key, payload, ttl=86400)
         return payload
 
     async def _fetch_gamemode_lookup(self, gamemode_id: str) -> Optional[tuple[str, Optional[str]]]:
         if not gamemode_id:
             return None
         gm_key = f"gamemode:{str(gamemode_id).lower()}"
-        cached = self.cache.get(gm_key)
+        cached = self._cache_get(gm_key)
         if cached is False:
             return None
         if cached:
@@ -424,16 +901,22 @@ class NWDBService:
         if not name:
             name = _fallback_label(str(gamemode_id))
         result = (name, None) if name else None
-        self.cache.set(gm_key, result if result else False, ttl=86400)
+        self._cache_set(gm_key, result if result else False, ttl=86400)
         return result
 
+    @timed()
     async def fetch_artifact_objectives(self, item_id: str) -> List[str]:
         if not item_id:
             return []
+        self._hit("artifact", item_id)
+        return await self._artifact_objectives(item_id)
+
+    async def _artifact_objectives(self, item_id: str) -> List[str]:
         try:
             tasks = await self._fetch_objective_tasks()
         except Exception:
             return []
+        self._data_version("objective_tasks", tasks)
         if not tasks:
             return []
 
@@ -446,6 +929,8 @@ class NWDBService:
         async def _gamemode_lookup(gamemode: str) -> Optional[tuple[str, Optional[str]]]:
             return await self._fetch_gamemode_lookup(gamemode)
 
+        from .artifact_objective_service import build_artifact_objectives
+
         try:
             return await build_artifact_objectives(item_id, tasks, _creature_lookup, _zone_lookup, _gamemode_lookup)
         except Exception:
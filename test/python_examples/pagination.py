@@ -0,0 +1,116 @@
+from __future__ import annotations
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+PageFetcher = Callable[[int], Awaitable[Any]]
+
+
+def _page_error(payload: Any) -> Optional[str]:
+    if not isinstance(payload, dict):
+        return "invalid page payload"
+    if payload.get("error"):
+        return str(payload["error"])
+    return None
+
+
+class PageStream:
+    """
+    Pages of a paginated NWDB endpoint ({"pageCount": n, "data": [...]}) in page order.
+
+    Page 1 is fetched first to learn pageCount; after that up to `lookahead` pages are in
+    flight ahead of the consumer. `fetch(page)` returns the decoded payload; an exception or
+    a payload with "error" marks that page failed and it is skipped. Use it as an async
+    context manager so leaving early (break, exception) cancels outstanding requests:
+
+        async with PageStream(fetch) as stream:
+            async for page, payload in stream:
+                ...
+        if not stream.complete:
+            ...  # stream.failed: {page: reason}
+    """
+
+    def __init__(self, fetch: PageFetcher, lookahead: int = 4, max_pages: Optional[int] = None):
+        self._fetch = fetch
+        self.lookahead = max(1, lookahead)
+        self.max_pages = max_pages
+        self.page_count: Optional[int] = None
+        self.failed: Dict[int, str] = {}
+        self.stopped = False
+        self._gen: Optional[AsyncIterator[Tuple[int, Dict[str, Any]]]] = None
+        self._exhausted = False
+
+    @property
+    def complete(self) -> bool:
+        """Every page was delivered (not cut short by a failure, max_pages or an early stop)."""
+        return (
+            self._exhausted and not self.failed and not self.stopped
+            and (not self.max_pages or (self.page_count or 0) <= self.max_pages)
+        )
+
+    async def _one(self, page: int) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        try:
+            payload = await self._fetch(page)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return None, str(e) or type(e).__name__
+        err = _page_error(payload)
+        return (None, err) if err else (payload, None)
+
+    async def _pages(self) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        first, err = await self._one(1)
+        if err:
+            self.failed[1] = err
+            self._exhausted = True
+            return
+        self.page_count = max(1, int(first.get("pageCount") or 1))
+        last = min(self.page_count, self.max_pages) if self.max_pages else self.page_count
+        yield 1, first
+
+        pending: Dict[int, asyncio.Task] = {}
+        next_fetch = next_yield = 2
+        try:
+            while next_yield <= last:
+                while next_fetch <= last and next_fetch < next_yield + self.lookahead:
+                    pending[next_fetch] = asyncio.ensure_future(self._one(next_fetch))
+                    next_fetch += 1
+                page = next_yield
+                next_yield += 1
+                payload, err = await pending.pop(page)
+                if err:
+                    self.failed[page] = err
+                    continue
+                yield page, payload
+            self._exhausted = True
+        finally:
+            for task in pending.values():
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending.values(), return_exceptions=True)
+
+    def __aiter__(self) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        if self._gen is None:
+            self._gen = self._pages()
+        return self._gen
+
+    async def aclose(self) -> None:
+        """Stop early and cancel pages still in flight."""
+        if self._gen is not None and not self._exhausted:
+            self.stopped = True
+            await self._gen.aclose()
+
+    async def __aenter__(self) -> "PageStream":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def collect(self, limit: Optional[int] = None) -> List[Any]:
+        """Concatenated "data" rows in page order, stopping once `limit` rows are in hand."""
+        rows: List[Any] = []
+        async with self:
+            async for _, payload in self:
+                rows.extend(payload.get("data") or [])
+                if limit is not None and len(rows) >= limit:
+                    break
+        return rows[:limit] if limit is not None else rows
@@ -0,0 +1,307 @@
+"""
+Rank items by perk value at one or more gear scores, across the whole catalog at once.
+
+build_item_info evaluates perk_multiplier for one perk of one item at a time. PerkRanker
+loads every perk's ScalingPerGearScore curve into arrays once: segment bounds and slopes,
+cap GS, and the PERK_UI700_PERCENT intercepts / PERK_MAX_MULTIPLIER caps. It also loads
+every (item, perk) pair from item payloads or NWDB's items-by-perk listings. It then
+evaluates all pairs at all requested gear scores in one NumPy pass. Each item is evaluated at
+min(GS, its gearScoreMax). A value is the number the perk description shows
+(X in ${X * perkMultiplier}, times the multiplier), or the multiplier itself when the
+description has no such term.
+
+    python -m services.perk_ranking --payloads items.jsonl --perk perkid_sword_000 --gs 600 700
+    python -m services.perk_ranking --live --types sword ring --perk perkid_ring_012 --top 5
+
+NumPy is only needed here; constructing a PerkRanker without it raises ImportError.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .description_templates import compile_template, scaled_coefficient
+from .item_data_service import (
+    GS_MIN_DEFAULT, PERK_MAX_MULTIPLIER, PERK_UI700_PERCENT, area_to_gs, parse_scaling,
+)
+from .pagination import PageStream
+from .request_scheduler import BULK, request_priority
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional
+    np = None
+
+
+class PerkCurve(NamedTuple):
+    id: str
+    name: str
+    segments: List[Tuple[int, float]]
+    cap: int
+    base: Optional[float]           # X in ${X * perkMultiplier}
+    intercept: Optional[float]      # set when anchored to a PERK_UI700_PERCENT value
+    max_mult: Optional[float]
+
+
+def perk_curve(perk: Dict[str, Any]) -> PerkCurve:
+    """Scaling curve of one perk record, resolved the way perk_multiplier does."""
+    pid = str(perk.get("id") or "")
+    desc = perk.get("description")
+    meta = parse_scaling(perk.get("ScalingPerGearScore") or "")
+    segs = meta["segments"]
+    base = scaled_coefficient(compile_template(desc)) if isinstance(desc, str) else None
+    ui700 = PERK_UI700_PERCENT.get(pid)
+    intercept = None
+    if segs and isinstance(ui700, (int, float)) and isinstance(base, (int, float)) and base != 0:
+        intercept = float(ui700) / float(base) - area_to_gs(segs, GS_MIN_DEFAULT, 700)
+    return PerkCurve(
+        pid, perk.get("name") or "", segs, int(meta.get("capGS") or 700),
+        float(base) if isinstance(base, (int, float)) else None, intercept, PERK_MAX_MULTIPLIER.get(pid),
+    )
+
+
+def _curve_key(perk: Dict[str, Any]) -> Tuple[str, Any, Any]:
+    return str(perk["id"]), perk.get("description"), perk.get("ScalingPerGearScore")
+
+
+class _Arrays:
+    """Column arrays for the current curves and pairs; rebuilt after any add_*."""
+
+    def __init__(self, perks: List[PerkCurve], items: List[Tuple[str, str, Optional[int]]],
+                 pairs: List[Tuple[int, int, int]]):
+        n_perks = len(perks)
+        width = max([len(p.segments) for p in perks] + [1])
+        # Unused segment slots start at +inf, so their span is always 0
+        self.seg_start = np.full((n_perks, width), np.inf)
+        self.seg_end = np.full((n_perks, width), np.inf)
+        self.seg_slope = np.zeros((n_perks, width))
+        for i, p in enumerate(perks):
+            for k, (start, slope) in enumerate(p.segments):
+                self.seg_start[i, k] = max(GS_MIN_DEFAULT, start)
+                if k + 1 < len(p.segments):
+                    self.seg_end[i, k] = p.segments[k + 1][0]
+                self.seg_slope[i, k] = slope
+        self.curved = np.array([bool(p.segments) for p in perks], dtype=bool)
+        self.cap = np.array([p.cap for p in perks], dtype=float)
+        self.anchored = np.array([p.intercept is not None for p in perks], dtype=bool)
+        self.intercept = np.array([p.intercept or 0.0 for p in perks], dtype=float)
+        self.max_mult = np.array([np.inf if p.max_mult is None else p.max_mult for p in perks], dtype=float)
+        self.base = np.array([np.nan if p.base is None else p.base for p in perks], dtype=float)
+
+        self.item_max = np.array([np.inf if gs is None else gs for _, _, gs in items], dtype=float)
+        # Ties in value are broken by item id
+        by_id = sorted(range(len(items)), key=lambda i: items[i][0])
+        self.item_rank = np.empty(len(items), dtype=np.int64)
+        self.item_rank[by_id] = np.arange(len(items))
+        self.pair_item = np.array([i for i, _, _ in pairs], dtype=np.int64)
+        self.pair_perk = np.array([p for _, p, _ in pairs], dtype=np.int64)
+        self.pair_curve = np.array([c for _, _, c in pairs], dtype=np.int64)
+
+
+class PerkRanker:
+    def __init__(self):
+        if np is None:
+            raise ImportError("perk_ranking needs numpy (pip install numpy)")
+        # Curves keyed by (perk id, description, scaling): an item payload's own perk row is
+        # what build_item_info renders, and it can differ from the perk list's definition
+        self._curves: Dict[Tuple[str, Any, Any], PerkCurve] = {}
+        # perk id -> key of its latest definition, for members known only from a listing
+        self._latest: Dict[str, Tuple[str, Any, Any]] = {}
+        # item id -> (name, gearScoreMax)
+        self._items: Dict[str, Tuple[str, Optional[int]]] = {}
+        # (item id, perk id) -> curve key (None: the perk's latest definition), first-seen order
+        self._pairs: Dict[Tuple[str, str], Optional[Tuple[str, Any, Any]]] = {}
+        self._arrays: Optional[_Arrays] = None
+        self._perk_ids: List[str] = []
+        self._perk_index: Dict[str, int] = {}
+        self._item_ids: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._pairs)
+
+    def add_perk(self, perk: Dict[str, Any]) -> Optional[Tuple[str, Any, Any]]:
+        if not isinstance(perk, dict) or not perk.get("id"):
+            return None
+        key = _curve_key(perk)
+        if key not in self._curves:
+            self._curves[key] = perk_curve(perk)
+        self._latest[key[0]] = key
+        self._arrays = None
+        return key
+
+    def add_item(self, item_id: Any, name: str = "", gear_score_max: Any = None, perk_ids: Iterable[Any] = ()) -> None:
+        """Record an item; `perk_ids` are perk ids, or perk records to value with their own curve."""
+        item_id = str(item_id)
+        old_name, old_gs = self._items.get(item_id, ("", None))
+        gs = gear_score_max if isinstance(gear_score_max, int) else old_gs
+        self._items[item_id] = (name or old_name, gs)
+        for perk in perk_ids:
+            if isinstance(perk, dict):
+                key = self.add_perk(perk)
+                if key is not None and self._pairs.get((item_id, key[0])) is None:
+                    self._pairs[(item_id, key[0])] = key
+            else:
+                self._pairs.setdefault((item_id, str(perk)), None)
+        self._arrays = None
+
+    def add_payload(self, raw: Dict[str, Any]) -> bool:
+        """One NWDB item payload ({"data": {...}} or the bare record): its perks and their curves."""
+        d = raw.get("data") if isinstance(raw.get("data"), dict) else raw
+        if not isinstance(d, dict) or not d.get("id"):
+            return False
+        self.add_item(d["id"], d.get("name") or "", d.get("gearScoreMax"), d.get("perks") or [])
+        return True
+
+    def add_listing(self, perk_id: Any, rows: Iterable[Dict[str, Any]]) -> None:
+        """Rows of the items-by-perk listing for `perk_id`."""
+        for row in rows:
+            if isinstance(row, dict) and row.get("id"):
+                self.add_item(row["id"], row.get("name") or "", row.get("gearScoreMax"), [perk_id])
+
+    def _build(self) -> _Arrays:
+        if self._arrays is None:
+            self._perk_ids = list(self._latest)
+            self._item_ids = list(self._items)
+            perk_index = self._perk_index = {pid: i for i, pid in enumerate(self._perk_ids)}
+            item_index = {iid: i for i, iid in enumerate(self._item_ids)}
+            curve_keys = list(self._curves)
+            curve_index = {key: i for i, key in enumerate(curve_keys)}
+            # Members of perks we have no curve for can't be valued; they are left out
+            pairs = [
+                (item_index[i], perk_index[p], curve_index[key or self._latest[p]])
+                for (i, p), key in self._pairs.items() if key is not None or p in self._latest
+            ]
+            items = [(iid, *self._items[iid]) for iid in self._item_ids]
+            self._arrays = _Arrays([self._curves[k] for k in curve_keys], items, pairs)
+        return self._arrays
+
+    def _evaluate(self, a: _Arrays, sel, gear_scores: Sequence[int]):
+        """(effective GS, multiplier, value) for the selected pairs, each shaped (pairs, len(gear_scores))."""
+        perk = a.pair_curve[sel]
+        gs = np.asarray(gear_scores, dtype=float)
+        g = np.minimum(gs[None, :], a.item_max[a.pair_item[sel]][:, None])
+        g = np.maximum(np.minimum(g, a.cap[perk][:, None]), GS_MIN_DEFAULT)
+        spans = np.minimum(a.seg_end[perk][:, None, :], g[:, :, None]) - a.seg_start[perk][:, None, :]
+        area = (np.clip(spans, 0.0, None) * a.seg_slope[perk][:, None, :]).sum(axis=2)
+        mult = np.where(
+            a.anchored[perk][:, None],
+            a.intercept[perk][:, None] + area,
+            np.minimum(1.0 + area, a.max_mult[perk][:, None]),
+        )
+        mult = np.where(a.curved[perk][:, None], mult, 1.0)
+        base = a.base[perk][:, None]
+        value = np.where(np.isnan(base), mult, base * mult)
+        return g, mult, value
+
+    def pairs(self) -> List[Tuple[str, str]]:
+        """(item id, perk id) for each row of values()."""
+        a = self._build()
+        return [(self._item_ids[i], self._perk_ids[p]) for i, p in zip(a.pair_item.tolist(), a.pair_perk.tolist())]
+
+    def values(self, gear_scores: Sequence[int] = (700,)):
+        """Values of every valued (item, perk) pair, shaped (pairs, len(gear_scores)), in pair order."""
+        a = self._build()
+        return self._evaluate(a, slice(None), gear_scores)[2]
+
+    def top_many(
+        self, perk_ids: Optional[Iterable[Any]] = None, gear_scores: Sequence[int] = (700,), k: int = 10,
+    ) -> Dict[str, Dict[int, List[Dict[str, Any]]]]:
+        """
+        {perk id: {gear score: top-k items}} for `perk_ids` (default: every perk), highest value
+        first, ties by item id.
+        """
+        a = self._build()
+        gear_scores = [int(g) for g in gear_scores]
+        if perk_ids is None:
+            sel = np.arange(len(a.pair_perk))
+        else:
+            wanted = [self._perk_index[str(p)] for p in perk_ids if str(p) in self._perk_index]
+            sel = np.flatnonzero(np.isin(a.pair_perk, wanted))
+        g, mult, value = self._evaluate(a, sel, gear_scores)
+        perk, item = a.pair_perk[sel], a.pair_item[sel]
+
+        out: Dict[str, Dict[int, List[Dict[str, Any]]]] = {}
+        for j, gs in enumerate(gear_scores):
+            # One sort per gear score: by perk, then value descending, then item id
+            order = np.lexsort((a.item_rank[item], -value[:, j], perk))
+            sorted_perk = perk[order]
+            starts = np.flatnonzero(np.r_[True, sorted_perk[1:] != sorted_perk[:-1]]).tolist() if len(order) else []
+            # Only the top k of each perk are turned into Python objects
+            keep = np.concatenate([order[s:e][:k] for s, e in zip(starts, starts[1:] + [len(order)])]) if starts else order
+            ids, gss = item[keep].tolist(), g[keep, j].tolist()
+            mults, vals = mult[keep, j].tolist(), value[keep, j].tolist()
+            pids = perk[keep].tolist()
+            for n, r in enumerate(ids):
+                iid = self._item_ids[r]
+                out.setdefault(self._perk_ids[pids[n]], {}).setdefault(gs, []).append({
+                    "id": iid,
+                    "name": self._items[iid][0],
+                    "gearScore": int(gss[n]),
+                    "multiplier": round(mults[n], 6),
+                    "value": round(vals[n], 4),
+                })
+        return out
+
+    def top(self, perk_id: Any, gear_score: int = 700, k: int = 10) -> List[Dict[str, Any]]:
+        return self.top_many([perk_id], [gear_score], k).get(str(perk_id), {}).get(int(gear_score), [])
+
+
+async def load_from_service(service, item_types: Iterable[str], ranker: Optional[PerkRanker] = None,
+                            concurrency: int = 4) -> PerkRanker:
+    """
+    Perk curves from the per-type perk lists and membership from the items-by-perk listings,
+    fetched through NWDBService at bulk priority.
+    """
+    ranker = ranker or PerkRanker()
+    limiter = asyncio.Semaphore(max(1, concurrency))
+
+    async def _members(perk_id: str) -> None:
+        async with limiter:
+            rows = await PageStream(lambda page: service._fetch_items_by_perk_page(perk_id, page)).collect()
+        ranker.add_listing(perk_id, rows)
+
+    with request_priority(BULK):
+        perk_ids = []
+        for item_type in item_types:
+            for perk in await service.fetch_all_perks_for_item_type(item_type):
+                ranker.add_perk(perk)
+                perk_ids.append(str(perk.get("id") or ""))
+        await asyncio.gather(*(_members(pid) for pid in dict.fromkeys(p for p in perk_ids if p)))
+    return ranker
+
+
+async def _load_live(item_types: List[str]) -> PerkRanker:
+    from .nwdb_service import NWDBService
+
+    async with NWDBService() as service:
+        return await load_from_service(service, item_types)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Top items per perk by value at given gear scores")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("--payloads", nargs="+", help=".jsonl or {id: payload} .json files of NWDB item payloads")
+    src.add_argument("--live", action="store_true", help="perk lists and items-by-perk listings from nwdb.info")
+    parser.add_argument("--types", nargs="+", default=[], help="with --live, the perk item types to load")
+    parser.add_argument("--perk", action="append", help="perk id (repeatable; default: every perk)")
+    parser.add_argument("--gs", type=int, nargs="+", default=[700])
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if args.live:
+        ranker = asyncio.run(_load_live(args.types))
+    else:
+        from .drop_index import iter_payload_file
+
+        ranker = PerkRanker()
+        for path in args.payloads:
+            for raw in iter_payload_file(path):
+                if isinstance(raw, dict):
+                    ranker.add_payload(raw)
+    print(json.dumps(ranker.top_many(args.perk, args.gs, args.top), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,236 @@
+"""
+Access-frequency tracking and background cache warming for NWDBService.
+
+PopularityTracker keeps exponentially decayed hit counts per (kind, key): kinds are "item"
+(item details), "perks" (perk lists per item type) and "artifact" (artifact objectives).
+Scores are stored pre-scaled by e^(rate * t) so a hit is one dict update; the scale is
+rebased before it can overflow.
+
+CacheWarmer refreshes the top-N keys shortly before their cache TTL runs out, and once at
+start, spending at most `budget_per_minute` upstream requests. A refresh reserves a per-kind
+estimate before it starts and is then charged the requests it actually sent (a perk list
+can span any number of pages), so overruns delay the next refreshes.
+Save the tracker on shutdown and load it on startup to warm after a restart.
+"""
+from __future__ import annotations
+import asyncio
+import heapq
+import json
+import math
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .request_scheduler import REFRESH, counting_requests, request_priority
+
+# Seconds until the warmed cache entry expires, per kind; mirrors the TTLs in nwdb_service
+WARM_TTLS = {"item": 3600, "perks": 1800, "artifact": 3600}
+# Upstream requests reserved for a refresh until its real count is known
+WARM_COSTS = {"item": 1, "perks": 4, "artifact": 2}
+
+
+class PopularityTracker:
+    def __init__(self, half_life: float = 3600.0, max_keys: int = 5000, clock: Callable[[], float] = time.monotonic):
+        self.half_life = half_life
+        self.max_keys = max_keys
+        self._clock = clock
+        self._rate = math.log(2) / half_life
+        self._t0 = clock()
+        self._scores: Dict[Tuple[str, str], float] = {}
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def _scale(self) -> float:
+        elapsed = self._clock() - self._t0
+        if elapsed * self._rate > 600:
+            self._rebase()
+            elapsed = 0.0
+        return math.exp(elapsed * self._rate)
+
+    def _rebase(self) -> None:
+        factor = math.exp(-(self._clock() - self._t0) * self._rate)
+        self._scores = {k: v * factor for k, v in self._scores.items() if v * factor > 1e-6}
+        self._t0 = self._clock()
+
+    def hit(self, kind: str, key: Any, weight: float = 1.0) -> None:
+        k = (kind, str(key))
+        self._scores[k] = self._scores.get(k, 0.0) + weight * self._scale()
+        if len(self._scores) > self.max_keys * 1.25:
+            # Drop the coldest tail in one go rather than on every insert
+            keep = heapq.nlargest(self.max_keys, self._scores.items(), key=lambda kv: kv[1])
+            self._scores = dict(keep)
+
+    def score(self, kind: str, key: Any) -> float:
+        return self._scores.get((kind, str(key)), 0.0) / self._scale()
+
+    def top(self, n: int, kind: Optional[str] = None) -> List[Tuple[str, str, float]]:
+        """[(kind, key, decayed hits)] hottest first."""
+        scale = self._scale()
+        items = self._scores.items() if kind is None else ((k, v) for k, v in self._scores.items() if k[0] == kind)
+        return [(k[0], k[1], v / scale) for k, v in heapq.nlargest(n, items, key=lambda kv: kv[1])]
+
+    def save(self, path: str) -> None:
+        rows = [[kind, key, round(score, 6)] for kind, key, score in self.top(self.max_keys)]
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"halfLife": self.half_life, "scores": rows}, fh, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> int:
+        """Merge saved scores (as of now); returns how many keys were read. Missing file reads 0."""
+        try:
+            with open(path, encoding="utf-8") as fh:
+                payload = json.load(fh)
+        except (OSError, ValueError):
+            return 0
+        rows = payload.get("scores") or []
+        for kind, key, score in rows:
+            self.hit(kind, key, float(score))
+        return len(rows)
+
+
+class RequestBudget:
+    """Token bucket refilled continuously at `per_minute`, holding at most one minute's worth."""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.per_minute = per_minute
+        self._clock = clock
+        self._tokens = float(per_minute)
+        self._at = clock()
+
+    def available(self) -> float:
+        now = self._clock()
+        self._tokens = min(self.per_minute, self._tokens + (now - self._at) * self.per_minute / 60.0)
+        self._at = now
+        return self._tokens
+
+    def try_spend(self, cost: float) -> bool:
+        if self.available() < cost:
+            return False
+        self._tokens -= cost
+        return True
+
+    def settle(self, reserved: float, spent: float) -> None:
+        """Replace a `reserved` amount with what was actually `spent`; may leave the bucket in debt."""
+        self._tokens += reserved - spent
+
+
+class CacheWarmer:
+    def __init__(
+        self,
+        service,
+        tracker: Optional[PopularityTracker] = None,
+        top_n: int = 200,
+        budget_per_minute: float = 60,
+        interval: float = 60.0,
+        refresh_at: float = 0.8,
+        concurrency: int = 4,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.service = service
+        self.tracker = tracker or service.popularity
+        self.top_n = top_n
+        self.budget = RequestBudget(budget_per_minute, clock)
+        self.interval = interval
+        # Refresh once this fraction of the TTL has passed since the last warm
+        self.refresh_at = refresh_at
+        self._clock = clock
+        self._limiter = asyncio.Semaphore(max(1, concurrency))
+        self._warmed: Dict[Tuple[str, str], float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"passes": 0, "refreshed": 0, "failed": 0, "skippedBudget": 0, "passErrors": 0, "requests": 0}
+        self.last_error: Optional[str] = None
+
+    def _due(self, kind: str, key: str) -> bool:
+        last = self._warmed.get((kind, key))
+        if last is None:
+            return True
+        return self._clock() - last >= WARM_TTLS[kind] * self.refresh_at
+
+    async def _refresh(self, kind: str, key: str) -> bool:
+        """Refresh one key, charging the budget for the upstream requests it made."""
+        spent = 0
+
+        def _count(n: int) -> None:
+            nonlocal spent
+            spent += n
+
+        try:
+            with counting_requests(_count):
+                return await self._warm(kind, key)
+        finally:
+            self.budget.settle(WARM_COSTS[kind], spent)
+            self.stats["requests"] += spent
+
+    async def _warm(self, kind: str, key: str) -> bool:
+        svc = self.service
+        if kind == "item":
+            # Shared with a batch already fetching this id; shielded as in get_items_details_batch
+            task = svc._background(f"item_info:{key}", lambda: svc._fetch_item_info(key, self._limiter))
+            info = await asyncio.shield(task)
+            return not info.get("error")
+        async with self._limiter:
+            if kind == "perks":
+                perks, complete = await svc._fetch_perks(key, refresh=True)
+                return complete and bool(perks)
+            if kind == "artifact":
+                if self._due("artifact", ""):
+                    if not await svc._fetch_objective_tasks(refresh=True):
+                        return False
+                    self._warmed[("artifact", "")] = self._clock()
+                # Fills the creature / zone / gamemode lookups this artifact needs
+                return bool(await svc._artifact_objectives(key))
+        return False
+
+    async def run_once(self) -> Dict[str, int]:
+        """One pass over the current top-N; returns counts for this pass."""
+        due, skipped = [], 0
+        for kind, key, _ in self.tracker.top(self.top_n):
+            if kind not in WARM_TTLS or not self._due(kind, key):
+                continue
+            if not self.budget.try_spend(WARM_COSTS[kind]):
+                skipped += 1
+                continue
+            due.append((kind, key))
+        with request_priority(REFRESH):
+            results = await asyncio.gather(*(self._refresh(k, key) for k, key in due), return_exceptions=True)
+        refreshed = failed = 0
+        now = self._clock()
+        for (kind, key), ok in zip(due, results):
+            if ok is True:
+                self._warmed[(kind, key)] = now
+                refreshed += 1
+            else:
+                failed += 1
+        self.stats["passes"] += 1
+        self.stats["refreshed"] += refreshed
+        self.stats["failed"] += failed
+        self.stats["skippedBudget"] += skipped
+        return {"refreshed": refreshed, "failed": failed, "skippedBudget": skipped}
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["passErrors"] += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> asyncio.Task:
+        """Warm immediately, then every `interval` seconds."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._loop())
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,143 @@
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class LRU:
+    """Small OrderedDict-backed LRU map."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = max(1, int(maxsize))
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class QueryCache:
+    """
+    Ranked-result cache for autocomplete.
+
+    Keys carry the data version of the list they were computed from (catalog or per-type perk
+    list), so a refresh invalidates every older entry at once: stale keys simply stop matching
+    and age out of the LRU.
+
+    Besides final results, it keeps the full candidate list (every record whose name contains
+    the query, in source order) for queries with at most `max_candidates` matches. Any longer
+    query that extends a cached one only needs to filter that list.
+
+    A small refresh doesn't have to cost every entry: `apply` moves the entries of one
+    version to the next, patching the candidate lists the delta touches and dropping only
+    the results it touches. Methods take a lock, since the catalog is published from a
+    worker thread.
+    """
+
+    def __init__(self, maxsize: int = 4096, candidate_maxsize: int = 1024, max_candidates: int = 2000):
+        self.results = LRU(maxsize)
+        self.candidates = LRU(candidate_maxsize)
+        self.max_candidates = max_candidates
+        self._lock = threading.Lock()
+
+    def get_results(self, kind: str, scope: str, version: int, query: str, limit: int) -> Optional[List[Any]]:
+        with self._lock:
+            return self.results.get((kind, scope, version, query, limit))
+
+    def put_results(self, kind: str, scope: str, version: int, query: str, limit: int, ranked: List[Any]) -> None:
+        with self._lock:
+            self.results.set((kind, scope, version, query, limit), ranked)
+
+    def get_candidates(self, kind: str, scope: str, version: int, query: str) -> Optional[List[Any]]:
+        """Candidates for the longest cached prefix of `query` (query itself included)."""
+        with self._lock:
+            for end in range(len(query), 0, -1):
+                found = self.candidates._data.get((kind, scope, version, query[:end]))
+                if found is not None:
+                    self.candidates._data.move_to_end((kind, scope, version, query[:end]))
+                    self.candidates.hits += 1
+                    return found
+            self.candidates.misses += 1
+            return None
+
+    def put_candidates(self, kind: str, scope: str, version: int, query: str, candidates: List[Any]) -> None:
+        if len(candidates) <= self.max_candidates:
+            with self._lock:
+                self.candidates.set((kind, scope, version, query), candidates)
+
+    def apply(
+        self, kind: str, scope: str, version: int, new_version: int,
+        names: Iterable[str], gone: Iterable[str], records: Iterable[Any], current: List[Any],
+    ) -> Dict[str, int]:
+        """
+        Carry (kind, scope) entries at `version` over to `new_version` after a delta.
+        `names` are the lowercased old and new names of every touched record, `gone` the ids
+        of removed and changed records, `records` the added and changed records, `current`
+        the whole new list (for source order). Entries whose query matches none of `names`
+        move unchanged; touched candidate lists are patched, touched results dropped.
+        """
+        names = list(names)
+        gone = set(gone)
+        records = list(records)
+        order: Optional[Dict[str, int]] = None
+        counts = {"moved": 0, "patched": 0, "dropped": 0}
+        with self._lock:
+            data = self.candidates._data
+            for key in [k for k in data if k[:3] == (kind, scope, version)]:
+                rows = data.pop(key)
+                q = key[3]
+                if any(q in n for n in names):
+                    if order is None:
+                        order = {str(r.get("id")): i for i, r in enumerate(current)}
+                    rows = [r for r in rows if str(r.get("id")) not in gone]
+                    rows += [r for r in records if q in (r.get("name") or "").lower()]
+                    rows.sort(key=lambda r: order.get(str(r.get("id")), len(order)))
+                    if len(rows) > self.max_candidates:
+                        counts["dropped"] += 1
+                        continue
+                    counts["patched"] += 1
+                else:
+                    counts["moved"] += 1
+                data[(kind, scope, new_version, q)] = rows
+            data = self.results._data
+            for key in [k for k in data if k[:3] == (kind, scope, version)]:
+                rows = data.pop(key)
+                if any(key[3] in n for n in names):
+                    counts["dropped"] += 1
+                    continue
+                counts["moved"] += 1
+                data[(kind, scope, new_version, *key[3:])] = rows
+        return counts
+
+    def clear(self) -> None:
+        with self._lock:
+            self.results.clear()
+            self.candidates.clear()
+
+    def stats(self) -> Dict[str, Tuple[int, int, int]]:
+        """{name: (entries, hits, misses)}"""
+        with self._lock:
+            return {
+                "results": (len(self.results), self.results.hits, self.results.misses),
+                "candidates": (len(self.candidates), self.candidates.hits, self.candidates.misses),
+            }
@@ -0,0 +1,284 @@
+"""
+Priority scheduling of upstream requests over a shared connection budget.
+
+Every NWDBService HTTP request holds one PriorityGate slot while it runs. Requests carry a
+priority class: "interactive" (a user is waiting), "refresh" (cache warming) or "bulk"
+(crawls and exports). When slots are short, waiters are admitted by smooth weighted
+round-robin across the classes that have someone queued, and `reserve` slots are only
+ever handed to interactive requests. A crawl then uses whatever capacity is left
+without pushing user lookups behind it.
+
+The class comes from the `priority` argument or, more usually, from the surrounding context:
+
+    with request_priority("bulk"):
+        await service.get_items_details_batch(ids)
+
+The context is copied into tasks created inside the block, so background work started
+there keeps its class.
+
+Work shared between callers (NWDBService._background) runs under a `Ticket` instead: a
+priority every request of that work reads, which a later caller can raise. Raising it moves
+the work's queued requests to the higher class, so a user who joins a fetch a crawl started
+doesn't wait in the bulk queue.
+
+`counting_requests(callback)` has every upstream request made in its context (and in tasks
+started there) reported through `callback(1)`; CacheWarmer uses it to charge its budget.
+"""
+from __future__ import annotations
+import asyncio
+import contextlib
+import contextvars
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+INTERACTIVE = "interactive"
+REFRESH = "refresh"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, REFRESH, BULK)
+DEFAULT_WEIGHTS = {INTERACTIVE: 8, REFRESH: 2, BULK: 1}
+
+
+
+class Ticket:
+    """Priority shared by the requests of one piece of work; see `shared_priority`."""
+    __slots__ = ("priority", "_queued", "_raised")
+
+    def __init__(self, priority: str):
+        self.priority = priority
+        self._queued: List[Tuple["PriorityGate", asyncio.Future]] = []
+        self._raised: List[asyncio.Future] = []
+
+    def raise_to(self, priority: str) -> bool:
+        """Move to `priority` if it ranks higher, taking queued requests along. True when raised."""
+        if PRIORITIES.index(priority) >= PRIORITIES.index(self.priority):
+            return False
+        old, self.priority = self.priority, priority
+        for gate, fut in list(self._queued):
+            gate._promote(fut, old, priority)
+        if priority == INTERACTIVE:
+            for fut in self._raised:
+                if not fut.done():
+                    fut.set_result(None)
+        return True
+
+
+_current: contextvars.ContextVar[str] = contextvars.ContextVar("nwdb_request_priority", default=INTERACTIVE)
+_ticket: contextvars.ContextVar[Optional[Ticket]] = contextvars.ContextVar("nwdb_request_ticket", default=None)
+
+
+def current_priority() -> str:
+    ticket = _ticket.get()
+    return ticket.priority if ticket is not None else _current.get()
+
+
+@contextlib.contextmanager
+def request_priority(priority: str) -> Iterator[None]:
+    if priority not in PRIORITIES:
+        raise ValueError(f"unknown request priority: {priority!r}")
+    # An explicit class wins over a surrounding ticket
+    token = _current.set(priority)
+    ticket_token = _ticket.set(None)
+    try:
+        yield
+    finally:
+        _ticket.reset(ticket_token)
+        _current.reset(token)
+
+
+@contextlib.asynccontextmanager
+async def limited(limiter: asyncio.Semaphore):
+    """
+    Hold `limiter` (a caller's own concurrency cap) for the block, unless the surrounding ticket
+    is or gets raised to interactive: that work is no longer only its creator's, so it stops
+    waiting behind the creator's other requests and goes straight on to the gate.
+    """
+    ticket = _ticket.get()
+    if ticket is None:
+        async with limiter:
+            yield
+        return
+    if ticket.priority == INTERACTIVE:
+        yield
+        return
+    raised = asyncio.get_running_loop().create_future()
+    ticket._raised.append(raised)
+    acquire = asyncio.ensure_future(limiter.acquire())
+    try:
+        await asyncio.wait((acquire, raised), return_when=asyncio.FIRST_COMPLETED)
+    except BaseException:
+        if acquire.done() and not acquire.cancelled():
+            limiter.release()
+        else:
+            acquire.cancel()
+        raise
+    finally:
+        ticket._raised.remove(raised)
+    if not acquire.done():
+        acquire.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await acquire
+    held = not acquire.cancelled()
+    try:
+        yield
+    finally:
+        if held:
+            limiter.release()
+
+
+_counter: contextvars.ContextVar[Optional[Callable[[int], None]]] = contextvars.ContextVar(
+    "nwdb_request_counter", default=None
+)
+
+
+@contextlib.contextmanager
+def counting_requests(callback: Callable[[int], None]) -> Iterator[None]:
+    token = _counter.set(callback)
+    try:
+        yield
+    finally:
+        _counter.reset(token)
+
+
+def count_request(n: int = 1) -> None:
+    """Called by NWDBService for each upstream request it sends."""
+    callback = _counter.get()
+    if callback is not None:
+        callback(n)
+
+
+@contextlib.contextmanager
+def shared_priority() -> Iterator[Ticket]:
+    """
+    A Ticket at the current priority, in effect for the block and for tasks created inside it.
+    Whoever later shares the work calls `ticket.raise_to(current_priority())`.
+    """
+    ticket = Ticket(current_priority())
+    token = _ticket.set(ticket)
+    try:
+        yield ticket
+    finally:
+        _ticket.reset(token)
+
+
+class _ClassStats:
+    __slots__ = ("admitted", "queued", "promoted", "wait_total", "wait_max")
+
+    def __init__(self):
+        self.admitted = 0
+        self.queued = 0
+        self.promoted = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class PriorityGate:
+    def __init__(self, capacity: int = 16, weights: Optional[Dict[str, int]] = None, reserve: int = 2):
+        self.capacity = max(1, capacity)
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self.reserve = min(max(0, reserve), self.capacity - 1)
+        self.in_use = 0
+        self._queues: Dict[str, Deque[asyncio.Future]] = {p: deque() for p in PRIORITIES}
+        self._credit: Dict[str, float] = dict.fromkeys(PRIORITIES, 0.0)
+        self._stats: Dict[str, _ClassStats] = {p: _ClassStats() for p in PRIORITIES}
+
+    def _allowed(self, priority: str) -> bool:
+        free = self.capacity - self.in_use
+        return free > 0 and (priority == INTERACTIVE or free > self.reserve)
+
+    def _pick(self) -> Optional[str]:
+        eligible = [p for p in PRIORITIES if self._queues[p] and self._allowed(p)]
+        if not eligible:
+            return None
+        if len(eligible) == 1:
+            return eligible[0]
+        total = 0
+        for p in eligible:
+            self._credit[p] += self.weights.get(p, 1)
+            total += self.weights.get(p, 1)
+        chosen = max(eligible, key=lambda p: self._credit[p])
+        self._credit[chosen] -= total
+        return chosen
+
+    def _dispatch(self) -> None:
+        while True:
+            priority = self._pick()
+            if priority is None:
+                return
+            fut = self._queues[priority].popleft()
+            if fut.done():
+                continue
+            self.in_use += 1
+            fut.set_result(None)
+
+    def _promote(self, fut: asyncio.Future, old: str, new: str) -> None:
+        try:
+            self._queues[old].remove(fut)
+        except ValueError:
+            return
+        self._queues[new].append(fut)
+        self._stats[old].promoted += 1
+        self._dispatch()
+
+    async def acquire(self, priority: str = INTERACTIVE, ticket: Optional[Ticket] = None) -> None:
+        """Wait for a slot. With a `ticket`, raising the ticket moves this request up while it waits."""
+        stats = self._stats[priority]
+        if self._allowed(priority) and not any(self._queues.values()):
+            self.in_use += 1
+            stats.admitted += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._queues[priority].append(fut)
+        if ticket is not None:
+            ticket._queued.append((self, fut))
+        stats.queued += 1
+        t0 = time.perf_counter()
+        self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Slot was granted just as we were cancelled; hand it on
+                self.release()
+            else:
+                for queue in self._queues.values():
+                    with contextlib.suppress(ValueError):
+                        queue.remove(fut)
+            raise
+        finally:
+            if ticket is not None:
+                with contextlib.suppress(ValueError):
+                    ticket._queued.remove((self, fut))
+        waited = time.perf_counter() - t0
+        stats.admitted += 1
+        stats.wait_total += waited
+        stats.wait_max = max(stats.wait_max, waited)
+
+    def release(self) -> None:
+        self.in_use -= 1
+        self._dispatch()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: Optional[str] = None):
+        ticket = None
+        if priority is None:
+            ticket = _ticket.get()
+            priority = current_priority()
+        await self.acquire(priority, ticket)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {
+            p: {
+                "admitted": s.admitted,
+                "queued": s.queued,
+                "promoted": s.promoted,
+                "waiting": len(self._queues[p]),
+                "avgWaitMs": round(s.wait_total / s.queued * 1000, 3) if s.queued else 0.0,
+                "maxWaitMs": round(s.wait_max * 1000, 3),
+            }
+            for p, s in self._stats.items()
+        }
@@ -0,0 +1,331 @@
+"""
+Memory-mapped catalog and search index shared by worker processes.
+
+One refresher process downloads the item catalog and perk lists and writes them into a
+single read-only file with `write_catalog` (temp file + rename, so a reader never sees a
+partial write). Workers open it with `SharedCatalog(path)` and pass it to NWDBService as
+`shared=`: the file is mmap'ed, so every process reads the same page-cache pages, nothing
+is parsed up front and the worker makes no catalog or perk-list requests of its own.
+Search runs `mmap.find` over a blob of lowercased names; only returned records are decoded.
+
+Layout (native byte order; the file is meant for processes on one host):
+
+    b"NWDBCAT1" | u32 header length | header JSON | pad to 8 | sections ...
+
+The header maps each dataset ("items", "perks:<item type>") to its record count, content
+hash and four sections, as [offset from the end of the padded header, length]:
+`names` (lowercased names, each followed by "\\n"), `name_offsets` (u32 x count+1 into
+names), `records` (compact JSON per record) and `record_offsets` (u32 x count+1).
+
+    python -m services.shared_catalog refresh --out /dev/shm/nwdb.cat --types sword ring --every 900
+    python -m services.shared_catalog query /dev/shm/nwdb.cat items iron
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional
+
+from .request_scheduler import REFRESH, request_priority
+
+MAGIC = b"NWDBCAT1"
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct("=8sI")
+_ALIGN = 8
+SECTIONS = ("names", "name_offsets", "records", "record_offsets")
+
+
+def _aligned(n: int) -> int:
+    return n + (-n % _ALIGN)
+
+
+def _name_key(record: Dict[str, Any]) -> str:
+    return (record.get("name") or "").lower().replace("\n", " ")
+
+
+def encode_catalog(datasets: Dict[str, List[Dict[str, Any]]], generated_at: Optional[float] = None) -> bytes:
+    body = bytearray()
+    meta: Dict[str, Any] = {}
+    for name in sorted(datasets):
+        names, blob = bytearray(), bytearray()
+        name_offsets, record_offsets = array("I", [0]), array("I", [0])
+        for r in datasets[name]:
+            names += _name_key(r).encode("utf-8") + b"\n"
+            name_offsets.append(len(names))
+            blob += json.dumps(r, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+            record_offsets.append(len(blob))
+        sections = {}
+        for label, data in zip(SECTIONS, (names, name_offsets.tobytes(), blob, record_offsets.tobytes())):
+            body += b"\0" * (_aligned(len(body)) - len(body))
+            sections[label] = [len(body), len(data)]
+            body += data
+        meta[name] = {
+            "count": len(name_offsets) - 1,
+            "hash": hashlib.blake2b(blob, digest_size=8).hexdigest(),
+            "sections": sections,
+        }
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "generatedAt": time.time() if generated_at is None else generated_at,
+        "datasets": meta,
+    }, separators=(",", ":")).encode("utf-8")
+    prefix = _PREFIX.pack(MAGIC, len(header)) + header
+    return prefix + b"\0" * (_aligned(len(prefix)) - len(prefix)) + body
+
+
+def _parse_header(buf) -> Dict[str, Any]:
+    if len(buf) < _PREFIX.size:
+        raise ValueError("truncated catalog file")
+    magic, size = _PREFIX.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError("not a shared catalog file")
+    header = json.loads(bytes(buf[_PREFIX.size:_PREFIX.size + size]))
+    if header.get("version") != FORMAT_VERSION or header.get("byteorder") != sys.byteorder:
+        raise ValueError(f"unsupported catalog format: {header.get('version')!r}/{header.get('byteorder')!r}")
+    header["base"] = _aligned(_PREFIX.size + size)
+    return header
+
+
+def read_header(path: str) -> Optional[Dict[str, Any]]:
+    """Header of an existing catalog file, or None when missing or unreadable."""
+    try:
+        with open(path, "rb") as fh:
+            prefix = fh.read(_PREFIX.size)
+            if len(prefix) < _PREFIX.size:
+                return None
+            return _parse_header(prefix + fh.read(_PREFIX.unpack(prefix)[1]))
+    except (OSError, ValueError):
+        return None
+
+
+def write_catalog(path: str, datasets: Dict[str, List[Dict[str, Any]]], force: bool = False) -> bool:
+    """
+    Atomically replace `path`. Returns False without writing when the datasets hash the same
+    as the current file, so workers keep their mapping.
+    """
+    body = encode_catalog(datasets)
+    if not force:
+        old, new = read_header(path), _parse_header(body)
+        if old is not None and {k: v["hash"] for k, v in old["datasets"].items()} == {
+            k: v["hash"] for k, v in new["datasets"].items()
+        }:
+            return False
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(body)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return True
+
+
+class CatalogDataset:
+    """One mapped dataset. Views into the mapping; nothing is copied until a record is read."""
+
+    def __init__(self, name: str, mm: mmap.mmap, base: int, meta: Dict[str, Any]):
+        self.name = name
+        self.count = meta["count"]
+        self.hash = meta["hash"]
+        self._mm = mm
+        (names_at, names_len), (noff_at, noff_len), (rec_at, _), (roff_at, roff_len) = (
+            meta["sections"][s] for s in SECTIONS
+        )
+        view = memoryview(mm)
+        self._names = base + names_at
+        self._names_end = self._names + names_len
+        self._name_offsets = view[base + noff_at:base + noff_at + noff_len].cast("I")
+        self._records = base + rec_at
+        self._record_offsets = view[base + roff_at:base + roff_at + roff_len].cast("I")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def record(self, i: int) -> Dict[str, Any]:
+        start = self._records + self._record_offsets[i]
+        return json.loads(self._mm[start:self._records + self._record_offsets[i + 1]])
+
+    def records(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return [self.record(i) for i in range(self.count if limit is None else min(limit, self.count))]
+
+    def search(self, query: str, limit: int = 25) -> List[Dict[str, Any]]:
+        """
+        Records whose lowercased name contains `query`: prefix matches first, then the rest,
+        each in file order (same ranking as nwdb_service._rank_by_name). Empty query: the first `limit`.
+        """
+        needle = query.lower().replace("\n", " ").encode("utf-8")
+        if not needle:
+            return self.records(limit)
+        mm, offsets, base = self._mm, self._name_offsets, self._names
+        starts: List[int] = []
+        contains: List[int] = []
+        pos = base
+        while len(starts) < limit:
+            hit = mm.find(needle, pos, self._names_end)
+            if hit < 0:
+                break
+            rel = hit - base
+            i = bisect_right(offsets, rel) - 1
+            (starts if rel == offsets[i] else contains).append(i)
+            # One hit per record; carry on from the next name
+            pos = base + offsets[i + 1]
+        return [self.record(i) for i in (starts + contains)[:limit]]
+
+
+class _Mapping:
+    def __init__(self, path: str):
+        with open(path, "rb") as fh:
+            self.mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        header = _parse_header(self.mm)
+        self.generated_at = float(header.get("generatedAt") or 0.0)
+        self.datasets = {
+            name: CatalogDataset(name, self.mm, header["base"], meta) for name, meta in header["datasets"].items()
+        }
+
+
+class SharedCatalog:
+    """
+    Read side. `dataset(name)` remaps when the refresher has replaced the file (checked at
+    most every `check_interval` seconds) and returns None for unknown datasets, or for all of
+    them once the file is older than `stale_after` seconds, so the caller fetches upstream itself.
+    A replaced mapping is released when the last dataset view into it is dropped. A file that
+    can't be mapped keeps the previous mapping; it is counted in `errors` (reason in `last_error`).
+    """
+
+    def __init__(self, path: str, check_interval: float = 5.0, stale_after: Optional[float] = 7200.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.stale_after = stale_after
+        self._mapping: Optional[_Mapping] = None
+        self._stat_key = None
+        self._checked = float("-inf")
+        self.remaps = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    def _check(self) -> None:
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if key == self._stat_key:
+            return
+        try:
+            mapping = _Mapping(self.path)
+        except (OSError, ValueError) as e:
+            self.errors += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            return
+        self._mapping, self._stat_key = mapping, key
+        self.remaps += 1
+
+    def dataset(self, name: str) -> Optional[CatalogDataset]:
+        self._check()
+        mapping = self._mapping
+        if mapping is None:
+            return None
+        if self.stale_after is not None and time.time() - mapping.generated_at > self.stale_after:
+            return None
+        return mapping.datasets.get(name)
+
+    def names(self) -> List[str]:
+        self._check()
+        return sorted(self._mapping.datasets) if self._mapping is not None else []
+
+
+async def collect_datasets(service, item_types: Iterable[str], previous: Optional[str] = None) -> Dict[str, List[Dict]]:
+    """
+    Catalog and perk rows from NWDBService, at refresh priority. A dataset that can't be
+    fetched completely is carried over from the catalog file at `previous`, if it has one.
+    """
+    old = SharedCatalog(previous, check_interval=0, stale_after=None) if previous else None
+
+    def _carry(name: str) -> None:
+        mapped = old.dataset(name) if old is not None else None
+        if mapped is not None:
+            datasets[name] = mapped.records()
+
+    datasets: Dict[str, List[Dict]] = {}
+    with request_priority(REFRESH):
+        items = await service._load_items()
+        if items:
+            datasets["items"] = list(items)
+        else:
+            _carry("items")
+        for item_type in dict.fromkeys(t.lower() for t in item_types):
+            key = f"perks:{item_type}"
+            perks, complete = await service._fetch_perks(item_type, refresh=True)
+            if perks and complete:
+                datasets[key] = [service._perk_row(p) for p in perks]
+            else:
+                _carry(key)
+    return datasets
+
+
+async def _refresh(out: str, item_types: List[str], every: Optional[float]) -> None:
+    from .nwdb_service import NWDBService
+
+    async with NWDBService() as service:
+        while True:
+            t0 = time.perf_counter()
+            datasets = await collect_datasets(service, item_types, previous=out)
+            changed = write_catalog(out, datasets)
+            print(
+                f"[NWDB] shared catalog {'written' if changed else 'unchanged'}: "
+                + ", ".join(f"{k}={len(v)}" for k, v in sorted(datasets.items()))
+                + f" in {time.perf_counter() - t0:.1f}s -> {out}"
+            )
+            if not every:
+                return
+            await asyncio.sleep(every)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Write or query the memory-mapped shared catalog")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    refresh = sub.add_parser("refresh", help="fetch from nwdb.info and (re)write the catalog file")
+    refresh.add_argument("--out", required=True)
+    refresh.add_argument("--types", nargs="*", default=None,
+                         help="perk item types to include (default: those already in --out)")
+    refresh.add_argument("--every", type=float, default=None, help="keep refreshing every N seconds")
+    query = sub.add_parser("query", help="search one dataset")
+    query.add_argument("path")
+    query.add_argument("dataset", help='"items" or "perks:<item type>"')
+    query.add_argument("query")
+    query.add_argument("--limit", type=int, default=25)
+    args = parser.parse_args(argv)
+
+    if args.cmd == "refresh":
+        types = args.types
+        if types is None:
+            header = read_header(args.out)
+            types = [k.split(":", 1)[1] for k in (header or {}).get("datasets", {}) if k.startswith("perks:")]
+        asyncio.run(_refresh(args.out, types, args.every))
+        return 0
+    mapped = SharedCatalog(args.path, stale_after=None).dataset(args.dataset)
+    if mapped is None:
+        print(f"no dataset {args.dataset!r} in {args.path}")
+        return 1
+    print(json.dumps(mapped.search(args.query, args.limit), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
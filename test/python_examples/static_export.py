@@ -0,0 +1,277 @@
+"""
+Static export of build_item_info for the site.
+
+Writes content-hashed JSON that can be served with far-future cache headers:
+
+    <out>/manifest.json                      entry point, rewritten on every export
+    <out>/search.<hash>.json                 {"v", "types": [...], "items": [[id, name, typeIdx, tier, gearScore, hash], ...]}
+    <out>/categories/<type>.<hash>.json      [{"id", "name", "tier", "gearScore", "iconUrl", "hash"}, ...]
+    <out>/items/<id>.<hash>.json             build_item_info output plus "id"
+
+Every JSON file also gets a .gz sibling, and a .br one when a brotli package is installed.
+An item's URL is items/<id>.<hash>.json, built from the hash in the search index or its
+category shard. Files whose content hasn't changed already exist under the same name and
+are not rewritten (missing compressed siblings are filled in), so a re-export only touches
+what changed. --prune removes hashed files the new manifest no longer references.
+
+An export in which any item failed, or that has no items at all (e.g. the catalog download
+failed), writes no manifest and prunes nothing, so the published set stays as it was; the
+command exits 1.
+
+    python -m services.static_export --out public/db --payloads items.jsonl
+    python -m services.static_export --out public/db --live --limit 500
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from .item_data_service import build_item_info
+from .request_scheduler import BULK, request_priority
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional
+    brotli = None
+
+EXPORT_VERSION = 1
+_UNSAFE = re.compile(r"[^a-z0-9_\-]+")
+
+
+def _safe_name(value: str) -> str:
+    return _UNSAFE.sub("-", str(value).strip().lower()).strip("-") or "_"
+
+
+def _encode(payload: Any) -> bytes:
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False, sort_keys=True).encode("utf-8")
+
+
+def _digest(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=6).hexdigest()
+
+
+def _write_atomic(path: str, body: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(body)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class StaticExporter:
+    def __init__(self, out_dir: str, compress: bool = True):
+        self.out_dir = out_dir
+        self.compress = compress
+        self.summaries: Dict[str, Dict[str, Any]] = {}
+        self.written = 0
+        self.unchanged = 0
+        # item id -> error, for items that couldn't be exported
+        self.failed: Dict[str, str] = {}
+        self._referenced: set = set()
+        for sub in ("items", "categories"):
+            os.makedirs(os.path.join(out_dir, sub), exist_ok=True)
+
+    def _emit(self, rel_dir: str, stem: str, payload: Any) -> Tuple[str, str]:
+        """Write <rel_dir>/<stem>.<hash>.json (+ compressed siblings); returns (relative path, hash)."""
+        body = _encode(payload)
+        digest = _digest(body)
+        rel = f"{rel_dir}/{stem}.{digest}.json" if rel_dir else f"{stem}.{digest}.json"
+        path = os.path.join(self.out_dir, rel)
+        self._referenced.add(rel)
+        outputs = [(path + ".gz", lambda: gzip.compress(body, compresslevel=9, mtime=0))] if self.compress else []
+        if self.compress and brotli is not None:
+            outputs.append((path + ".br", lambda: brotli.compress(body, quality=11)))
+        # The .json goes last, so a run interrupted before it is retried in full
+        outputs.append((path, lambda: body))
+        missing = [(p, encode) for p, encode in outputs if not os.path.exists(p)]
+        if not missing:
+            self.unchanged += 1
+            return rel, digest
+        for p, encode in missing:
+            _write_atomic(p, encode())
+        self.written += 1
+        return rel, digest
+
+    def add(self, item_id: str, info: Dict[str, Any]) -> Optional[str]:
+        """Export one build_item_info result; returns its relative path (None for errors, see `failed`)."""
+        item_id = str(item_id)
+        if not info or info.get("error"):
+            self.failed[item_id] = str((info or {}).get("error") or "no item data")
+            return None
+        self.failed.pop(item_id, None)
+        rel, digest = self._emit("items", _safe_name(item_id), {"id": item_id, **info})
+        self.summaries[item_id] = {
+            "id": item_id,
+            "name": info.get("name") or "",
+            "type": info.get("type") or "Other",
+            "tier": info.get("tier"),
+            "gearScore": info.get("gearScore"),
+            "iconUrl": info.get("iconUrl"),
+            "hash": digest,
+        }
+        return rel
+
+    def add_payloads(self, payloads: Iterable[Dict[str, Any]]) -> int:
+        """Raw NWDB item payloads ({"data": {...}} or bare records) through build_item_info."""
+        n = 0
+        for raw in payloads:
+            d = raw.get("data") if isinstance(raw.get("data"), dict) else raw
+            if isinstance(d, dict) and d.get("id") and self.add(d["id"], build_item_info(d)):
+                n += 1
+        return n
+
+    def finish(self, prune: bool = False) -> Dict[str, Any]:
+        """
+        Write category shards, the search index and finally the manifest. Writes nothing when
+        an item failed or there are none; the result then has "manifest": None.
+        """
+        if self.failed or not self.summaries:
+            return {
+                "manifest": None, "itemCount": len(self.summaries), "failed": len(self.failed), "categories": {},
+                "written": self.written, "unchanged": self.unchanged, "pruned": 0,
+            }
+        by_type: Dict[str, List[Dict[str, Any]]] = {}
+        for s in self.summaries.values():
+            by_type.setdefault(s["type"], []).append(s)
+        categories = {}
+        for type_name in sorted(by_type):
+            rows = sorted(by_type[type_name], key=lambda s: (s["name"].lower(), s["id"]))
+            rows = [{k: v for k, v in s.items() if k != "type"} for s in rows]
+            categories[type_name], _ = self._emit("categories", _safe_name(type_name), rows)
+
+        types = sorted(by_type)
+        type_idx = {t: i for i, t in enumerate(types)}
+        ordered = sorted(self.summaries.values(), key=lambda s: (s["name"].lower(), s["id"]))
+        search_rel, _ = self._emit("", "search", {
+            "v": EXPORT_VERSION,
+            "types": types,
+            "items": [[s["id"], s["name"], type_idx[s["type"]], s["tier"], s["gearScore"], s["hash"]] for s in ordered],
+        })
+        manifest = {
+            "version": EXPORT_VERSION,
+            "generatedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "itemCount": len(self.summaries),
+            "search": search_rel,
+            "categories": categories,
+        }
+        # The manifest is the only mutable name; it goes last so readers never see dangling paths
+        _write_atomic(os.path.join(self.out_dir, "manifest.json"), json.dumps(manifest, indent=2).encode("utf-8"))
+        removed = self.prune() if prune else 0
+        return {
+            **manifest, "manifest": "manifest.json", "failed": 0,
+            "written": self.written, "unchanged": self.unchanged, "pruned": removed,
+        }
+
+    def prune(self) -> int:
+        removed = 0
+        for sub in ("", "items", "categories"):
+            base = os.path.join(self.out_dir, sub) if sub else self.out_dir
+            for name in os.listdir(base):
+                rel = f"{sub}/{name}" if sub else name
+                stem = rel[:-3] if rel.endswith((".gz", ".br")) else rel
+                if not stem.endswith(".json") or stem == "manifest.json" or stem in self._referenced:
+                    continue
+                os.unlink(os.path.join(base, name))
+                removed += 1
+        return removed
+
+
+async def iter_service_items(
+    service, item_ids: Optional[Iterable[str]] = None, batch: int = 50, concurrency: int = 8,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    (id, build_item_info) for `item_ids`, or the whole catalog. Payloads are fetched at bulk
+    priority without going through the service's item_info cache or popularity table, so an
+    export doesn't evict or outrank what interactive lookups use.
+    """
+    if item_ids is None:
+        catalog = await asyncio.to_thread(service._get_cached_items)
+        item_ids = [it["id"] for it in catalog if it.get("id")]
+    ids = list(dict.fromkeys(item_ids))
+    limiter = asyncio.Semaphore(max(1, concurrency))
+
+    async def _one(item_id: str) -> Tuple[str, Dict[str, Any]]:
+        async with limiter:
+            payload = await service._item_payload_async(item_id)
+        data = payload.get("data") if isinstance(payload, dict) else None
+        if not isinstance(data, dict):
+            return item_id, {"error": (payload or {}).get("error") or "no item data"}
+        return item_id, build_item_info(data)
+
+    for start in range(0, len(ids), batch):
+        with request_priority(BULK):
+            infos = await asyncio.gather(*(_one(i) for i in ids[start:start + batch]))
+        for item_id, info in infos:
+            yield item_id, info
+
+
+def _iter_payload_files(paths: Iterable[str]) -> Iterable[Dict[str, Any]]:
+    from .drop_index import iter_payload_file
+
+    for path in paths:
+        yield from iter_payload_file(path)
+
+
+async def _export_live(exporter: StaticExporter, limit: Optional[int], concurrency: int) -> int:
+    from .nwdb_service import NWDBService
+
+    n = 0
+    async with NWDBService() as service:
+        ids = None
+        if limit:
+            catalog = await asyncio.to_thread(service._get_cached_items)
+            ids = [it["id"] for it in catalog[:limit] if it.get("id")]
+        async for item_id, info in iter_service_items(service, ids, concurrency=concurrency):
+            n += 1 if exporter.add(item_id, info) else 0
+    return n
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export build_item_info as static, content-hashed JSON")
+    parser.add_argument("--out", required=True)
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("--payloads", nargs="+", help=".jsonl or {id: payload} .json files of NWDB item payloads")
+    src.add_argument("--live", action="store_true", help="fetch the catalog and items from nwdb.info")
+    parser.add_argument("--limit", type=int, default=None, help="with --live, only the first N catalog items")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--no-compress", action="store_true")
+    parser.add_argument("--prune", action="store_true", help="delete hashed files no longer referenced")
+    args = parser.parse_args(argv)
+
+    exporter = StaticExporter(args.out, compress=not args.no_compress)
+    t0 = time.perf_counter()
+    if args.live:
+        exported = asyncio.run(_export_live(exporter, args.limit, args.concurrency))
+    else:
+        exported = exporter.add_payloads(_iter_payload_files(args.payloads))
+    summary = exporter.finish(prune=args.prune)
+    if summary["manifest"] is None:
+        if exporter.failed:
+            sample = ", ".join(f"{i} ({e})" for i, e in list(exporter.failed.items())[:5])
+            reason = f"{summary['failed']} of {exported + summary['failed']} items failed, e.g. {sample}"
+        else:
+            reason = "no items to export"
+        print(f"export incomplete: {reason}; {args.out} left as it was, nothing pruned", file=sys.stderr)
+        return 1
+    print(
+        f"exported {exported} items into {len(summary['categories'])} categories in "
+        f"{time.perf_counter() - t0:.1f}s: {summary['written']} files written, "
+        f"{summary['unchanged']} unchanged, {summary['pruned']} pruned -> {args.out}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,104 @@
+"""
+Offline checks for mutation_scraper against the saved article in newworldnews_fixtures/.
+
+    python -m pytest test/test_mutation_scraper.py
+"""
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import mutation_scraper as ms  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "newworldnews_fixtures")
+URL = "https://newworldnews.org/barneys-ennead-and-forge-eternal-savage-desiccated/"
+NOW = datetime(2024, 12, 29, 18, 45, tzinfo=timezone.utc)
+EXPECTED_TAGS = [
+    "Barnacles and Black Powder", "Empyrean Forge", "The Ennead", "Eternal", "Savage", "Desiccated",
+]
+
+
+def _read_fixture() -> str:
+    with open(os.path.join(FIXTURES, ms._slug_from_url(URL) + ".html"), encoding="utf-8") as fh:
+        return fh.read()
+
+
+class TaxonomyTagsTest(unittest.TestCase):
+    def test_fixture_tags(self):
+        tags = ms.extract_taxonomy_tags(_read_fixture())
+        self.assertEqual([t["name"] for t in tags], EXPECTED_TAGS)
+
+    def test_stdlib_backend(self):
+        tags = ms._tags_stdlib(ms._slice_taxonomy(_read_fixture()))
+        self.assertEqual(list(dict.fromkeys(t["name"] for t in tags)), EXPECTED_TAGS)
+
+    def test_slice_stops_at_own_close_tag(self):
+        fragment = ms._slice_taxonomy(_read_fixture())
+        self.assertTrue(fragment.endswith("</li>"))
+        self.assertNotIn("PvP", fragment)
+
+    def test_element_end_needs_delimiter(self):
+        html = '<b class="x">one<br>two<body-part></b><b>next</b>'
+        self.assertEqual(ms._element_end(html, 0), html.index("<b>next"))
+
+
+class MutationsDataTest(unittest.TestCase):
+    def test_records_from_fixture(self):
+        parsed = ms.read_fixtures([URL], FIXTURES)
+        payload = ms.build_mutations_data([URL], parsed, now=NOW)
+        self.assertTrue(payload["success"])
+        self.assertEqual([r["expedition"] for r in payload["data"]],
+                         ["Barnacles and Black Powder", "Empyrean Forge", "The Ennead"])
+        self.assertEqual({r["mutationType"] for r in payload["data"]}, {"Eternal, Savage, Desiccated"})
+        self.assertEqual({r["date"] for r in payload["data"]}, {"Current Week"})
+
+    def test_merge_keeps_fields_the_article_lacks(self):
+        existing = [
+            {"expedition": "Empyrean Forge", "mutationType": "Barneys, Ennead, and Forge; Eternal, Savage, Desiccated",
+             "date": "Current Week", "difficulty": "Unknown", "weaknesses": ["30% Arcane", "20% Ice"],
+             "artifact": "Inferno Fire Staff", "lastUpdated": "2024-12-22T18:45:00.000Z"},
+            {"expedition": "The Ennead", "sourceUrl": URL, "difficulty": "Mutation 3",
+             "weaknesses": ["30% Strike"], "artifact": "Unknown Artifact", "notes": "kept"},
+        ]
+        payload = ms.build_mutations_data([URL], ms.read_fixtures([URL], FIXTURES), now=NOW, existing=existing)
+        by_exp = {r["expedition"]: r for r in payload["data"]}
+        forge = by_exp["Empyrean Forge"]
+        self.assertEqual(forge["weaknesses"], ["30% Arcane", "20% Ice"])
+        self.assertEqual(forge["artifact"], "Inferno Fire Staff")
+        self.assertEqual(forge["lastUpdated"], "2024-12-29T18:45:00.000Z")
+        self.assertEqual(forge["sourceUrl"], URL)
+        ennead = by_exp["The Ennead"]
+        self.assertEqual(ennead["difficulty"], "Mutation 3")
+        self.assertEqual(ennead["weaknesses"], ["30% Strike"])
+        self.assertEqual(ennead["notes"], "kept")
+        self.assertEqual(by_exp["Barnacles and Black Powder"]["weaknesses"], [])
+
+    def test_unreadable_url_keeps_existing_records(self):
+        other = "https://newworldnews.org/some-earlier-week/"
+        kept = {"expedition": "Tempest's Heart", "sourceUrl": other, "difficulty": "Mutation 2"}
+        parsed = {**ms.read_fixtures([URL], FIXTURES), other: None}
+        payload = ms.build_mutations_data([URL, other], parsed, now=NOW, existing=[kept])
+        self.assertTrue(payload["success"])
+        self.assertIn(kept, payload["data"])
+
+    def test_failed_run_leaves_out_untouched(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "mutations_data.json")
+            with open(out, "w", encoding="utf-8") as fh:
+                fh.write('{"success": true, "data": [{"expedition": "The Ennead"}]}')
+            code = ms.main(["https://newworldnews.org/missing-article/", "--fixtures", FIXTURES, "--out", out])
+            self.assertEqual(code, 1)
+            with open(out, encoding="utf-8") as fh:
+                self.assertIn("The Ennead", fh.read())
+
+    def test_no_existing_gives_placeholders(self):
+        payload = ms.build_mutations_data([URL], ms.read_fixtures([URL], FIXTURES), now=NOW, existing=[])
+        for record in payload["data"]:
+            self.assertEqual(record["artifact"], "Unknown Artifact")
+
+
+if __name__ == "__main__":
+    unittest.main()